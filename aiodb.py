@@ -0,0 +1,369 @@
+from flask import g
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from db import PoolTimeout, SQLiteDriver, replica_config
+from storage import STORAGES
+import asyncio
+import time
+
+try:
+    import aiomysql
+except ImportError:  # Only needed for DB_ENGINE=mysql under ASGI
+    aiomysql = None
+
+# Async database access for the ASGI entry point (asgi.py). Same shape as
+# db.py: a driver per engine and a bounded pool that recycles and pings
+# connections, but every call is awaited, so a request waiting on a slow query
+# parks its task instead of a worker thread. Handlers check a connection out
+# for one `async with adb.cursor()` block; it goes back to the pool, rolled
+# back, when the block exits.
+#
+# Views marked @adb.read_only read from a replica exactly as @db.read_only
+# views do: db.py's monitor decides which replica is healthy and caught up
+# with the session's last write, and adb keeps an async pool per replica.
+
+# ==================== Drivers ====================
+
+class AsyncMySQLDriver:
+    name = 'mysql'
+
+    def __init__(self, config, on_connect=None, read_only=False):
+        if aiomysql is None:
+            raise RuntimeError('DB_ENGINE=mysql under ASGI requires the aiomysql package')
+        # MySQLStorage needs no per-connection setup, so on_connect is not used;
+        # replica sessions are made read-only as MySQLStorage.configure_read_only does
+        self.kwargs = {
+            'host': config['MYSQL_HOST'],
+            'user': config['MYSQL_USER'],
+            'password': config['MYSQL_PASSWORD'],
+            'db': config['MYSQL_DB'],
+            'port': int(config.get('MYSQL_PORT', 3306)),
+            'charset': 'utf8mb4',
+            'connect_timeout': int(config.get('MYSQL_CONNECT_TIMEOUT', 5)),
+            'autocommit': False,
+        }
+        if read_only:
+            self.kwargs['init_command'] = 'SET SESSION TRANSACTION READ ONLY'
+
+    async def connect(self):
+        return await aiomysql.connect(**self.kwargs)
+
+    async def ping(self, conn):
+        await conn.ping(reconnect=False)
+
+    async def cursor(self, conn, unbuffered=False):
+        return await conn.cursor(aiomysql.SSDictCursor if unbuffered else aiomysql.DictCursor)
+
+    async def close(self, conn):
+        conn.close()
+
+class ThreadedSQLiteConnection:
+    """A sqlite3 connection driven from its own thread. sqlite3 has no
+    non-blocking API; async SQLite drivers (aiosqlite included) all work this
+    way. Building on SQLiteDriver keeps the PRAGMAs, converters and
+    placeholder translation identical to the sync app."""
+
+    def __init__(self, conn, thread):
+        self.conn = conn
+        self._thread = thread
+
+    async def run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._thread, fn, *args)
+
+    async def commit(self):
+        await self.run(self.conn.commit)
+
+    async def rollback(self):
+        await self.run(self.conn.rollback)
+
+    async def close(self):
+        try:
+            await self.run(self.conn.close)
+        finally:
+            self._thread.shutdown(wait=False)
+
+class AsyncSQLiteCursor:
+    def __init__(self, connection, cursor):
+        self._connection = connection
+        self._cursor = cursor
+
+    async def execute(self, query, params=()):
+        return await self._connection.run(self._cursor.execute, query, params)
+
+    async def executemany(self, query, seq_of_params):
+        return await self._connection.run(self._cursor.executemany, query, seq_of_params)
+
+    async def fetchone(self):
+        return await self._connection.run(self._cursor.fetchone)
+
+    async def fetchall(self):
+        return await self._connection.run(self._cursor.fetchall)
+
+    async def fetchmany(self, size):
+        return await self._connection.run(self._cursor.fetchmany, size)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    async def close(self):
+        await self._connection.run(self._cursor.close)
+
+class AsyncSQLiteDriver:
+    name = 'sqlite'
+
+    def __init__(self, config, on_connect=None, read_only=False):
+        # on_connect applies the read-only PRAGMA for replicas
+        self._driver = SQLiteDriver(config)
+        self.on_connect = on_connect
+
+    async def connect(self):
+        thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aiodb-sqlite')
+        connection = ThreadedSQLiteConnection(None, thread)
+        try:
+            connection.conn = await connection.run(self._driver.connect)
+            if self.on_connect is not None:
+                await connection.run(self.on_connect, connection.conn)
+        except BaseException:
+            thread.shutdown(wait=False)
+            raise
+        return connection
+
+    async def ping(self, conn):
+        await conn.run(self._driver.ping, conn.conn)
+
+    async def cursor(self, conn, unbuffered=False):
+        # sqlite3 cursors already step through results lazily
+        return AsyncSQLiteCursor(conn, await conn.run(self._driver.cursor, conn.conn))
+
+    async def close(self, conn):
+        await conn.close()
+
+ASYNC_DRIVERS = {
+    'mysql': AsyncMySQLDriver,
+    'sqlite': AsyncSQLiteDriver,
+}
+
+# ==================== Pool ====================
+
+class PooledConnection:
+    __slots__ = ('conn', 'created_at', 'last_used', 'checked_out_at')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+        self.checked_out_at = None
+
+class AsyncConnectionPool:
+    """Bounded pool for one event loop. Same policy as db.ConnectionPool: idle
+    connections are reused most-recent first, pinged after ping_interval idle
+    seconds and replaced once older than recycle seconds."""
+
+    def __init__(self, driver, max_size=10, timeout=5.0, recycle=3600, ping_interval=30):
+        self.driver = driver
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle = []
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'discarded': 0,
+            'failed_pings': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'held_seconds_total': 0.0,
+        }
+
+    async def acquire(self):
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            raise PoolTimeout(f'No database connection available within {self.timeout}s')
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - started
+
+        pooled = self._idle.pop() if self._idle else None
+        if pooled is None:
+            self._size += 1
+        self._in_use += 1
+        try:
+            pooled = await self._checked(pooled)
+        except BaseException:
+            self._size -= 1
+            self._in_use -= 1
+            self._slots.release()
+            raise
+
+        pooled.checked_out_at = time.monotonic()
+        stats = self._stats
+        stats['checkouts'] += 1
+        stats['wait_seconds_total'] += waited
+        stats['wait_seconds_max'] = max(stats['wait_seconds_max'], waited)
+        return pooled
+
+    async def _checked(self, pooled):
+        # Hand out a live connection: new, validated, or a replacement for a stale one
+        now = time.monotonic()
+        if pooled is not None and now - pooled.created_at > self.recycle:
+            await self._close(pooled)
+            pooled = None
+        if pooled is not None and now - pooled.last_used > self.ping_interval:
+            try:
+                await self.driver.ping(pooled.conn)
+            except Exception:
+                self._stats['failed_pings'] += 1
+                await self._close(pooled)
+                pooled = None
+        if pooled is None:
+            pooled = PooledConnection(await self.driver.connect())
+            self._stats['connects'] += 1
+        return pooled
+
+    async def _close(self, pooled):
+        self._stats['discarded'] += 1
+        try:
+            await self.driver.close(pooled.conn)
+        except Exception:
+            pass
+
+    async def release(self, pooled):
+        # Reset the session; a connection that cannot roll back is broken and dropped
+        try:
+            await pooled.conn.rollback()
+            healthy = True
+        except BaseException:
+            await self._close(pooled)
+            healthy = False
+
+        now = time.monotonic()
+        self._in_use -= 1
+        self._stats['held_seconds_total'] += now - pooled.checked_out_at
+        if healthy:
+            pooled.last_used = now
+            self._idle.append(pooled)
+        else:
+            self._size -= 1
+        self._slots.release()
+
+    def stats(self):
+        return {
+            'engine': self.driver.name,
+            'max_size': self.max_size,
+            'size': self._size,
+            'in_use': self._in_use,
+            'idle': len(self._idle),
+            'waiting': self._waiting,
+            **self._stats,
+        }
+
+    async def close(self):
+        while self._idle:
+            await self._close(self._idle.pop())
+            self._size -= 1
+
+# ==================== Extension ====================
+
+class AsyncDatabase:
+    def __init__(self, app=None, db=None):
+        self.pool = None
+        self.driver = None
+        self.storage = None
+        # The sync Database whose replica monitor routes read-only views
+        self.db = None
+        self.replicas = {}
+        # Optional callable wrapping every cursor handed out (query instrumentation)
+        self.cursor_wrapper = None
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('DB_ENGINE', 'mysql')
+        app.config.setdefault('ASYNC_DB_POOL_SIZE', app.config.get('DB_POOL_SIZE', 10))
+        app.config.setdefault('ASYNC_DB_POOL_TIMEOUT', app.config.get('DB_POOL_TIMEOUT', 5.0))
+        app.config.setdefault('DB_POOL_RECYCLE', 3600)
+        app.config.setdefault('DB_POOL_PING_INTERVAL', 30)
+        self.storage = STORAGES[app.config['DB_ENGINE']]()
+        self.driver = ASYNC_DRIVERS[app.config['DB_ENGINE']](app.config, on_connect=self.storage.configure)
+        self.pool = self._pool(app.config, self.driver, app.config['ASYNC_DB_POOL_SIZE'])
+        if db is not None:
+            self.db = db
+        self.replicas = {
+            replica.name: self._pool(app.config, ASYNC_DRIVERS[app.config['DB_ENGINE']](
+                replica_config(app.config, replica.name), on_connect=self._configure_replica, read_only=True
+            ), app.config.get('DB_REPLICA_POOL_SIZE', app.config['ASYNC_DB_POOL_SIZE']))
+            for replica in (self.db.replicas if self.db is not None else [])
+        }
+        app.extensions['async_database'] = self
+
+    def _pool(self, config, driver, max_size):
+        return AsyncConnectionPool(
+            driver,
+            max_size=max_size,
+            timeout=config['ASYNC_DB_POOL_TIMEOUT'],
+            recycle=config['DB_POOL_RECYCLE'],
+            ping_interval=config['DB_POOL_PING_INTERVAL'],
+        )
+
+    def _configure_replica(self, conn):
+        self.storage.configure(conn)
+        self.storage.configure_read_only(conn)
+
+    def read_only(self, f):
+        """Async view decorator: the view never writes, so adb.cursor() may read from a replica."""
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            g._db_read_only = True
+            return await f(*args, **kwargs)
+        return decorated_function
+
+    async def _acquire(self):
+        # In a read-only view: the replica db.py picks for this request (once), else the primary
+        if self.replicas and g.get('_db_read_only'):
+            if '_adb_replica' not in g:
+                g._adb_replica = self.db.choose_replica(g.get('_db_last_write'))
+            replica = g._adb_replica
+            if replica is not None:
+                pool = self.replicas[replica.name]
+                try:
+                    pooled = await pool.acquire()
+                    g.db_replica_heartbeat = replica.heartbeat
+                    return pool, pooled
+                except Exception as e:
+                    replica.error = str(e)
+                    g._adb_replica = None
+        return self.pool, await self.pool.acquire()
+
+    @asynccontextmanager
+    async def cursor(self, unbuffered=False):
+        pool, pooled = await self._acquire()
+        try:
+            cur = await pool.driver.cursor(pooled.conn, unbuffered)
+            if self.cursor_wrapper is not None:
+                cur = self.cursor_wrapper(cur)
+            try:
+                yield cur
+            finally:
+                await cur.close()
+        finally:
+            await pool.release(pooled)
+
+    async def close(self):
+        await self.pool.close()
+        for pool in self.replicas.values():
+            await pool.close()
@@ -0,0 +1,174 @@
+from datetime import datetime
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Spending alerts run off the request path: write routes enqueue (user_id, month)
+# and a worker evaluates the user's salary and per-category budget thresholds.
+# Each threshold fires at most once per user, month and scope, enforced by the
+# alert_state primary key, so replays and duplicate jobs are harmless.
+
+# ==================== Queues ====================
+
+class InProcessAlertQueue:
+    """Queue consumed by a daemon thread inside the web process."""
+
+    def __init__(self, **options):
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def put(self, user_id, month):
+        # Coalesce: a user/month already waiting will see the newest totals anyway
+        with self._lock:
+            if (user_id, month) in self._pending:
+                return
+            self._pending.add((user_id, month))
+        self._queue.put((user_id, month))
+
+    def get(self, timeout=None):
+        try:
+            job = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            self._pending.discard(job)
+        return job
+
+class SQLiteAlertQueue:
+    """Durable queue in a local SQLite file, shared with `flask alerts worker` processes."""
+
+    def __init__(self, path='instance/alert_queue.db', **options):
+        self.path = path
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS alert_jobs (user_id INTEGER NOT NULL, month TEXT NOT NULL, "
+            "enqueued_at REAL NOT NULL, PRIMARY KEY (user_id, month))"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, user_id, month):
+        self._connection().execute(
+            "INSERT OR IGNORE INTO alert_jobs (user_id, month, enqueued_at) VALUES (?, ?, ?)",
+            (user_id, month, time.time())
+        )
+
+    def get(self, timeout=None):
+        deadline = time.monotonic() + (timeout or 0)
+        conn = self._connection()
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT user_id, month FROM alert_jobs ORDER BY enqueued_at LIMIT 1"
+            ).fetchone()
+            if row:
+                conn.execute("DELETE FROM alert_jobs WHERE user_id = ? AND month = ?", row)
+            conn.execute("COMMIT")
+            if row or time.monotonic() >= deadline:
+                return row
+            time.sleep(0.2)
+
+QUEUES = {
+    'memory': InProcessAlertQueue,
+    'sqlite': SQLiteAlertQueue,
+}
+
+# ==================== Evaluation ====================
+
+ALERT_TYPES = {50: 'info', 80: 'warning', 100: 'error'}
+
+def crossed_thresholds(spent, limit, thresholds):
+    if not limit or limit <= 0:
+        return []
+    percentage = spent / limit * 100
+    return [threshold for threshold in thresholds if percentage >= threshold]
+
+def evaluate_alerts(cur, storage, user_id, month, thresholds):
+    """Insert one notification per newly crossed threshold; returns the ones created."""
+    cur.execute("SELECT monthly_salary FROM users WHERE id = %s", (user_id,))
+    user = cur.fetchone()
+    if not user:
+        return []
+    cur.execute(
+        "SELECT category, total FROM expense_rollups WHERE user_id = %s AND month = %s AND expense_count > 0",
+        (user_id, month)
+    )
+    category_totals = {row['category']: float(row['total']) for row in cur.fetchall()}
+    cur.execute("SELECT category, monthly_limit FROM category_budgets WHERE user_id = %s", (user_id,))
+    budgets = {row['category']: float(row['monthly_limit']) for row in cur.fetchall()}
+
+    # (scope, spent, limit, label) for the salary and every budgeted category
+    checks = [('salary', sum(category_totals.values()), float(user['monthly_salary'] or 0), 'your monthly salary')]
+    for category, monthly_limit in budgets.items():
+        checks.append((f'category:{category}', category_totals.get(category, 0), monthly_limit, f'your {category} budget'))
+
+    created = []
+    # An expense dated in another month is checked against that month's totals
+    period = '' if month == datetime.now().strftime('%Y-%m') else f' in {month}'
+    for scope, spent, limit, label in checks:
+        for threshold in crossed_thresholds(spent, limit, thresholds):
+            if not storage.record_alert(cur, user_id, month, scope, threshold):
+                continue
+            percentage = spent / limit * 100
+            message = f"Alert!  You've spent {percentage:.1f}% of {label}{period} ({spent:.2f}/{limit:.2f})"
+            notification_type = ALERT_TYPES.get(threshold, 'warning')
+            notification_id = storage.add_notification(cur, user_id, message, notification_type)
+            created.append({'id': notification_id, 'message': message, 'type': notification_type, 'is_read': False})
+    return created
+
+# ==================== Engine ====================
+
+class AlertEngine:
+    """Owns the alert queue and, for the in-process backend, its worker thread.
+
+    `process(user_id, month)` is supplied by the app and does the database work
+    inside an app context; the engine only handles queuing and the worker loop.
+    """
+
+    def __init__(self, app=None, process=None):
+        self.queue = None
+        self.process = process
+        self._worker = None
+        self._start_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ALERT_QUEUE', 'memory')
+        app.config.setdefault('ALERT_QUEUE_OPTIONS', {})
+        app.config.setdefault('ALERT_THRESHOLDS', (50, 80, 100))
+        self.embedded = app.config['ALERT_QUEUE'] == 'memory'
+        self.queue = QUEUES[app.config['ALERT_QUEUE']](**app.config['ALERT_QUEUE_OPTIONS'])
+        app.extensions['alert_engine'] = self
+
+    def enqueue(self, user_id, month):
+        self.queue.put(user_id, month)
+        if self.embedded and self._worker is None:
+            self._start_worker()
+
+    def _start_worker(self):
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self.run, name='alert-worker', daemon=True)
+                self._worker.start()
+
+    def run(self, poll_interval=1.0, stop=None):
+        while stop is None or not stop.is_set():
+            job = self.queue.get(timeout=poll_interval)
+            if job is None:
+                continue
+            try:
+                self.process(*job)
+            except Exception:
+                logger.exception('Alert evaluation failed for user %s month %s', *job)
@@ -1,11 +1,39 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from flask_mysqldb import MySQL
-from flask_bcrypt import Bcrypt
+from flask import Flask, request, jsonify, session, redirect, url_for, Response, send_file, stream_with_context
+from flask.cli import AppGroup
+from werkzeug.datastructures import MultiDict
 from functools import wraps
-from datetime import datetime, timedelta
+from collections import namedtuple
+from datetime import datetime, timedelta, date
+from decimal import Decimal, InvalidOperation
 from cryptography.fernet import Fernet
+from alerts import AlertEngine, evaluate_alerts
+from assets import Assets, build as build_assets, clean as clean_assets
+from benchmark import (
+    BENCH_EMAIL_DOMAIN, BENCH_PASSWORD, DEFAULT_MIX, HTTPClient, InProcessClient,
+    compare as compare_benchmarks, environment, parse_mix, run as run_benchmark, seed as seed_benchmark
+)
+from cache import ResponseCache
+from compression import Compression
+from card_crypto import CardCipher, backfill_masked_batch, key_id, key_usage, rotate_batch
+from db import Database
+from events import EventBus
+from exporters import EXPORT_FORMATS, parquet_available
+from forecast import USER_SERIES_QUERY as FORECAST_SERIES_QUERY, ForecastEngine, forecast_available
+from instrumentation import Instrumentation
+from json_provider import FinanceJSONProvider, to_columns, wants_columns
+from importers import PARSERS as IMPORT_PARSERS, ImportRowError, detect_format, validate_row as validate_import_row
+from passwords import PasswordHasher, PasswordPoolBusy
+from recurring import DUE_RULES_QUERY, RULE_COLUMNS as RECURRING_RULE_COLUMNS, RecurringScheduler, RuleError, first_due, validate_rule as validate_recurring_rule
+from reports import FORMATS as REPORT_FORMATS, JOB_COLUMNS as REPORT_JOB_COLUMNS, ReportQueue, ReportQueueFull, ReportSpecError, normalize_spec as normalize_report_spec, pdf_available
 import os
+import sys
 import json
+import click
+import base64
+import hmac
+import csv
+import re
+import time
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ. get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -13,17 +41,136 @@ app.config['MYSQL_HOST'] = os.environ.get('MYSQL_HOST', 'localhost')
 app.config['MYSQL_USER'] = os.environ.get('MYSQL_USER', 'root')
 app.config['MYSQL_PASSWORD'] = os.environ.get('MYSQL_PASSWORD', '')
 app.config['MYSQL_DB'] = os.environ.get('MYSQL_DB', 'finance_tracker')
+app.config['DB_ENGINE'] = os.environ.get('DB_ENGINE', 'mysql')
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+app.config['SQLITE_PATH'] = os.environ.get('SQLITE_PATH', os.path.join(app.instance_path, 'finance_tracker.db'))
+# Development convenience: migrates the schema on startup; data backfills need `flask db upgrade`
+app.config['DB_AUTO_MIGRATE'] = os.environ.get('DB_AUTO_MIGRATE', '').lower() in ('1', 'true', 'yes')
+# Comma-separated read replicas: MySQL 'host[:port]' entries, or SQLite file paths
+app.config['DB_REPLICAS'] = [r.strip() for r in os.environ.get('DB_REPLICAS', '').split(',') if r.strip()]
+app.config['DB_REPLICA_MAX_LAG'] = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+app.config['DB_READ_YOUR_WRITES_WINDOW'] = float(os.environ.get('DB_READ_YOUR_WRITES_WINDOW', 30))
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600
+app.config['EXPENSES_PAGE_SIZE'] = int(os.environ.get('EXPENSES_PAGE_SIZE', 100))
+app.config['EXPENSES_MAX_PAGE_SIZE'] = int(os.environ.get('EXPENSES_MAX_PAGE_SIZE', 1000))
+app.config['DASHBOARD_RECENT_EXPENSES'] = 5
+app.config['SEARCH_MAX_TERMS'] = 8
+app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+app.config['IMPORT_MAX_REPORTED_ERRORS'] = 100
+app.config['ALERT_QUEUE'] = os.environ.get('ALERT_QUEUE', 'memory')
+app.config['ALERT_THRESHOLDS'] = tuple(int(t) for t in os.environ.get('ALERT_THRESHOLDS', '50,80,100').split(','))
+# 'memory' is per process: single-process deployments only (see cache.py)
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+app.config['EVENTS_BROKER'] = os.environ.get('EVENTS_BROKER', 'memory')
+app.config['JSON_MONEY_ENCODING'] = os.environ.get('JSON_MONEY_ENCODING', 'number')
+app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 500))
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+app.config['PROFILE_THRESHOLD_MS'] = float(os.environ.get('PROFILE_THRESHOLD_MS', 250))
+# Bearer token for /metrics and /internal/*; those routes are disabled while it is unset
+app.config['INTERNAL_TOKEN'] = os.environ.get('INTERNAL_TOKEN', '')
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+app.config['PASSWORD_POOL_WORKERS'] = int(os.environ.get('PASSWORD_POOL_WORKERS', 2))
+app.config['PASSWORD_POOL_QUEUE'] = int(os.environ.get('PASSWORD_POOL_QUEUE', 8))
+app.config['PASSWORD_POOL_TIMEOUT'] = float(os.environ.get('PASSWORD_POOL_TIMEOUT', 5))
+app.config['ASYNC_DB_POOL_SIZE'] = int(os.environ.get('ASYNC_DB_POOL_SIZE', 20))
+app.config['ASGI_WSGI_THREADS'] = int(os.environ.get('ASGI_WSGI_THREADS', 16))
+app.config['FORECAST_CACHE_TTL'] = int(os.environ.get('FORECAST_CACHE_TTL', 86400))
+app.config['RECURRING_TICK_INTERVAL'] = float(os.environ.get('RECURRING_TICK_INTERVAL', 60))
+app.config['REPORT_WORKERS'] = int(os.environ.get('REPORT_WORKERS', 2))
+app.config['REPORT_EMBEDDED_WORKERS'] = os.environ.get('REPORT_EMBEDDED_WORKERS', 'true').lower() in ('1', 'true', 'yes')
+app.config['REPORT_ARTIFACT_MAX_BYTES'] = int(os.environ.get('REPORT_ARTIFACT_MAX_BYTES', 256 * 1024 * 1024))
+app.config['ASSETS_DEBUG'] = os.environ.get('ASSETS_DEBUG', '').lower() in ('1', 'true', 'yes')
 
 # Initialize extensions
-mysql = MySQL(app)
-bcrypt = Bcrypt(app)
+app.json = FinanceJSONProvider(app)
+db = Database(app)
+bcrypt = PasswordHasher(app)
+response_cache = ResponseCache(app)
+event_bus = EventBus(app)
+instrumentation = Instrumentation(app, db)
+compression = Compression(app)
+assets = Assets(app)
+forecast_engine = ForecastEngine(app, db)
+alert_engine = AlertEngine(app, process=lambda user_id, month: process_spending_alerts(user_id, month))
+recurring_scheduler = RecurringScheduler(app, db, on_batch=lambda users: process_recurring_batch(users))
+report_queue = ReportQueue(app, db, publish=lambda user_id, job: publish_events(user_id, [('report_job', report_job_view(job))]))
 
-# Encryption key for card numbers (store this securely in production)
-ENCRYPTION_KEY = os.environ.get('ENCRYPTION_KEY') or Fernet.generate_key()
-cipher_suite = Fernet(ENCRYPTION_KEY)
+# Encryption keys for card numbers (store these securely in production).
+# ENCRYPTION_KEYS is a comma-separated list, newest first: prepend a new key to
+# rotate, run `flask cards rotate`, then drop the old key once it has no rows.
+ENCRYPTION_KEYS = os.environ.get('ENCRYPTION_KEYS') or os.environ.get('ENCRYPTION_KEY') or Fernet.generate_key().decode()
+cipher_suite = CardCipher([key.strip() for key in ENCRYPTION_KEYS.split(',') if key.strip()])
+
+# Helper function to fill in the masked numbers of cards added before migration 0004; returns how many
+def backfill_card_masks(batch_size=500):
+    after_id, total = 0, 0
+    while after_id is not None:
+        with db.transaction() as cur:
+            updated, user_ids, after_id = backfill_masked_batch(cur, db.storage, cipher_suite, after_id, batch_size)
+        for user_id in user_ids:
+            response_cache.invalidate(user_id, 'cards')
+        total += updated
+    return total
+
+# ==================== Shared Queries ====================
+# Hot-path SQL used by more than one route (or by both the WSGI views and the
+# async views in asgi.py), and checked by `flask db explain`.
+
+EXPENSE_KEYSET_CLAUSE = " AND (e.expense_date < %s OR (e.expense_date = %s AND e.id < %s))"
+EXPENSE_ORDER_CLAUSE = " ORDER BY e.expense_date DESC, e.id DESC"
+
+LIST_CARDS_QUERY = "SELECT id, card_number_masked as card_number, card_type, card_holder, expiry_date, balance, created_at FROM cards WHERE user_id = %s"
+
+RECENT_NOTIFICATIONS_QUERY = "SELECT id, message, type, is_read, created_at FROM notifications WHERE user_id = %s ORDER BY created_at DESC LIMIT 50"
+
+NEW_NOTIFICATIONS_QUERY = "SELECT id, message, type, is_read, created_at FROM notifications WHERE user_id = %s AND id > %s ORDER BY id DESC LIMIT 50"
+
+UNREAD_COUNT_QUERY = "SELECT unread_notifications FROM users WHERE id = %s"
+
+LOGIN_QUERY = "SELECT id, username, password_hash FROM users WHERE email = %s"
+
+PROFILE_QUERY = "SELECT id, username, email, monthly_salary, created_at FROM users WHERE id = %s"
+
+SALARY_QUERY = "SELECT monthly_salary FROM users WHERE id = %s"
+
+CARD_BALANCE_QUERY = "SELECT SUM(balance) as total FROM cards WHERE user_id = %s"
+
+LIST_BUDGETS_QUERY = "SELECT category, monthly_limit FROM category_budgets WHERE user_id = %s ORDER BY category"
+
+# Salary, card balance and unread count in a single round trip
+DASHBOARD_USER_QUERY = """
+    SELECT u.monthly_salary, u.unread_notifications as unread_count,
+           (SELECT SUM(balance) FROM cards WHERE user_id = u.id) as total_balance
+    FROM users u
+    WHERE u.id = %s
+"""
+
+MONTH_TOTAL_QUERY = "SELECT SUM(total) as total FROM expense_rollups WHERE user_id = %s AND month = %s"
+
+MONTHLY_ANALYTICS_QUERY = """
+    SELECT month, SUM(total) as total
+    FROM expense_rollups
+    WHERE user_id = %s AND month >= %s AND expense_count > 0
+    GROUP BY month
+    ORDER BY month
+"""
+
+CATEGORY_ANALYTICS_QUERY = """
+    SELECT category, total
+    FROM expense_rollups
+    WHERE user_id = %s AND month = %s AND expense_count > 0
+    ORDER BY total DESC
+"""
+
+ROLLUP_WINDOW_QUERY = """
+    SELECT month, category, total
+    FROM expense_rollups
+    WHERE user_id = %s AND month >= %s AND expense_count > 0
+"""
 
 # Authentication decorator
 def login_required(f):
@@ -34,17 +181,517 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Helper function to encrypt card number
+# Helper function to answer a request the password pool refused or timed out
+def password_busy_response(e):
+    response = jsonify({'error': str(e)})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, e.status
+
+# Helper function to encrypt card number (returns the ciphertext, masked and key id columns)
 def encrypt_card_number(card_number):
-    return cipher_suite.encrypt(card_number.encode()).decode()
+    return cipher_suite.encrypt(card_number)
 
 # Helper function to decrypt card number
 def decrypt_card_number(encrypted_card):
-    return cipher_suite.decrypt(encrypted_card. encode()).decode()
+    return cipher_suite.decrypt(encrypted_card)
+
+# Helper function to build an opaque keyset cursor from the last row of a page
+def encode_expense_cursor(expense_date, expense_id):
+    if isinstance(expense_date, datetime):
+        expense_date = expense_date.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(expense_date, date):
+        expense_date = expense_date.strftime('%Y-%m-%d')
+    token = f"{expense_date}|{expense_id}".encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+# Helper function to decode a keyset cursor into (expense_date, id)
+def decode_expense_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        expense_date, expense_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        datetime.fromisoformat(expense_date)
+        return expense_date, int(expense_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+# Helper function to check whether the client asked for a streamed NDJSON response
+def wants_ndjson():
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+# Helper function to answer a list endpoint as row objects or, with ?format=columns, column arrays
+def jsonify_rows(rows):
+    return jsonify(to_columns(rows) if wants_columns() else rows)
+
+# Helper function to build an opaque cursor for relevance-ordered search pages (a row offset)
+def encode_offset_cursor(offset):
+    return base64.urlsafe_b64encode(f"offset|{offset}".encode()).decode().rstrip('=')
+
+# Helper function to decode a relevance page cursor into its row offset
+def decode_offset_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        kind, offset = base64.urlsafe_b64decode(padded).decode().split('|')
+        offset = int(offset)
+        return offset if kind == 'offset' and offset >= 0 else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+# Helper function to check the start_date/end_date filters in args; returns a 400 message or None
+def date_filter_error(args):
+    for name in ('start_date', 'end_date'):
+        if args.get(name):
+            try:
+                date.fromisoformat(args[name][:10])
+            except ValueError:
+                return f'{name} must be a date (YYYY-MM-DD)'
+    return None
+
+# Helper function to build the expense listing query with the date/category filters in args
+def build_expense_query(user_id, args, join=''):
+    query = """
+        SELECT e.id, e.description, e.amount, e.category, e.expense_date, e.created_at,
+               c.card_type, c.card_holder
+        FROM expenses e
+        LEFT JOIN cards c ON e.card_id = c.id""" + join + """
+        WHERE e.user_id = %s
+    """
+    params = [user_id]
+    
+    if args.get('start_date'):
+        query += " AND e.expense_date >= %s"
+        params.append(args['start_date'])
+    
+    # Half-open upper bound so the whole end day is included for DATE and DATETIME columns
+    if args.get('end_date'):
+        query += " AND e.expense_date < %s"
+        params.append(date.fromisoformat(args['end_date'][:10]) + timedelta(days=1))
+    
+    if args.get('category'):
+        query += " AND e.category = %s"
+        params.append(args['category'])
+    
+    return query, params
+
+# Helper function to turn listing args into (query, params, limit, error); error is a 400 message
+def expense_listing(user_id, args, stream):
+    # Page size: bounded for JSON pages, optional for NDJSON streams
+    limit = args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return None, None, None, 'limit must be a positive integer'
+    if not stream:
+        limit = min(limit or app.config['EXPENSES_PAGE_SIZE'], app.config['EXPENSES_MAX_PAGE_SIZE'])
+    
+    error = date_filter_error(args)
+    if error:
+        return None, None, None, error
+    
+    cursor_token = args.get('cursor')
+    after = None
+    if cursor_token:
+        after = decode_expense_cursor(cursor_token)
+        if after is None:
+            return None, None, None, 'Invalid cursor'
+    
+    query, params = build_expense_query(user_id, args)
+    
+    # Keyset pagination: continue strictly after the last (expense_date, id) seen
+    if after:
+        query += EXPENSE_KEYSET_CLAUSE
+        params.extend([after[0], after[0], after[1]])
+    
+    query += EXPENSE_ORDER_CLAUSE
+    
+    if stream:
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+    else:
+        # Fetch one extra row to know whether another page exists
+        query += " LIMIT %s"
+        params.append(limit + 1)
+    
+    return query, tuple(params), limit, None
+
+# Helper function to split a search string into the word prefixes the full-text index matches
+def search_terms(text):
+    return re.findall(r'[^\W_]+', text.lower())[:app.config['SEARCH_MAX_TERMS']]
+
+# Helper function to turn search args into (query, params, limit, offset, error); error is a 400 message.
+# offset is set for relevance order (paged by offset) and None for date order (keyset paged).
+def expense_search(user_id, args):
+    limit = args.get('limit', type=int)
+    if limit is not None and limit <= 0:
+        return None, None, None, None, 'limit must be a positive integer'
+    limit = min(limit or app.config['EXPENSES_PAGE_SIZE'], app.config['EXPENSES_MAX_PAGE_SIZE'])
+    
+    terms = search_terms(args.get('q', ''))
+    sort = args.get('sort') or ('relevance' if terms else 'date')
+    if sort not in ('relevance', 'date'):
+        return None, None, None, None, "sort must be 'relevance' or 'date'"
+    if sort == 'relevance' and not terms:
+        return None, None, None, None, 'sort=relevance needs search terms in q'
+    
+    error = date_filter_error(args)
+    if error:
+        return None, None, None, None, error
+    
+    join, score, score_params = '', None, []
+    if terms:
+        join, condition, condition_params, score, score_params = db.storage.text_search(user_id, terms, ranked=sort == 'relevance')
+    
+    query, params = build_expense_query(user_id, {'start_date': args.get('start_date'), 'end_date': args.get('end_date')}, join)
+    
+    if terms:
+        query += " AND " + condition
+        params.extend(condition_params)
+    
+    # ?category=Food&category=Rent or ?category=Food,Rent
+    categories = [c.strip() for value in args.getlist('category') for c in value.split(',') if c.strip()]
+    if categories:
+        query += f" AND e.category IN ({', '.join(['%s'] * len(categories))})"
+        params.extend(categories)
+    
+    if args.get('card_id'):
+        card_id = args.get('card_id', type=int)
+        if card_id is None:
+            return None, None, None, None, 'card_id must be an integer'
+        query += " AND e.card_id = %s"
+        params.append(card_id)
+    
+    for name, operator in (('amount_min', '>='), ('amount_max', '<=')):
+        if args.get(name):
+            try:
+                amount = Decimal(args[name])
+            except InvalidOperation:
+                amount = None
+            if amount is None or not amount.is_finite():
+                return None, None, None, None, f'{name} must be a number'
+            query += f" AND e.amount {operator} %s"
+            params.append(amount)
+    
+    cursor_token = args.get('cursor')
+    if sort == 'relevance':
+        # Scores are not stable keys, so relevance pages continue by offset
+        offset = decode_offset_cursor(cursor_token) if cursor_token else 0
+        if offset is None:
+            return None, None, None, None, 'Invalid cursor'
+        query += f" ORDER BY {score} DESC, e.id DESC LIMIT %s OFFSET %s"
+        params.extend([*score_params, limit + 1, offset])
+        return query, tuple(params), limit, offset, None
+    
+    if cursor_token:
+        after = decode_expense_cursor(cursor_token)
+        if after is None:
+            return None, None, None, None, 'Invalid cursor'
+        query += EXPENSE_KEYSET_CLAUSE
+        params.extend([after[0], after[0], after[1]])
+    
+    query += EXPENSE_ORDER_CLAUSE + " LIMIT %s"
+    params.append(limit + 1)
+    return query, tuple(params), limit, None, None
+
+# Helper function to answer one page of an expense listing or search, linking the next page if there is one
+def expense_page_response(expenses, limit, offset=None):
+    has_more = len(expenses) > limit
+    expenses = expenses[:limit]
+    
+    response = jsonify_rows(expenses)
+    if has_more:
+        if offset is not None:
+            next_cursor = encode_offset_cursor(offset + limit)
+        else:
+            last = expenses[-1]
+            next_cursor = encode_expense_cursor(last['expense_date'], last['id'])
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = '<%s>; rel="next"' % url_for(
+            request.endpoint, **{**request.args.to_dict(flat=False), 'cursor': next_cursor}
+        )
+    return response
+
+# Helper generator yielding expense rows from a server-side cursor without buffering the result
+def iter_expenses_unbuffered(query, params):
+    with db.cursor(unbuffered=True) as cur:
+        cur.execute(query, params)
+        yield from cur
+
+# Helper function to get the 'YYYY-MM' rollup bucket of an expense date
+def expense_month(expense_date):
+    if isinstance(expense_date, (datetime, date)):
+        return expense_date.strftime('%Y-%m')
+    return datetime.fromisoformat(str(expense_date)[:10]).strftime('%Y-%m')
+
+# Helper function to get a user's total spending for one month from the rollup
+def get_month_total(cur, user_id, month):
+    cur.execute(MONTH_TOTAL_QUERY, (user_id, month))
+    return month_total_value(cur.fetchone())
+
+# Helper function to read the total off a MONTH_TOTAL_QUERY row
+def month_total_value(result):
+    # SUM() over DECIMAL is a Decimal on MySQL but a float on SQLite
+    return Decimal(str(result['total'])) if result['total'] is not None else Decimal('0')
+
+# Helper function to build the analytics summary from salary, month total and card balance
+def build_summary(monthly_salary, total_expenses, total_balance, current_month):
+    monthly_salary = monthly_salary or 0
+    return {
+        'monthly_salary': monthly_salary,
+        'total_expenses': total_expenses,
+        'remaining_balance': monthly_salary - total_expenses,
+        'total_balance': total_balance or 0,
+        'current_month': current_month
+    }
+
+# Helper function to assemble the dashboard payload from its four query results
+def build_dashboard(user, rollups, recent_expenses, notifications):
+    current_month = datetime.now().strftime('%Y-%m')
+    
+    monthly_totals = {}
+    category_totals = []
+    for row in rollups:
+        total = row['total']
+        monthly_totals[row['month']] = monthly_totals.get(row['month'], 0) + total
+        if row['month'] == current_month:
+            category_totals.append({'category': row['category'], 'total': total})
+    category_totals.sort(key=lambda item: item['total'], reverse=True)
+    
+    return {
+        'summary': build_summary(
+            user['monthly_salary'], monthly_totals.get(current_month, 0), user['total_balance'], current_month
+        ),
+        'monthly': [{'month': month, 'total': monthly_totals[month]} for month in sorted(monthly_totals)],
+        'category': category_totals,
+        'recent_expenses': recent_expenses,
+        'notifications': notifications,
+        'unread_count': int(user['unread_count'])
+    }
+
+# Helper function to get the 'YYYY-MM' label of the month n months before the current one
+def months_ago(n):
+    today = datetime.now()
+    year, month = divmod(today.year * 12 + today.month - 1 - n, 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+# Helper function to evaluate spending alerts for one user/month; runs on the alert worker
+def process_spending_alerts(user_id, month):
+    with app.app_context():
+        with db.transaction() as cur:
+            created = evaluate_alerts(cur, db.storage, user_id, month, app.config['ALERT_THRESHOLDS'])
+            if created:
+                cur.execute(UNREAD_COUNT_QUERY, (user_id,))
+                unread_count = cur.fetchone()['unread_notifications']
+    if created:
+        response_cache.invalidate(user_id, 'notifications')
+        publish_events(user_id, [('notification', n) for n in created] + [('unread_count', {'unread_count': unread_count})])
+
+# Helper function to read the rollup totals a write just changed, as live events
+def rollup_events(cur, user_id, buckets):
+    events = []
+    for month in sorted({month for month, _ in buckets}):
+        events.append(('month_total', {'month': month, 'total': float(get_month_total(cur, user_id, month))}))
+    for month, category in sorted(buckets):
+        cur.execute(
+            "SELECT total FROM expense_rollups WHERE user_id = %s AND month = %s AND category = %s",
+            (user_id, month, category)
+        )
+        row = cur.fetchone()
+        events.append(('category_total', {'month': month, 'category': category, 'total': float(row['total']) if row else 0}))
+    return events
+
+# Helper function to read a user's total card balance as a live event
+def balance_event(cur, user_id):
+    cur.execute(CARD_BALANCE_QUERY, (user_id,))
+    total = cur.fetchone()['total']
+    return ('balance', {'total_balance': float(total) if total else 0})
+
+# Helper function to push events to the user's open /api/events streams (call after commit)
+def publish_events(user_id, events):
+    for name, data in events:
+        event_bus.publish(user_id, name, data)
+
+# Helper function to queue spending alert checks for the months a write touched (default: the current month)
+def queue_spending_alerts(user_id, months=None):
+    for month in sorted(set(months or [datetime.now().strftime('%Y-%m')])):
+        alert_engine.enqueue(user_id, month)
+
+# Helper function to name the cache/event backends whose writes only reach this process
+def process_local_backends():
+    local = []
+    if not response_cache.shared:
+        local.append(f"CACHE_BACKEND={app.config['CACHE_BACKEND']}")
+    if not event_bus.shared:
+        local.append(f"EVENTS_BROKER={app.config['EVENTS_BROKER']}")
+    return local
+
+# Helper function to follow up a committed batch of recurring occurrences; runs on the scheduler
+def process_recurring_batch(users):
+    current_month = datetime.now().strftime('%Y-%m')
+    for user_id, summary in users.items():
+        response_cache.invalidate(user_id, 'expenses')
+        # Catch-up occurrences in past months cannot cross this month's thresholds
+        if current_month in summary['months']:
+            alert_engine.enqueue(user_id, current_month)
+        publish_events(user_id, [('recurring_expenses', {'inserted': summary['inserted']})])
+
+# ==================== Shared View Bodies ====================
+# The read views that asgi.py also serves as coroutines are written once, as
+# generators: a body yields each piece of I/O it needs as a step, is sent the
+# step's result, and returns the response. run_view() performs the steps with
+# db.cursor() and blocking calls; asgi.run_view_async() performs the same steps
+# with awaits. The SQL, validation and response shaping live only here.
+
+# Step: run a query and send back its first row (one=True) or all rows
+Fetch = namedtuple('Fetch', 'query params one', defaults=(False,))
+# Step: send back whether password matches password_hash (bcrypt, off the request thread)
+CheckPassword = namedtuple('CheckPassword', 'password_hash password')
+# Step: call a blocking app function (e.g. a write) and send back its result
+Call = namedtuple('Call', 'fn args')
+# Step: send back an iterable of NDJSON lines for every row of a query, read unbuffered
+StreamRows = namedtuple('StreamRows', 'query params')
+
+# Helper function to run a view body on the WSGI side; returns its response
+def run_view(body):
+    result = None
+    try:
+        while True:
+            step = body.send(result)
+            if isinstance(step, Fetch):
+                with db.cursor() as cur:
+                    cur.execute(step.query, step.params)
+                    result = cur.fetchone() if step.one else cur.fetchall()
+            elif isinstance(step, CheckPassword):
+                result = bcrypt.check_password_hash(step.password_hash, step.password)
+            elif isinstance(step, StreamRows):
+                rows = iter_expenses_unbuffered(step.query, step.params)
+                result = stream_with_context(app.json.dumps(row) + '\n' for row in rows)
+            else:
+                result = step.fn(*step.args)
+    except StopIteration as done:
+        return done.value
+
+def login_body(data):
+    email = data.get('email')
+    password = data.get('password')
+    
+    if not email or not password:
+        return jsonify({'error': 'Email and password are required'}), 400
+    
+    user = yield Fetch(LOGIN_QUERY, (email,), one=True)
+    
+    if not user or not (yield CheckPassword(user['password_hash'], password)):
+        return jsonify({'error': 'Invalid credentials'}), 401
+    
+    # Upgrade hashes made with a different cost while we still have the plaintext
+    if bcrypt.needs_rehash(user['password_hash']):
+        yield Call(rehash_password, (user['id'], user['password_hash'], password))
+    
+    # Create session
+    session['user_id'] = user['id']
+    session['username'] = user['username']
+    
+    return jsonify({'message': 'Login successful', 'username': user['username']}), 200
+
+def profile_body(user_id):
+    user = yield Fetch(PROFILE_QUERY, (user_id,), one=True)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify(user), 200
 
-# Helper function to mask card number
-def mask_card_number(card_number):
-    return '**** **** **** ' + card_number[-4:]
+def cards_body(user_id):
+    # The masked number is stored at add time, so listing does no decryption
+    cards = yield Fetch(LIST_CARDS_QUERY, (user_id,))
+    return jsonify(cards), 200
+
+def expenses_body(user_id, args):
+    stream = wants_ndjson()
+    query, params, limit, error = expense_listing(user_id, args, stream)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if stream:
+        lines = yield StreamRows(query, params)
+        return Response(lines, mimetype='application/x-ndjson')
+    
+    expenses = yield Fetch(query, params)
+    return expense_page_response(expenses, limit), 200
+
+def search_body(user_id, args):
+    query, params, limit, offset, error = expense_search(user_id, args)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    expenses = yield Fetch(query, params)
+    return expense_page_response(expenses, limit, offset), 200
+
+def summary_body(user_id):
+    # Get user's monthly salary
+    user = yield Fetch(SALARY_QUERY, (user_id,), one=True)
+    
+    # Get current month's total expenses
+    current_month = datetime.now().strftime('%Y-%m')
+    total_expenses = month_total_value((yield Fetch(MONTH_TOTAL_QUERY, (user_id, current_month), one=True)))
+    
+    # Get total balance from all cards
+    result = yield Fetch(CARD_BALANCE_QUERY, (user_id,), one=True)
+    
+    return jsonify(build_summary(user['monthly_salary'], total_expenses, result['total'], current_month)), 200
+
+def monthly_analytics_body(user_id):
+    # Get last 6 months
+    monthly_data = yield Fetch(MONTHLY_ANALYTICS_QUERY, (user_id, months_ago(6)))
+    return jsonify_rows(monthly_data), 200
+
+def category_analytics_body(user_id, month):
+    category_data = yield Fetch(CATEGORY_ANALYTICS_QUERY, (user_id, month))
+    return jsonify_rows(category_data), 200
+
+def budgets_body(user_id):
+    budgets = yield Fetch(LIST_BUDGETS_QUERY, (user_id,))
+    return jsonify(budgets), 200
+
+def dashboard_body(user_id):
+    # Everything the dashboard page renders, in one response and four queries
+    user = yield Fetch(DASHBOARD_USER_QUERY, (user_id,), one=True)
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    # One rollup read feeds the summary total, the monthly chart and the category chart
+    rollups = yield Fetch(ROLLUP_WINDOW_QUERY, (user_id, months_ago(6)))
+    
+    query, params = build_expense_query(user_id, {})
+    recent_expenses = yield Fetch(query + EXPENSE_ORDER_CLAUSE + " LIMIT %s", (*params, app.config['DASHBOARD_RECENT_EXPENSES']))
+    
+    notifications = yield Fetch(RECENT_NOTIFICATIONS_QUERY, (user_id,))
+    
+    return jsonify(build_dashboard(user, rollups, recent_expenses, notifications)), 200
+
+def notifications_body(user_id, since):
+    # since=<id> returns only notifications newer than the last one the client has
+    if since is not None:
+        notifications = yield Fetch(NEW_NOTIFICATIONS_QUERY, (user_id, since))
+    else:
+        notifications = yield Fetch(RECENT_NOTIFICATIONS_QUERY, (user_id,))
+    
+    return jsonify(notifications), 200
+
+def unread_count_body(user_id):
+    user = yield Fetch(UNREAD_COUNT_QUERY, (user_id,), one=True)
+    
+    if not user:
+        return jsonify({'error': 'User not found'}), 404
+    
+    return jsonify({'unread_count': int(user['unread_notifications'])}), 200
+
+# Helper function to wrap a user's live event stream (sync or async iterator) in an SSE response
+def event_stream_response(events):
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies (nginx) from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 # ==================== ROUTES - Pages ====================
 
@@ -52,51 +699,51 @@ def mask_card_number(card_number):
 def index():
     if 'user_id' in session:
         return redirect(url_for('dashboard'))
-    return render_template('index.html')
+    return assets.render_page('index.html')
 
 @app.route('/login')
 def login_page():
-    return render_template('login.html')
+    return assets.render_page('login.html')
 
 @app.route('/signup')
 def signup_page():
-    return render_template('signup.html')
+    return assets.render_page('signup.html')
 
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('dashboard.html')
+    return assets.render_page('dashboard.html')
 
 @app.route('/cards')
 def cards_page():
     if 'user_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('cards.html')
+    return assets.render_page('cards.html')
 
 @app.route('/expenses')
 def expenses_page():
     if 'user_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('expenses.html')
+    return assets.render_page('expenses.html')
 
 @app.route('/settings')
 def settings_page():
     if 'user_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('settings.html')
+    return assets.render_page('settings.html')
 
 @app.route('/reports')
 def reports_page():
     if 'user_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('reports.html')
+    return assets.render_page('reports.html')
 
 @app.route('/notifications')
 def notifications_page():
     if 'user_id' not in session:
         return redirect(url_for('login_page'))
-    return render_template('notifications.html')
+    return assets.render_page('notifications.html')
 
 # ==================== API ROUTES - Authentication ====================
 
@@ -112,24 +759,20 @@ def register():
             return jsonify({'error': 'All fields are required'}), 400
         
         # Hash password
-        password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
-        
-        cur = mysql.connection.cursor()
-        
-        # Check if user already exists
-        cur.execute("SELECT id FROM users WHERE email = %s OR username = %s", (email, username))
-        if cur.fetchone():
-            cur.close()
-            return jsonify({'error': 'User already exists'}), 400
-        
-        # Insert new user
-        cur.execute(
-            "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
-            (username, email, password_hash)
-        )
-        mysql.connection.commit()
-        user_id = cur.lastrowid
-        cur.close()
+        password_hash = bcrypt.generate_password_hash(password)
+        
+        with db.transaction() as cur:
+            # Check if user already exists
+            cur.execute("SELECT id FROM users WHERE email = %s OR username = %s", (email, username))
+            if cur.fetchone():
+                return jsonify({'error': 'User already exists'}), 400
+            
+            # Insert new user
+            cur.execute(
+                "INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)",
+                (username, email, password_hash)
+            )
+            user_id = cur.lastrowid
         
         # Create session
         session['user_id'] = user_id
@@ -137,36 +780,36 @@ def register():
         
         return jsonify({'message': 'Registration successful', 'user_id': user_id}), 201
     
+    except PasswordPoolBusy as e:
+        return password_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/login', methods=['POST'])
 def login():
     try:
-        data = request.get_json()
-        email = data.get('email')
-        password = data.get('password')
-        
-        if not email or not password:
-            return jsonify({'error': 'Email and password are required'}), 400
-        
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT id, username, password_hash FROM users WHERE email = %s", (email,))
-        user = cur.fetchone()
-        cur. close()
-        
-        if not user or not bcrypt.check_password_hash(user['password_hash'], password):
-            return jsonify({'error': 'Invalid credentials'}), 401
-        
-        # Create session
-        session['user_id'] = user['id']
-        session['username'] = user['username']
-        
-        return jsonify({'message': 'Login successful', 'username': user['username']}), 200
+        return run_view(login_body(request.get_json()))
     
+    except PasswordPoolBusy as e:
+        return password_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Helper function to re-hash a password at the configured cost after a successful login
+def rehash_password(user_id, old_hash, password):
+    try:
+        new_hash = bcrypt.generate_password_hash(password)
+    except PasswordPoolBusy:
+        # The login already succeeded; upgrade on a quieter login instead
+        return
+    
+    with db.transaction() as cur:
+        # Skip if the password changed since we read the old hash
+        cur.execute(
+            "UPDATE users SET password_hash = %s WHERE id = %s AND password_hash = %s",
+            (new_hash, user_id, old_hash)
+        )
+
 @app.route('/api/logout', methods=['POST'])
 def logout():
     session.clear()
@@ -176,20 +819,10 @@ def logout():
 
 @app.route('/api/user/profile', methods=['GET'])
 @login_required
+@db.read_only
 def get_profile():
     try:
-        cur = mysql.connection.cursor()
-        cur.execute(
-            "SELECT id, username, email, monthly_salary, created_at FROM users WHERE id = %s",
-            (session['user_id'],)
-        )
-        user = cur.fetchone()
-        cur.close()
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        return jsonify(user), 200
+        return run_view(profile_body(session['user_id']))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -203,16 +836,15 @@ def update_profile():
         email = data.get('email')
         monthly_salary = data.get('monthly_salary')
         
-        cur = mysql.connection.cursor()
-        
         # Update user profile
-        cur.execute(
-            "UPDATE users SET username = %s, email = %s, monthly_salary = %s WHERE id = %s",
-            (username, email, monthly_salary, session['user_id'])
-        )
-        mysql.connection.commit()
-        cur.close()
+        with db.transaction() as cur:
+            cur.execute(
+                "UPDATE users SET username = %s, email = %s, monthly_salary = %s WHERE id = %s",
+                (username, email, monthly_salary, session['user_id'])
+            )
         
+        response_cache.invalidate(session['user_id'], 'profile')
+        queue_spending_alerts(session['user_id'])
         session['username'] = username
         
         return jsonify({'message': 'Profile updated successfully'}), 200
@@ -231,26 +863,26 @@ def change_password():
         if not current_password or not new_password:
             return jsonify({'error': 'All fields are required'}), 400
         
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT password_hash FROM users WHERE id = %s", (session['user_id'],))
-        user = cur.fetchone()
+        with db.cursor() as cur:
+            cur.execute("SELECT password_hash FROM users WHERE id = %s", (session['user_id'],))
+            user = cur.fetchone()
         
         if not user or not bcrypt.check_password_hash(user['password_hash'], current_password):
-            cur.close()
             return jsonify({'error': 'Current password is incorrect'}), 401
         
         # Hash new password
-        new_password_hash = bcrypt.generate_password_hash(new_password). decode('utf-8')
+        new_password_hash = bcrypt.generate_password_hash(new_password)
         
-        cur.execute(
-            "UPDATE users SET password_hash = %s WHERE id = %s",
-            (new_password_hash, session['user_id'])
-        )
-        mysql. connection.commit()
-        cur. close()
+        with db.transaction() as cur:
+            cur.execute(
+                "UPDATE users SET password_hash = %s WHERE id = %s",
+                (new_password_hash, session['user_id'])
+            )
         
         return jsonify({'message': 'Password changed successfully'}), 200
     
+    except PasswordPoolBusy as e:
+        return password_busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -258,23 +890,11 @@ def change_password():
 
 @app.route('/api/cards', methods=['GET'])
 @login_required
+@db.read_only
+@response_cache.cached('cards')
 def get_cards():
     try:
-        cur = mysql.connection. cursor()
-        cur.execute(
-            "SELECT id, card_number_encrypted, card_type, card_holder, expiry_date, balance, created_at FROM cards WHERE user_id = %s",
-            (session['user_id'],)
-        )
-        cards = cur.fetchall()
-        cur.close()
-        
-        # Mask card numbers
-        for card in cards:
-            decrypted = decrypt_card_number(card['card_number_encrypted'])
-            card['card_number'] = mask_card_number(decrypted)
-            del card['card_number_encrypted']
-        
-        return jsonify(cards), 200
+        return run_view(cards_body(session['user_id']))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -293,14 +913,17 @@ def add_card():
         # Encrypt card number
         encrypted_card = encrypt_card_number(card_number)
         
-        cur = mysql.connection.cursor()
-        cur.execute(
-            "INSERT INTO cards (user_id, card_number_encrypted, card_type, card_holder, expiry_date, balance) VALUES (%s, %s, %s, %s, %s, %s)",
-            (session['user_id'], encrypted_card, card_type, card_holder, expiry_date, balance)
-        )
-        mysql.connection.commit()
-        card_id = cur.lastrowid
-        cur.close()
+        with db.transaction() as cur:
+            cur.execute(
+                "INSERT INTO cards (user_id, card_number_encrypted, card_last_four, card_number_masked, card_key_id, card_type, card_holder, expiry_date, balance) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (session['user_id'], encrypted_card['card_number_encrypted'], encrypted_card['card_last_four'],
+                 encrypted_card['card_number_masked'], encrypted_card['card_key_id'], card_type, card_holder, expiry_date, balance)
+            )
+            card_id = cur.lastrowid
+            events = [balance_event(cur, session['user_id'])]
+        
+        response_cache.invalidate(session['user_id'], 'cards')
+        publish_events(session['user_id'], events)
         
         return jsonify({'message': 'Card added successfully', 'card_id': card_id}), 201
     
@@ -311,13 +934,15 @@ def add_card():
 @login_required
 def delete_card(card_id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute(
-            "DELETE FROM cards WHERE id = %s AND user_id = %s",
-            (card_id, session['user_id'])
-        )
-        mysql.connection.commit()
-        cur.close()
+        with db.transaction() as cur:
+            cur.execute(
+                "DELETE FROM cards WHERE id = %s AND user_id = %s",
+                (card_id, session['user_id'])
+            )
+            events = [balance_event(cur, session['user_id'])]
+        
+        response_cache.invalidate(session['user_id'], 'cards')
+        publish_events(session['user_id'], events)
         
         return jsonify({'message': 'Card deleted successfully'}), 200
     
@@ -328,47 +953,53 @@ def delete_card(card_id):
 
 @app.route('/api/expenses', methods=['GET'])
 @login_required
+@db.read_only
 def get_expenses():
     try:
-        # Get query parameters for filtering
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        category = request.args.get('category')
-        
-        cur = mysql.connection.cursor()
-        
-        query = """
-            SELECT e.id, e.description, e.amount, e.category, e.expense_date, e.created_at,
-                   c.card_type, c.card_holder
-            FROM expenses e
-            LEFT JOIN cards c ON e.card_id = c.id
-            WHERE e.user_id = %s
-        """
-        params = [session['user_id']]
-        
-        if start_date:
-            query += " AND e. expense_date >= %s"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND e.expense_date <= %s"
-            params.append(end_date)
-        
-        if category:
-            query += " AND e.category = %s"
-            params.append(category)
-        
-        query += " ORDER BY e.expense_date DESC"
-        
-        cur.execute(query, tuple(params))
-        expenses = cur.fetchall()
-        cur. close()
-        
-        # Convert Decimal to float for JSON serialization
-        for expense in expenses:
-            expense['amount'] = float(expense['amount'])
-        
-        return jsonify(expenses), 200
+        return run_view(expenses_body(session['user_id'], request.args))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/expenses/search', methods=['GET'])
+@login_required
+@db.read_only
+def search_expenses():
+    # ?q= description words (each matched as a prefix), category (repeatable or
+    # comma-separated), card_id, amount_min, amount_max, start_date, end_date;
+    # sort=relevance (default with q) or date, paged like /api/expenses
+    try:
+        return run_view(search_body(session['user_id'], request.args))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/expenses/export', methods=['GET'])
+@login_required
+@db.read_only
+def export_expenses():
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'Unsupported export format; use csv, columns or parquet'}), 400
+        if export_format == 'parquet' and not parquet_available():
+            return jsonify({'error': 'Parquet export requires pyarrow to be installed'}), 501
+        
+        error = date_filter_error(request.args)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        query, params = build_expense_query(session['user_id'], request.args)
+        query += EXPENSE_ORDER_CLAUSE
+        
+        writer, mimetype, extension = EXPORT_FORMATS[export_format]
+        rows = iter_expenses_unbuffered(query, tuple(params))
+        filename = f"expenses-{datetime.now().strftime('%Y%m%d')}.{extension}"
+        
+        response = Response(stream_with_context(writer(rows)), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -384,46 +1015,119 @@ def add_expense():
         expense_date = data.get('expense_date')
         card_id = data.get('card_id')
         
-        cur = mysql.connection.cursor()
-        cur.execute(
-            "INSERT INTO expenses (user_id, card_id, description, amount, category, expense_date) VALUES (%s, %s, %s, %s, %s, %s)",
-            (session['user_id'], card_id, description, amount, category, expense_date)
-        )
-        mysql. connection.commit()
-        expense_id = cur.lastrowid
+        if not category or amount is None or not expense_date:
+            return jsonify({'error': 'Amount, category and date are required'}), 400
         
-        # Check if spending exceeds 80% of monthly salary
-        cur.execute("SELECT monthly_salary FROM users WHERE id = %s", (session['user_id'],))
-        user = cur.fetchone()
-        monthly_salary = float(user['monthly_salary']) if user['monthly_salary'] else 0
-        
-        # Get current month's total expenses
-        current_month = datetime.now().strftime('%Y-%m')
-        cur.execute(
-            "SELECT SUM(amount) as total FROM expenses WHERE user_id = %s AND DATE_FORMAT(expense_date, '%%Y-%%m') = %s",
-            (session['user_id'], current_month)
-        )
-        result = cur.fetchone()
-        total_expenses = float(result['total']) if result['total'] else 0
-        
-        # Create notification if spending exceeds 80%
-        if monthly_salary > 0 and total_expenses >= (monthly_salary * 0.8):
-            percentage = (total_expenses / monthly_salary) * 100
-            message = f"Alert!  You've spent {percentage:.1f}% of your monthly salary ({total_expenses:.2f}/{monthly_salary:.2f})"
+        # Insert the expense and bump its rollup bucket in one transaction
+        with db.transaction() as cur:
             cur.execute(
-                "INSERT INTO notifications (user_id, message, type) VALUES (%s, %s, %s)",
-                (session['user_id'], message, 'warning')
+                "INSERT INTO expenses (user_id, card_id, description, amount, category, expense_date) VALUES (%s, %s, %s, %s, %s, %s)",
+                (session['user_id'], card_id, description, amount, category, expense_date)
             )
-            mysql.connection.commit()
+            expense_id = cur.lastrowid
+            db.storage.apply_rollup_delta(cur, session['user_id'], expense_month(expense_date), category, amount, 1)
+            
+            query, params = build_expense_query(session['user_id'], {})
+            cur.execute(query + " AND e.id = %s", (*params, expense_id))
+            expense = cur.fetchone()
+            expense['amount'] = float(expense['amount'])
+            events = [('expense', expense)] + rollup_events(cur, session['user_id'], [(expense_month(expense_date), category)])
         
-        cur.close()
+        response_cache.invalidate(session['user_id'], 'expenses')
+        queue_spending_alerts(session['user_id'], [expense_month(expense_date)])
+        publish_events(session['user_id'], events)
         
         return jsonify({'message': 'Expense added successfully', 'expense_id': expense_id}), 201
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app. route('/api/expenses/<int:expense_id>', methods=['PUT'])
+@app.route('/api/expenses/import', methods=['POST'])
+@login_required
+def import_expenses():
+    try:
+        user_id = session['user_id']
+        upload = request.files.get('file')
+        if upload:
+            stream, filename, mimetype = upload.stream, upload.filename, upload.mimetype
+        else:
+            stream, filename, mimetype = request.stream, None, request.mimetype
+        
+        file_format = request.args.get('format') or request.form.get('format') or detect_format(filename, mimetype)
+        if file_format not in IMPORT_PARSERS:
+            return jsonify({'error': 'Unsupported import format; use csv, json or ofx'}), 400
+        default_category = request.form.get('default_category') or request.args.get('default_category')
+        
+        batch_size = app.config['IMPORT_BATCH_SIZE']
+        max_errors = app.config['IMPORT_MAX_REPORTED_ERRORS']
+        started = time.perf_counter()
+        rows_read = imported = rejected = 0
+        errors = []
+        rollup_deltas = {}
+        batch = []
+        
+        insert_query = "INSERT INTO expenses (user_id, card_id, description, amount, category, expense_date) VALUES (%s, %s, %s, %s, %s, %s)"
+        
+        # Every batch goes into the same transaction; the rollup is adjusted once at the end
+        try:
+            with db.transaction() as cur:
+                cur.execute("SELECT id FROM cards WHERE user_id = %s", (user_id,))
+                card_ids = {row['id'] for row in cur.fetchall()}
+                
+                for row_number, fields in IMPORT_PARSERS[file_format](stream):
+                    rows_read += 1
+                    try:
+                        row = validate_import_row(fields, card_ids, default_category)
+                    except ImportRowError as e:
+                        rejected += 1
+                        if len(errors) < max_errors:
+                            errors.append({'row': row_number, 'error': str(e)})
+                        continue
+                    
+                    batch.append((user_id, row['card_id'], row['description'], row['amount'], row['category'], row['expense_date']))
+                    bucket = rollup_deltas.setdefault((expense_month(row['expense_date']), row['category']), [0, 0])
+                    bucket[0] += row['amount']
+                    bucket[1] += 1
+                    
+                    if len(batch) >= batch_size:
+                        cur.executemany(insert_query, batch)
+                        imported += len(batch)
+                        batch = []
+                
+                if batch:
+                    cur.executemany(insert_query, batch)
+                    imported += len(batch)
+                
+                if rollup_deltas:
+                    db.storage.apply_rollup_deltas(
+                        cur,
+                        [(user_id, month, category, total, count) for (month, category), (total, count) in rollup_deltas.items()]
+                    )
+        except (ImportRowError, UnicodeDecodeError, csv.Error) as e:
+            return jsonify({'error': f'Could not parse file: {e}'}), 400
+        
+        if imported:
+            response_cache.invalidate(user_id, 'expenses')
+            queue_spending_alerts(user_id, [month for month, _ in rollup_deltas])
+            # Possibly years of buckets; clients reload rather than apply per-bucket deltas
+            publish_events(user_id, [('expenses_imported', {'imported': imported})])
+        
+        elapsed = time.perf_counter() - started
+        return jsonify({
+            'message': f'Imported {imported} expenses',
+            'format': file_format,
+            'rows_read': rows_read,
+            'imported': imported,
+            'rejected': rejected,
+            'errors': errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(rows_read / elapsed, 1) if elapsed else None
+        }), 201 if imported else 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/expenses/<int:expense_id>', methods=['PUT'])
 @login_required
 def update_expense(expense_id):
     try:
@@ -434,13 +1138,31 @@ def update_expense(expense_id):
         expense_date = data.get('expense_date')
         card_id = data.get('card_id')
         
-        cur = mysql.connection.cursor()
-        cur.execute(
-            "UPDATE expenses SET description = %s, amount = %s, category = %s, expense_date = %s, card_id = %s WHERE id = %s AND user_id = %s",
-            (description, amount, category, expense_date, card_id, expense_id, session['user_id'])
-        )
-        mysql.connection.commit()
-        cur.close()
+        if not category or amount is None or not expense_date:
+            return jsonify({'error': 'Amount, category and date are required'}), 400
+        
+        # Move the old amount out of its rollup bucket and the new one in, atomically
+        with db.transaction() as cur:
+            cur.execute(
+                "SELECT amount, category, expense_date FROM expenses WHERE id = %s AND user_id = %s" + db.storage.lock_rows,
+                (expense_id, session['user_id'])
+            )
+            old = cur.fetchone()
+            if not old:
+                return jsonify({'error': 'Expense not found'}), 404
+            
+            cur.execute(
+                "UPDATE expenses SET description = %s, amount = %s, category = %s, expense_date = %s, card_id = %s WHERE id = %s AND user_id = %s",
+                (description, amount, category, expense_date, card_id, expense_id, session['user_id'])
+            )
+            db.storage.apply_rollup_delta(cur, session['user_id'], expense_month(old['expense_date']), old['category'], -old['amount'], -1)
+            db.storage.apply_rollup_delta(cur, session['user_id'], expense_month(expense_date), category, amount, 1)
+            buckets = {(expense_month(old['expense_date']), old['category']), (expense_month(expense_date), category)}
+            events = [('expense_updated', {'id': expense_id})] + rollup_events(cur, session['user_id'], buckets)
+        
+        response_cache.invalidate(session['user_id'], 'expenses')
+        queue_spending_alerts(session['user_id'], [month for month, _ in buckets])
+        publish_events(session['user_id'], events)
         
         return jsonify({'message': 'Expense updated successfully'}), 200
     
@@ -451,118 +1173,353 @@ def update_expense(expense_id):
 @login_required
 def delete_expense(expense_id):
     try:
-        cur = mysql. connection.cursor()
-        cur. execute(
-            "DELETE FROM expenses WHERE id = %s AND user_id = %s",
-            (expense_id, session['user_id'])
-        )
-        mysql.connection.commit()
-        cur.close()
+        # Remove the expense and take it out of its rollup bucket in one transaction
+        with db.transaction() as cur:
+            cur.execute(
+                "SELECT amount, category, expense_date FROM expenses WHERE id = %s AND user_id = %s" + db.storage.lock_rows,
+                (expense_id, session['user_id'])
+            )
+            old = cur.fetchone()
+            events = []
+            if old:
+                cur.execute(
+                    "DELETE FROM expenses WHERE id = %s AND user_id = %s",
+                    (expense_id, session['user_id'])
+                )
+                db.storage.apply_rollup_delta(cur, session['user_id'], expense_month(old['expense_date']), old['category'], -old['amount'], -1)
+                bucket = (expense_month(old['expense_date']), old['category'])
+                events = [('expense_deleted', {'id': expense_id})] + rollup_events(cur, session['user_id'], [bucket])
+        
+        response_cache.invalidate(session['user_id'], 'expenses')
+        publish_events(session['user_id'], events)
         
         return jsonify({'message': 'Expense deleted successfully'}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ==================== API ROUTES - Analytics ====================
+# ==================== API ROUTES - Recurring Expenses ====================
 
-@app.route('/api/analytics/summary', methods=['GET'])
+@app.route('/api/recurring', methods=['GET'])
 @login_required
-def get_summary():
+@db.read_only
+def get_recurring_expenses():
     try:
-        cur = mysql.connection.cursor()
-        
-        # Get user's monthly salary
-        cur.execute("SELECT monthly_salary FROM users WHERE id = %s", (session['user_id'],))
-        user = cur.fetchone()
-        monthly_salary = float(user['monthly_salary']) if user['monthly_salary'] else 0
-        
-        # Get current month's total expenses
-        current_month = datetime.now().strftime('%Y-%m')
-        cur.execute(
-            "SELECT SUM(amount) as total FROM expenses WHERE user_id = %s AND DATE_FORMAT(expense_date, '%%Y-%%m') = %s",
-            (session['user_id'], current_month)
-        )
-        result = cur.fetchone()
-        total_expenses = float(result['total']) if result['total'] else 0
+        with db.cursor() as cur:
+            cur.execute(
+                f"SELECT {RECURRING_RULE_COLUMNS} FROM recurring_expenses WHERE user_id = %s ORDER BY id",
+                (session['user_id'],)
+            )
+            rules = cur.fetchall()
         
-        # Get total balance from all cards
-        cur.execute(
-            "SELECT SUM(balance) as total FROM cards WHERE user_id = %s",
-            (session['user_id'],)
-        )
-        result = cur.fetchone()
-        total_balance = float(result['total']) if result['total'] else 0
+        return jsonify_rows(rules), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Helper function to validate a recurring rule body against the user's cards
+def recurring_rule_from_request(cur, user_id):
+    cur.execute("SELECT id FROM cards WHERE user_id = %s", (user_id,))
+    card_ids = {row['id'] for row in cur.fetchall()}
+    return validate_recurring_rule(request.get_json() or {}, card_ids)
+
+@app.route('/api/recurring', methods=['POST'])
+@login_required
+def add_recurring_expense():
+    try:
+        # Occurrences are written by `flask recurring worker` on its next tick.
+        # A past start_date only anchors the schedule (e.g. on the 31st): the
+        # first occurrence is today's or the next one, never a back-filled one.
+        with db.transaction() as cur:
+            rule = recurring_rule_from_request(cur, session['user_id'])
+            rule['next_due'] = first_due(rule, max(date.today(), rule['start_date']))
+            columns = ['user_id', *rule]
+            cur.execute(
+                f"INSERT INTO recurring_expenses ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})",
+                (session['user_id'], *rule.values())
+            )
+            rule_id = cur.lastrowid
         
-        cur.close()
+        return jsonify({'message': 'Recurring expense added successfully', 'id': rule_id, 'next_due': rule['next_due']}), 201
+    
+    except RuleError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recurring/<int:rule_id>', methods=['PUT'])
+@login_required
+def update_recurring_expense(rule_id):
+    try:
+        with db.transaction() as cur:
+            cur.execute(
+                "SELECT next_due FROM recurring_expenses WHERE id = %s AND user_id = %s" + db.storage.lock_rows,
+                (rule_id, session['user_id'])
+            )
+            existing = cur.fetchone()
+            if not existing:
+                return jsonify({'error': 'Recurring expense not found'}), 404
+            
+            # The new schedule applies from where the old one had got to, never to
+            # dates already past; a later start_date simply moves it forward
+            rule = recurring_rule_from_request(cur, session['user_id'])
+            since = date.today()
+            if existing['next_due'] is not None:
+                since = min(since, date.fromisoformat(str(existing['next_due'])[:10]))
+            rule['next_due'] = first_due(rule, max(since, rule['start_date']))
+            cur.execute(
+                f"UPDATE recurring_expenses SET {', '.join(f'{column} = %s' for column in rule)} WHERE id = %s AND user_id = %s",
+                (*rule.values(), rule_id, session['user_id'])
+            )
         
-        remaining_balance = monthly_salary - total_expenses
+        return jsonify({'message': 'Recurring expense updated successfully', 'next_due': rule['next_due']}), 200
+    
+    except RuleError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recurring/<int:rule_id>', methods=['DELETE'])
+@login_required
+def delete_recurring_expense(rule_id):
+    try:
+        # Expenses it already created stay; their recurring_id is set to NULL
+        with db.transaction() as cur:
+            cur.execute(
+                "DELETE FROM recurring_expenses WHERE id = %s AND user_id = %s",
+                (rule_id, session['user_id'])
+            )
+            deleted = cur.rowcount
         
-        return jsonify({
-            'monthly_salary': monthly_salary,
-            'total_expenses': total_expenses,
-            'remaining_balance': remaining_balance,
-            'total_balance': total_balance,
-            'current_month': current_month
-        }), 200
+        if not deleted:
+            return jsonify({'error': 'Recurring expense not found'}), 404
+        return jsonify({'message': 'Recurring expense deleted successfully'}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== API ROUTES - Analytics ====================
+
+@app.route('/api/analytics/summary', methods=['GET'])
+@login_required
+@db.read_only
+@response_cache.cached('expenses', 'cards', 'profile')
+def get_summary():
+    try:
+        return run_view(summary_body(session['user_id']))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/analytics/monthly', methods=['GET'])
 @login_required
+@db.read_only
+@response_cache.cached('expenses')
 def get_monthly_analytics():
     try:
-        # Get last 6 months
-        cur = mysql. connection.cursor()
-        
-        query = """
-            SELECT DATE_FORMAT(expense_date, '%%Y-%%m') as month, SUM(amount) as total
-            FROM expenses
-            WHERE user_id = %s AND expense_date >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
-            GROUP BY DATE_FORMAT(expense_date, '%%Y-%%m')
-            ORDER BY month
-        """
-        
-        cur.execute(query, (session['user_id'],))
-        monthly_data = cur.fetchall()
-        cur.close()
-        
-        # Convert Decimal to float
-        for item in monthly_data:
-            item['total'] = float(item['total'])
-        
-        return jsonify(monthly_data), 200
+        return run_view(monthly_analytics_body(session['user_id']))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/analytics/category', methods=['GET'])
 @login_required
+@db.read_only
+@response_cache.cached('expenses')
 def get_category_analytics():
     try:
-        # Get current month by default, or specified month
-        month = request.args.get('month', datetime.now().strftime('%Y-%m'))
+        return run_view(category_analytics_body(session['user_id'], request.args.get('month', datetime.now().strftime('%Y-%m'))))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Forecasts depend on the user's expenses and salary, and on the day they were computed for
+FORECAST_CACHE_GROUPS = ('expenses', 'profile')
+
+# Helper function to get the cache name of a forecast computed for the given day
+def forecast_cache_name(today):
+    return f"forecast:{today.isoformat()}"
+
+@app.route('/api/analytics/forecast', methods=['GET'])
+@login_required
+@db.read_only
+def get_forecast():
+    try:
+        if not forecast_available():
+            return jsonify({'error': 'Forecasting requires numpy to be installed'}), 501
+        
+        # Precomputed by `flask analytics forecast`, or by an earlier request since the last write
+        user_id = session['user_id']
+        today = date.today()
+        forecast = response_cache.get_value(user_id, forecast_cache_name(today), FORECAST_CACHE_GROUPS)
+        if forecast is None:
+            with db.cursor() as cur:
+                cur.execute(SALARY_QUERY, (user_id,))
+                user = cur.fetchone()
+            forecast = forecast_engine.for_user(user_id, user['monthly_salary'], today)
+            response_cache.set_value(
+                user_id, forecast_cache_name(today), FORECAST_CACHE_GROUPS, forecast, app.config['FORECAST_CACHE_TTL']
+            )
         
-        cur = mysql. connection.cursor()
+        return jsonify(forecast), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== API ROUTES - Reports ====================
+
+# Report artifacts reflect the user's expenses and cards at the time they were generated
+REPORT_DATA_GROUPS = ('expenses', 'cards')
+
+# Helper function to shape a report_jobs row for the API and the 'report_job' event
+def report_job_view(job):
+    view = {key: value for key, value in job.items() if key not in ('spec', 'spec_hash', 'user_id')}
+    view['spec'] = json.loads(job['spec'])
+    view['status_url'] = f"/api/reports/{job['id']}"
+    if job['status'] == 'done':
+        view['download_url'] = f"/api/reports/{job['id']}/download"
+    return view
+
+@app.route('/api/reports', methods=['POST'])
+@login_required
+def create_report():
+    try:
+        # Runs on the report workers; poll the Location URL or watch for 'report_job' events
+        user_id = session['user_id']
+        spec = normalize_report_spec(request.get_json() or {})
+        if spec['format'] == 'pdf' and not pdf_available():
+            return jsonify({'error': 'PDF reports require reportlab to be installed'}), 501
+        if spec['kind'] == 'card_statement':
+            with db.cursor() as cur:
+                cur.execute("SELECT id FROM cards WHERE id = %s AND user_id = %s", (spec['card_id'], user_id))
+                if not cur.fetchone():
+                    return jsonify({'error': 'Card not found'}), 404
+        
+        job, outcome = report_queue.submit(user_id, spec, response_cache.version(user_id, REPORT_DATA_GROUPS))
+        
+        response = jsonify({**report_job_view(job), 'outcome': outcome})
+        response.headers['Location'] = f"/api/reports/{job['id']}"
+        return response, 200 if outcome == 'cached' else 202
+    
+    except ReportSpecError as e:
+        return jsonify({'error': str(e)}), 400
+    except ReportQueueFull:
+        return jsonify({'error': 'Too many reports in progress; try again when one finishes'}), 429
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports', methods=['GET'])
+@login_required
+def get_report_jobs():
+    try:
+        jobs = report_queue.recent(session['user_id'])
+        return jsonify([report_job_view(job) for job in jobs]), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/<job_id>', methods=['GET'])
+@login_required
+def get_report_job(job_id):
+    try:
+        job = report_queue.get(session['user_id'], job_id)
+        if not job:
+            return jsonify({'error': 'Report not found'}), 404
         
-        query = """
-            SELECT category, SUM(amount) as total
-            FROM expenses
-            WHERE user_id = %s AND DATE_FORMAT(expense_date, '%%Y-%%m') = %s
-            GROUP BY category
-            ORDER BY total DESC
-        """
+        response = jsonify(report_job_view(job))
+        response.headers['Cache-Control'] = 'no-store'
+        return response, 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/reports/<job_id>/download', methods=['GET'])
+@login_required
+def download_report(job_id):
+    try:
+        job = report_queue.get(session['user_id'], job_id)
+        if not job:
+            return jsonify({'error': 'Report not found'}), 404
+        if job['status'] != 'done':
+            return jsonify({'error': f"Report is {job['status']}", 'status': job['status']}), 409
+        
+        path = report_queue.artifacts.open(job['spec_hash'])
+        if path is None:
+            return jsonify({'error': 'Report has expired; request it again'}), 410
+        
+        mimetype, extension = REPORT_FORMATS[job['format']]
+        created = str(job['created_at'])[:10]
+        # The artifact never changes once written, so its hash is a strong ETag
+        return send_file(
+            path, mimetype=mimetype, as_attachment=True, download_name=f"{job['kind']}-{created}.{extension}",
+            etag=job['spec_hash'], conditional=True, max_age=0
+        )
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== API ROUTES - Budgets ====================
+
+@app.route('/api/budgets', methods=['GET'])
+@login_required
+@db.read_only
+def get_budgets():
+    try:
+        return run_view(budgets_body(session['user_id']))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/budgets', methods=['PUT'])
+@login_required
+def set_budget():
+    try:
+        data = request.get_json()
+        category = data.get('category')
+        
+        # Stored exactly, to the cent, like expense amounts
+        try:
+            monthly_limit = Decimal(str(data.get('monthly_limit'))).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            monthly_limit = None
+        
+        if not category or monthly_limit is None or not monthly_limit.is_finite() or monthly_limit <= 0:
+            return jsonify({'error': 'Category and a positive monthly_limit are required'}), 400
         
-        cur.execute(query, (session['user_id'], month))
-        category_data = cur.fetchall()
-        cur.close()
+        with db.transaction() as cur:
+            db.storage.upsert_budget(cur, session['user_id'], category, monthly_limit)
         
-        # Convert Decimal to float
-        for item in category_data:
-            item['total'] = float(item['total'])
+        queue_spending_alerts(session['user_id'])
+        
+        return jsonify({'message': 'Budget saved successfully'}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/budgets/<category>', methods=['DELETE'])
+@login_required
+def delete_budget(category):
+    try:
+        with db.transaction() as cur:
+            cur.execute(
+                "DELETE FROM category_budgets WHERE user_id = %s AND category = %s",
+                (session['user_id'], category)
+            )
         
-        return jsonify(category_data), 200
+        return jsonify({'message': 'Budget deleted successfully'}), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== API ROUTES - Dashboard ====================
+
+@app.route('/api/dashboard', methods=['GET'])
+@login_required
+@db.read_only
+@response_cache.cached('expenses', 'cards', 'profile', 'notifications')
+def get_dashboard():
+    try:
+        return run_view(dashboard_body(session['user_id']))
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -571,17 +1528,48 @@ def get_category_analytics():
 
 @app.route('/api/notifications', methods=['GET'])
 @login_required
+@db.read_only
 def get_notifications():
     try:
-        cur = mysql.connection.cursor()
-        cur.execute(
-            "SELECT id, message, type, is_read, created_at FROM notifications WHERE user_id = %s ORDER BY created_at DESC LIMIT 50",
-            (session['user_id'],)
-        )
-        notifications = cur.fetchall()
-        cur.close()
+        return run_view(notifications_body(session['user_id'], request.args.get('since', type=int)))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/notifications/unread_count', methods=['GET'])
+@login_required
+@db.read_only
+def get_unread_count():
+    try:
+        return run_view(unread_count_body(session['user_id']))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/notifications/read', methods=['PUT'])
+@login_required
+def mark_notifications_read():
+    # Body: {"ids": [...]} or {"up_to": <id>}; an empty body marks everything read
+    try:
+        data = request.get_json(silent=True) or {}
+        ids = data.get('ids')
+        up_to = data.get('up_to')
         
-        return jsonify(notifications), 200
+        if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+            return jsonify({'error': 'ids must be a list of notification ids'}), 400
+        if up_to is not None and not isinstance(up_to, int):
+            return jsonify({'error': 'up_to must be a notification id'}), 400
+        
+        with db.transaction() as cur:
+            marked = db.storage.mark_notifications_read(cur, session['user_id'], ids=ids, up_to=up_to)
+            cur.execute(UNREAD_COUNT_QUERY, (session['user_id'],))
+            unread_count = int(cur.fetchone()['unread_notifications'])
+        
+        if marked:
+            response_cache.invalidate(session['user_id'], 'notifications')
+            publish_events(session['user_id'], [('unread_count', {'unread_count': unread_count})])
+        
+        return jsonify({'marked': marked, 'unread_count': unread_count}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -590,18 +1578,488 @@ def get_notifications():
 @login_required
 def mark_notification_read(notification_id):
     try:
-        cur = mysql.connection.cursor()
-        cur.execute(
-            "UPDATE notifications SET is_read = TRUE WHERE id = %s AND user_id = %s",
-            (notification_id, session['user_id'])
-        )
-        mysql.connection.commit()
-        cur.close()
+        with db.transaction() as cur:
+            marked = db.storage.mark_notifications_read(cur, session['user_id'], ids=[notification_id])
+            cur.execute(UNREAD_COUNT_QUERY, (session['user_id'],))
+            unread_count = int(cur.fetchone()['unread_notifications'])
+        
+        response_cache.invalidate(session['user_id'], 'notifications')
+        if marked:
+            publish_events(session['user_id'], [('unread_count', {'unread_count': unread_count})])
         
         return jsonify({'message': 'Notification marked as read'}), 200
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# ==================== API ROUTES - Live Events ====================
+
+@app.route('/api/events', methods=['GET'])
+@login_required
+def stream_events():
+    # Server-Sent Events: expense, month_total, category_total, balance,
+    # notification, unread_count, expenses_imported and resync deltas for this user
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return event_stream_response(event_bus.stream(session['user_id'], last_event_id))
+
+# ==================== INTERNAL ROUTES - Operations ====================
+
+# Operational endpoints are only served to callers presenting INTERNAL_TOKEN
+# (Authorization: Bearer <token>). The peer address proves nothing behind a
+# reverse proxy, where every request arrives from 127.0.0.1.
+def internal_only(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = app.config['INTERNAL_TOKEN']
+        scheme, _, presented = request.headers.get('Authorization', '').partition(' ')
+        if not token or scheme.lower() != 'bearer' or not hmac.compare_digest(presented.encode(), token.encode()):
+            return jsonify({'error': 'Not found'}), 404
+        return f(*args, **kwargs)
+    return decorated_function
+
+@app.route('/metrics', methods=['GET'])
+@internal_only
+def get_metrics():
+    return Response(instrumentation.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/internal/db/pool', methods=['GET'])
+@internal_only
+def get_pool_stats():
+    stats = db.pool.stats()
+    if db.replicas:
+        stats['replicas'] = db.replica_stats()
+    return jsonify(stats), 200
+
+# ==================== CLI COMMANDS - Database ====================
+
+db_cli = AppGroup('db', help='Create and migrate the database schema.')
+app.cli.add_command(db_cli)
+
+@db_cli.command('upgrade')
+def upgrade_database():
+    """Apply pending migrations from migrations/<engine>/."""
+    ran = db.migrate()
+    for version, name in ran:
+        click.echo(f'Applied {version:04d}_{name}')
+    click.echo(f"{db.storage.name} schema is up to date ({len(ran)} migrations applied).")
+    
+    # Listing cards and card statements read the masked number, so no row may lack it
+    backfilled = backfill_card_masks()
+    if backfilled:
+        click.echo(f'Backfilled masked numbers for {backfilled} cards.')
+
+@db_cli.command('status')
+def database_status():
+    """List migrations and whether each has been applied."""
+    applied = db.storage.applied_migrations(db.connection)
+    for version, name, path in db.storage.migration_files():
+        state = 'applied' if version in applied else 'pending'
+        click.echo(f'{version:04d}_{name}: {state}')
+
+@db_cli.command('replicas')
+def replica_status():
+    """Check every read replica's lag; exit 1 if any is unhealthy."""
+    if not db.replicas:
+        click.echo('No replicas configured (set DB_REPLICAS).')
+        return
+    # Two rounds: the first writes a fresh heartbeat, the second measures it
+    db.check_replicas()
+    time.sleep(app.config['DB_REPLICA_CHECK_INTERVAL'])
+    db.check_replicas()
+    unhealthy = 0
+    for replica in db.replica_stats():
+        lag = f"{replica['lag_seconds']:.2f}s" if replica['lag_seconds'] is not None else '-'
+        click.echo(f"{'ok  ' if replica['healthy'] else 'FAIL'} {replica['name']}  lag {lag}  {replica['error'] or ''}".rstrip())
+        unhealthy += not replica['healthy']
+    if unhealthy:
+        sys.exit(1)
+
+# Representative parameters for every hot query; the plan, not the result, is what matters
+def hot_queries():
+    today = date.today()
+    month = today.strftime('%Y-%m')
+    listing, params = build_expense_query(1, {})
+    filtered, filtered_params = build_expense_query(
+        1, {'start_date': f'{month}-01', 'end_date': today.isoformat(), 'category': 'Food'}
+    )
+    search, search_params, *_ = expense_search(1, MultiDict({'q': 'groceries wee'}))
+    search_by_date, search_by_date_params, *_ = expense_search(1, MultiDict({'q': 'groc', 'sort': 'date'}))
+    amount_search, amount_params, *_ = expense_search(1, MultiDict({'amount_min': '100', 'amount_max': '250'}))
+    card_search, card_params, *_ = expense_search(1, MultiDict({'card_id': '1', 'category': 'Food,Rent'}))
+    return [
+        ('expenses.page', listing + EXPENSE_ORDER_CLAUSE + " LIMIT %s", (*params, 101)),
+        ('expenses.keyset_page', listing + EXPENSE_KEYSET_CLAUSE + EXPENSE_ORDER_CLAUSE + " LIMIT %s",
+         (*params, today, today, 1000, 101)),
+        ('expenses.filtered_page', filtered + EXPENSE_ORDER_CLAUSE + " LIMIT %s", (*filtered_params, 101)),
+        ('expenses.search', search, search_params),
+        ('expenses.search_by_date', search_by_date, search_by_date_params),
+        ('expenses.search_amount', amount_search, amount_params),
+        ('expenses.search_card', card_search, card_params),
+        ('expenses.row_for_update', "SELECT amount, category, expense_date FROM expenses WHERE id = %s AND user_id = %s", (1, 1)),
+        ('cards.list', LIST_CARDS_QUERY, (1,)),
+        ('notifications.recent', RECENT_NOTIFICATIONS_QUERY, (1,)),
+        ('notifications.since', NEW_NOTIFICATIONS_QUERY, (1, 1000)),
+        ('notifications.unread_count', UNREAD_COUNT_QUERY, (1,)),
+        ('rollups.month_total', MONTH_TOTAL_QUERY, (1, month)),
+        ('rollups.monthly', MONTHLY_ANALYTICS_QUERY, (1, months_ago(6))),
+        ('rollups.category', CATEGORY_ANALYTICS_QUERY, (1, month)),
+        ('rollups.window', ROLLUP_WINDOW_QUERY, (1, months_ago(6))),
+        ('recurring.due', DUE_RULES_QUERY, (today, 500)),
+        ('forecast.series', FORECAST_SERIES_QUERY, (1, forecast_engine.history_start(today).isoformat(), today.isoformat())),
+        ('reports.recent', f"SELECT {REPORT_JOB_COLUMNS} FROM report_jobs WHERE user_id = %s ORDER BY created_at DESC LIMIT %s", (1, 50)),
+        ('reports.queued', "SELECT id, user_id FROM report_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 20", ()),
+    ]
+
+@db_cli.command('explain')
+def explain_hot_queries():
+    """EXPLAIN every hot query; exit 1 if any falls back to a full table scan.
+
+    Run against a database with realistic data volumes: on near-empty MySQL
+    tables the optimizer may legitimately prefer a scan.
+    """
+    failures = 0
+    with db.cursor() as cur:
+        for name, query, params in hot_queries():
+            scans = db.storage.full_scans(cur, query, params)
+            if scans:
+                failures += 1
+                click.echo(f'FAIL {name}: full scan of {", ".join(scans)}')
+            else:
+                click.echo(f'ok   {name}')
+    
+    if failures:
+        click.echo(f'{failures} hot queries fall back to a full scan.')
+        sys.exit(1)
+
+# ==================== CLI COMMANDS - Rollups ====================
+
+ROLLUP_SOURCE_QUERY = """
+    SELECT user_id, {month} as month, category,
+           SUM(amount) as total, COUNT(*) as expense_count
+    FROM expenses
+    {where}
+    GROUP BY user_id, {month}, category
+"""
+
+rollups_cli = AppGroup('rollups', help='Maintain the expense_rollups analytics table.')
+app.cli.add_command(rollups_cli)
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', type=int, help='Only rebuild this user\'s rollup rows.')
+def rebuild_rollups(user_id):
+    """Recompute expense_rollups from the raw expenses table."""
+    where, params = ('WHERE user_id = %s', (user_id,)) if user_id else ('', ())
+    
+    with db.transaction() as cur:
+        cur.execute(f"DELETE FROM expense_rollups {where}", params)
+        cur.execute(
+            "INSERT INTO expense_rollups (user_id, month, category, total, expense_count) "
+            + ROLLUP_SOURCE_QUERY.format(where=where, month=db.storage.month_expr('expense_date')),
+            params
+        )
+        rows = cur.rowcount
+    
+    click.echo(f'Rebuilt {rows} rollup rows.')
+
+@rollups_cli.command('verify')
+@click.option('--user-id', type=int, help='Only verify this user\'s rollup rows.')
+def verify_rollups(user_id):
+    """Compare expense_rollups against the raw expenses table; exit 1 on drift."""
+    where, params = ('WHERE user_id = %s', (user_id,)) if user_id else ('', ())
+    
+    with db.cursor() as cur:
+        cur.execute(ROLLUP_SOURCE_QUERY.format(where=where, month=db.storage.month_expr('expense_date')), params)
+        expected = {(r['user_id'], r['month'], r['category']): r for r in cur.fetchall()}
+        cur.execute(
+            f"SELECT user_id, month, category, total, expense_count FROM expense_rollups {where}",
+            params
+        )
+        actual = {(r['user_id'], r['month'], r['category']): r for r in cur.fetchall() if r['expense_count']}
+    
+    mismatches = 0
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        want, got = expected.get(key), actual.get(key)
+        # Compare to the cent: SQLite sums DECIMAL columns as floats
+        want_values = (Decimal(str(want['total'])).quantize(Decimal('0.01')), want['expense_count']) if want else (0, 0)
+        got_values = (Decimal(str(got['total'])).quantize(Decimal('0.01')), got['expense_count']) if got else (0, 0)
+        if want_values != got_values:
+            mismatches += 1
+            click.echo(f'user={key[0]} month={key[1]} category={key[2]}: expected {want_values}, found {got_values}')
+    
+    if mismatches:
+        click.echo(f'{mismatches} rollup rows out of sync; run `flask rollups rebuild`.')
+        sys.exit(1)
+    click.echo(f'All {len(expected)} rollup rows match.')
+
+# ==================== CLI COMMANDS - Analytics ====================
+
+analytics_cli = AppGroup('analytics', help='Precompute analytics.')
+app.cli.add_command(analytics_cli)
+
+@analytics_cli.command('forecast')
+@click.option('--batch-size', default=5000, show_default=True, help='Expense rows fetched per round trip.')
+def precompute_forecasts(batch_size):
+    """Score every user's forecast in one pass and cache it until their next write.
+
+    Run nightly, after midnight, with a shared CACHE_BACKEND (e.g. sqlite) so the
+    web workers see the results. Users with no recent expenses are skipped; their
+    forecast is cheap to compute on request.
+    """
+    if not forecast_available():
+        click.echo('Forecasting requires numpy to be installed.')
+        sys.exit(1)
+    
+    today = date.today()
+    started = time.perf_counter()
+    users = 0
+    for user_id, forecast in forecast_engine.iter_all(today, batch_size):
+        response_cache.set_value(
+            user_id, forecast_cache_name(today), FORECAST_CACHE_GROUPS, forecast, app.config['FORECAST_CACHE_TTL']
+        )
+        users += 1
+    
+    click.echo(f'Cached forecasts for {users} users in {time.perf_counter() - started:.1f}s.')
+
+# ==================== CLI COMMANDS - Cards ====================
+
+cards_cli = AppGroup('cards', help='Maintain encrypted card numbers.')
+app.cli.add_command(cards_cli)
+
+@cards_cli.command('rotate')
+@click.option('--batch-size', default=500, show_default=True, help='Cards re-encrypted per transaction.')
+@click.option('--pause', default=0.1, show_default=True, help='Seconds to sleep between batches.')
+def rotate_card_keys(batch_size, pause):
+    """Re-encrypt cards under the newest key and backfill masked numbers.
+
+    Runs online: each batch is its own short transaction and the web app
+    decrypts with every configured key, so nothing needs to stop meanwhile.
+    """
+    after_id, total = 0, 0
+    while after_id is not None:
+        with db.transaction() as cur:
+            updated, user_ids, after_id = rotate_batch(cur, db.storage, cipher_suite, after_id, batch_size)
+        # Backfilled rows change what the card list returns
+        for user_id in user_ids:
+            response_cache.invalidate(user_id, 'cards')
+        if after_id is not None:
+            total += updated
+            click.echo(f'Re-encrypted {total} cards (through id {after_id})')
+            time.sleep(pause)
+    
+    click.echo(f'Done: {total} cards now on key {cipher_suite.primary_key_id}.')
+
+@cards_cli.command('backfill')
+@click.option('--batch-size', default=500, show_default=True, help='Cards updated per transaction.')
+def backfill_card_masks_command(batch_size):
+    """Fill in masked numbers for cards added before migration 0004.
+
+    `flask db upgrade` runs this itself; run it once after DB_AUTO_MIGRATE
+    applies 0004, which only migrates the schema.
+    """
+    click.echo(f'Backfilled masked numbers for {backfill_card_masks(batch_size)} cards.')
+
+@cards_cli.command('status')
+def card_key_status():
+    """Show how many cards are encrypted under each key."""
+    configured = {key_id(key): position for position, key in enumerate(cipher_suite.keys)}
+    with db.cursor() as cur:
+        usage = key_usage(cur)
+    
+    for card_key_id, count in sorted(usage.items(), key=lambda item: str(item[0])):
+        if card_key_id is None:
+            label = 'not yet backfilled'
+        elif card_key_id == cipher_suite.primary_key_id:
+            label = 'primary'
+        elif card_key_id in configured:
+            label = 'old key, rotate pending'
+        else:
+            label = 'KEY NOT CONFIGURED'
+        click.echo(f'{card_key_id or "-":8}  {count:>8} cards  {label}')
+
+# ==================== CLI COMMANDS - Alerts ====================
+
+alerts_cli = AppGroup('alerts', help='Run the spending alert worker.')
+app.cli.add_command(alerts_cli)
+
+@alerts_cli.command('worker')
+@click.option('--poll-interval', default=1.0, show_default=True, help='Seconds to wait for a job before polling again.')
+def run_alert_worker(poll_interval):
+    """Consume the alert queue (use with ALERT_QUEUE=sqlite)."""
+    click.echo(f"Alert worker consuming the '{app.config['ALERT_QUEUE']}' queue")
+    alert_engine.run(poll_interval=poll_interval)
+
+# ==================== CLI COMMANDS - Recurring Expenses ====================
+
+recurring_cli = AppGroup('recurring', help='Materialize recurring expense rules.')
+app.cli.add_command(recurring_cli)
+
+# Helper function to stop the scheduler from invalidating caches and publishing events no web process sees
+def require_shared_backends():
+    local = process_local_backends()
+    if local:
+        raise click.ClickException(
+            f"The scheduler runs outside the web processes, so {' and '.join(local)} would leave them serving "
+            "stale responses and never reach their event streams. Set CACHE_BACKEND=sqlite and EVENTS_BROKER=sqlite."
+        )
+
+@recurring_cli.command('worker')
+@click.option('--interval', type=float, help='Seconds between ticks (default: RECURRING_TICK_INTERVAL).')
+def run_recurring_worker(interval):
+    """Run the recurring expense scheduler until interrupted."""
+    require_shared_backends()
+    interval = interval or app.config['RECURRING_TICK_INTERVAL']
+    click.echo(f'Recurring expense scheduler ticking every {interval:g}s')
+    recurring_scheduler.run(interval=interval)
+
+@recurring_cli.command('run')
+@click.option('--date', 'today', type=click.DateTime(formats=['%Y-%m-%d']), help='Materialize as of this date instead of today.')
+def run_recurring_once(today):
+    """Run a single scheduler tick and exit."""
+    require_shared_backends()
+    started = time.perf_counter()
+    processed, inserted = recurring_scheduler.tick(today.date() if today else None)
+    click.echo(f'Processed {processed} rules, inserted {inserted} expenses in {time.perf_counter() - started:.2f}s.')
+
+# ==================== CLI COMMANDS - Reports ====================
+
+reports_cli = AppGroup('reports', help='Run the report job workers.')
+app.cli.add_command(reports_cli)
+
+@reports_cli.command('worker')
+@click.option('--workers', type=int, help='Worker threads (default: REPORT_WORKERS).')
+def run_report_workers(workers):
+    """Run report jobs until interrupted (pair with REPORT_EMBEDDED_WORKERS=false on the web servers)."""
+    workers = workers or app.config['REPORT_WORKERS']
+    click.echo(f"Running report jobs on {workers} workers, artifacts in {app.config['REPORT_ARTIFACT_DIR']}")
+    for worker in report_queue.start_workers(workers):
+        worker.join()
+
+# ==================== CLI COMMANDS - Assets ====================
+
+assets_cli = AppGroup('assets', help='Build the fingerprinted static bundles.')
+app.cli.add_command(assets_cli)
+
+@assets_cli.command('build')
+@click.option('--clean', 'remove_old', is_flag=True, help='Delete the outputs of previous builds.')
+def build_static_assets(remove_old):
+    """Bundle, minify, fingerprint and precompress static/ into ASSETS_DIR."""
+    started = time.perf_counter()
+    built = build_assets(app.static_folder, app.config['ASSETS_DIR'])
+    for name, (filename, sizes) in built.items():
+        click.echo(f"{name:14} {filename:32} " + '  '.join(f'{encoding} {size:>7,}' for encoding, size in sizes.items()))
+    if remove_old:
+        removed = clean_assets(app.config['ASSETS_DIR'], {filename for filename, _ in built.values()})
+        click.echo(f'Removed {removed} old files.')
+    click.echo(f"Built {len(built)} bundles into {app.config['ASSETS_DIR']} in {time.perf_counter() - started:.2f}s.")
+
+# ==================== CLI COMMANDS - Benchmark ====================
+
+bench_cli = AppGroup('bench', help='Seed synthetic data and load-test the API.')
+app.cli.add_command(bench_cli)
+
+@bench_cli.command('seed')
+@click.option('--users', default=100, show_default=True, help='Synthetic users to create.')
+@click.option('--expenses', default=1000, show_default=True, help='Expenses per user.')
+@click.option('--cards', default=3, show_default=True, help='Cards per user.')
+@click.option('--days', default=365, show_default=True, help='How far back expense dates go.')
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='Random seed; same seed, same data.')
+def bench_seed(users, expenses, cards, days, seed_value):
+    """Insert users × cards × expenses with realistic dates and categories."""
+    started = time.perf_counter()
+    password_hash = bcrypt.generate_password_hash(BENCH_PASSWORD)
+    with db.transaction() as cur:
+        counts = seed_benchmark(
+            cur, db.storage, encrypt_card_number, password_hash,
+            users=users, expenses=expenses, cards=cards, days=days, seed_value=seed_value
+        )
+    click.echo(
+        f"Seeded {counts['users']} users, {counts['cards']} cards and {counts['expenses']} expenses "
+        f"in {time.perf_counter() - started:.1f}s (password: {BENCH_PASSWORD})"
+    )
+
+@bench_cli.command('run')
+@click.option('--concurrency', default=8, show_default=True, help='Concurrent virtual users.')
+@click.option('--duration', default=30.0, show_default=True, help='Seconds to measure (ignored with --requests).')
+@click.option('--requests', 'request_count', type=int, help='Stop after this many requests instead.')
+@click.option('--warmup', default=2.0, show_default=True, help='Seconds of traffic excluded from the results.')
+@click.option('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()), show_default=True,
+              help='Weighted workload mix.')
+@click.option('--url', help='Benchmark a running server (e.g. http://127.0.0.1:5000) instead of in-process.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the JSON report here.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Report to compare against.')
+@click.option('--tolerance', default=10.0, show_default=True, help='Allowed p95 slowdown (%) versus the baseline.')
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='Random seed for the request mix.')
+def bench_run(concurrency, duration, request_count, warmup, mix, url, output, baseline, tolerance, seed_value):
+    """Drive a mixed workload and report p50/p95/p99 latency and throughput."""
+    try:
+        workload_mix = parse_mix(mix)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--mix')
+    
+    with db.cursor() as cur:
+        cur.execute("SELECT email FROM users WHERE email LIKE %s", (f'%@{BENCH_EMAIL_DOMAIN}',))
+        emails = [row['email'] for row in cur.fetchall()]
+    if not emails:
+        raise click.ClickException('No benchmark users found; run `flask bench seed` first.')
+    
+    make_client = (lambda: HTTPClient(url)) if url else (lambda: InProcessClient(app))
+    results = run_benchmark(
+        make_client, emails, workload_mix, concurrency,
+        duration=None if request_count else duration, requests=request_count,
+        warmup=0 if request_count else warmup, seed_value=seed_value
+    )
+    report = {
+        'config': {
+            'target': url or 'in-process', 'engine': app.config['DB_ENGINE'], 'concurrency': concurrency,
+            'duration': duration, 'requests': request_count, 'warmup': warmup, 'mix': workload_mix,
+            'users': len(emails), 'seed': seed_value,
+        },
+        'environment': environment(),
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'results': results,
+    }
+    
+    click.echo(f"{'operation':<16}{'count':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in [*results['operations'].items(), ('total', results['total'])]:
+        click.echo(
+            f"{name:<16}{stats['count']:>8}{stats['errors']:>8}{stats['throughput_rps'] or 0:>10}"
+            f"{stats['p50_ms'] or '-':>10}{stats['p95_ms'] or '-':>10}{stats['p99_ms'] or '-':>10}"
+        )
+    
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f'Report written to {output}')
+    
+    if baseline:
+        with open(baseline) as f:
+            regressed = report_comparison(json.load(f), report, tolerance)
+        if regressed:
+            sys.exit(1)
+
+@bench_cli.command('compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('--tolerance', default=10.0, show_default=True, help='Allowed p95 slowdown (%).')
+def bench_compare(baseline, current, tolerance):
+    """Compare two saved reports; exit 1 if any operation's p95 regressed."""
+    with open(baseline) as f:
+        before = json.load(f)
+    with open(current) as f:
+        after = json.load(f)
+    if report_comparison(before, after, tolerance):
+        sys.exit(1)
+
+# Print a p95 comparison table; returns the number of regressed operations
+def report_comparison(before, after, tolerance):
+    regressed = 0
+    click.echo(f"{'operation':<16}{'baseline p95':>14}{'current p95':>14}{'change':>10}")
+    for name, old, new, change, is_regression in compare_benchmarks(before, after, tolerance=tolerance):
+        regressed += is_regression
+        marker = '  REGRESSION' if is_regression else ''
+        change_text = f'{change:+.1f}%' if change is not None else '-'
+        click.echo(f"{name:<16}{old if old is not None else '-':>14}{new if new is not None else '-':>14}{change_text:>10}{marker}")
+    return regressed
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
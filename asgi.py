@@ -0,0 +1,388 @@
+from flask import request, session, jsonify
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from contextlib import AsyncExitStack
+from datetime import datetime
+from functools import wraps
+from io import BytesIO
+from werkzeug.exceptions import HTTPException
+from aiodb import AsyncDatabase
+from app import (
+    app, bcrypt, db, event_bus, instrumentation, response_cache, password_busy_response,
+    Call, CheckPassword, Fetch, StreamRows, event_stream_response,
+    budgets_body, cards_body, category_analytics_body, dashboard_body, expenses_body, login_body,
+    monthly_analytics_body, notifications_body, profile_body, search_body, summary_body, unread_count_body,
+)
+from passwords import PasswordPoolBusy
+import asyncio
+import contextvars
+
+# ASGI entry point: `gunicorn -c gunicorn.conf.py asgi:application`.
+#
+# The read paths a dashboard polls (dashboard, analytics, expense pages,
+# cards, budgets, notifications), login and the /api/events stream run as
+# coroutines on an async connection pool (aiodb), so a slow query, a bcrypt
+# check or an idle SSE stream parks a task instead of a thread. They run
+# inside a normal Flask request context: sessions, the JSON provider, the
+# response cache, replica routing, instrumentation and compression all apply
+# exactly as they do for the WSGI views. Each view runs the same body from
+# app.py as its WSGI twin (see "Shared View Bodies" there), awaiting the
+# steps run_view() performs blocking.
+#
+# Every other request (writes, imports, exports, pages, static files) is
+# served by the unchanged Flask app through a2wsgi on a bounded thread pool,
+# so the /api/* contract is the same whichever entry point is in front of it.
+
+adb = AsyncDatabase(app, db)
+instrumentation.instrument_async_db(adb)
+
+ASYNC_VIEWS = {}
+
+def async_view(endpoint):
+    # Serve the Flask endpoint of this name with the decorated coroutine under ASGI
+    def decorator(f):
+        ASYNC_VIEWS[endpoint] = f
+        return f
+    return decorator
+
+# Authentication decorator for async views
+def async_login_required(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Unauthorized'}), 401
+        return await f(*args, **kwargs)
+    return decorated_function
+
+# Helper function to run blocking app code from an async view, inside the current request's context
+async def run_sync(fn, *args):
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(application.executor, context.run, fn, *args)
+
+# Helper function to run a shared view body on the event loop; returns its response
+async def run_view_async(body):
+    # Consecutive queries share one pooled connection, handed back before any other step
+    result = None
+    async with AsyncExitStack() as connection:
+        cur = None
+        try:
+            while True:
+                step = body.send(result)
+                if isinstance(step, Fetch):
+                    if cur is None:
+                        cur = await connection.enter_async_context(adb.cursor())
+                    await cur.execute(step.query, step.params)
+                    result = await (cur.fetchone() if step.one else cur.fetchall())
+                    continue
+
+                await connection.aclose()
+                cur = None
+                if isinstance(step, CheckPassword):
+                    result = await bcrypt.check_password_hash_async(step.password_hash, step.password)
+                elif isinstance(step, StreamRows):
+                    result = iter_expenses_async(step.query, step.params)
+                else:
+                    result = await run_sync(step.fn, *step.args)
+        except StopIteration as done:
+            return done.value
+
+# Helper generator streaming NDJSON expense rows from an unbuffered async cursor
+async def iter_expenses_async(query, params, batch_size=500):
+    async with adb.cursor(unbuffered=True) as cur:
+        await cur.execute(query, params)
+        while True:
+            rows = await cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield ''.join(app.json.dumps(row) + '\n' for row in rows)
+
+# ==================== ASYNC API ROUTES - Authentication ====================
+
+@async_view('login')
+async def login():
+    try:
+        return await run_view_async(login_body(request.get_json()))
+
+    except PasswordPoolBusy as e:
+        return password_busy_response(e)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - User Management ====================
+
+@async_view('get_profile')
+@async_login_required
+@adb.read_only
+async def get_profile():
+    try:
+        return await run_view_async(profile_body(session['user_id']))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - Cards ====================
+
+@async_view('get_cards')
+@async_login_required
+@adb.read_only
+@response_cache.cached_async('cards')
+async def get_cards():
+    try:
+        return await run_view_async(cards_body(session['user_id']))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - Expenses ====================
+
+@async_view('get_expenses')
+@async_login_required
+@adb.read_only
+async def get_expenses():
+    try:
+        return await run_view_async(expenses_body(session['user_id'], request.args))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_view('search_expenses')
+@async_login_required
+@adb.read_only
+async def search_expenses():
+    try:
+        return await run_view_async(search_body(session['user_id'], request.args))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - Analytics ====================
+
+@async_view('get_summary')
+@async_login_required
+@adb.read_only
+@response_cache.cached_async('expenses', 'cards', 'profile')
+async def get_summary():
+    try:
+        return await run_view_async(summary_body(session['user_id']))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_view('get_monthly_analytics')
+@async_login_required
+@adb.read_only
+@response_cache.cached_async('expenses')
+async def get_monthly_analytics():
+    try:
+        return await run_view_async(monthly_analytics_body(session['user_id']))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_view('get_category_analytics')
+@async_login_required
+@adb.read_only
+@response_cache.cached_async('expenses')
+async def get_category_analytics():
+    try:
+        month = request.args.get('month', datetime.now().strftime('%Y-%m'))
+        return await run_view_async(category_analytics_body(session['user_id'], month))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - Budgets ====================
+
+@async_view('get_budgets')
+@async_login_required
+@adb.read_only
+async def get_budgets():
+    try:
+        return await run_view_async(budgets_body(session['user_id']))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - Dashboard ====================
+
+@async_view('get_dashboard')
+@async_login_required
+@adb.read_only
+@response_cache.cached_async('expenses', 'cards', 'profile', 'notifications')
+async def get_dashboard():
+    try:
+        return await run_view_async(dashboard_body(session['user_id']))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - Notifications ====================
+
+@async_view('get_notifications')
+@async_login_required
+@adb.read_only
+async def get_notifications():
+    try:
+        since = request.args.get('since', type=int)
+        return await run_view_async(notifications_body(session['user_id'], since))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_view('get_unread_count')
+@async_login_required
+@adb.read_only
+async def get_unread_count():
+    try:
+        return await run_view_async(unread_count_body(session['user_id']))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# ==================== ASYNC API ROUTES - Live Events ====================
+
+@async_view('stream_events')
+@async_login_required
+async def stream_events():
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    return event_stream_response(event_bus.stream_async(session['user_id'], last_event_id))
+
+# ==================== ASGI Server Glue ====================
+
+async def read_body(receive):
+    # Async views take small JSON bodies (login); uploads go to the WSGI app
+    body = BytesIO()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body.write(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    body.seek(0)
+    return body
+
+def terminated_input(wsgi_app):
+    # a2wsgi passes a chunked request body on without a length; let Werkzeug read it to the end
+    def wrapped(environ, start_response):
+        if 'CONTENT_LENGTH' not in environ:
+            environ['wsgi.input_terminated'] = True
+        return wsgi_app(environ, start_response)
+    return wrapped
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+class FlaskASGI:
+    """Serves the Flask app over ASGI: async views on the event loop, everything
+    else through a2wsgi's WSGI adapter on `threads` worker threads."""
+
+    def __init__(self, app, threads):
+        self.app = app
+        self.wsgi = WSGIMiddleware(terminated_input(app), workers=threads)
+        # Shared with run_sync(), so blocking work from async views is bounded too
+        self.executor = self.wsgi.executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        view = self.async_view_for(scope) if scope['type'] == 'http' else None
+        if view is None:
+            await self.wsgi(scope, receive, send)
+        else:
+            await self.call_async(view, scope, receive, send)
+
+    def async_view_for(self, scope):
+        try:
+            endpoint, _ = self.app.url_map.bind_to_environ(build_environ(scope, None)).match()
+        except HTTPException:
+            # 404/405/redirects are answered by Flask itself
+            return None
+        return ASYNC_VIEWS.get(endpoint)
+
+    # ==================== Async Views ====================
+
+    async def call_async(self, view, scope, receive, send):
+        # Same steps as Flask.wsgi_app/full_dispatch_request, awaiting the view
+        body = await read_body(receive)
+        environ = build_environ(scope, body)
+        # The body is already read, so its length is known even if it came chunked
+        environ['CONTENT_LENGTH'] = str(body.getbuffer().nbytes)
+        ctx = self.app.request_context(environ)
+        error = None
+        ctx.push()
+        try:
+            try:
+                try:
+                    rv = self.app.preprocess_request()
+                    if rv is None:
+                        rv = await view(**request.view_args)
+                except Exception as e:
+                    rv = self.app.handle_user_exception(e)
+                response = self.app.finalize_request(rv)
+            except Exception as e:
+                error = e
+                response = self.app.handle_exception(e)
+            # The context stays pushed while a streamed body is produced
+            await self.send_response(response, environ, receive, send)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            ctx.pop(error)
+
+    async def send_response(self, response, environ, receive, send):
+        headers = response.get_wsgi_headers(environ)
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': encode_headers(headers.items())})
+
+        chunks = response.response
+        if not hasattr(chunks, '__aiter__'):
+            body = b''.join(response.get_app_iter(environ))
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            await chunks.aclose()
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        async def pump():
+            async for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        # Stop producing (and release the subscription or cursor) as soon as the client goes away
+        streaming = asyncio.ensure_future(pump())
+        watching = asyncio.ensure_future(wait_for_disconnect(receive))
+        try:
+            await asyncio.wait({streaming, watching}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (streaming, watching):
+                task.cancel()
+            await asyncio.gather(streaming, watching, return_exceptions=True)
+            await chunks.aclose()
+        if streaming.done() and not streaming.cancelled() and streaming.exception() is not None:
+            raise streaming.exception()
+
+    # ==================== Lifespan ====================
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await adb.close()
+                bcrypt.shutdown()
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+async def wait_for_disconnect(receive):
+    # The body has been read already, so the next message is the disconnect
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+application = FlaskASGI(app, threads=app.config['ASGI_WSGI_THREADS'])
@@ -0,0 +1,241 @@
+from flask import abort, current_app, make_response, render_template, request, send_from_directory, url_for
+from markupsafe import Markup, escape
+from werkzeug.security import safe_join
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:  # Brotli variants are optional; gzip is always built
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # Without rjsmin/rcssmin a conservative built-in minifier is used
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+# Static asset pipeline. `flask assets build` concatenates and minifies the
+# files of every bundle below, names each output after a hash of its content
+# (dashboard.3f9a1c2e4b7d.js) and writes .gz and .br variants next to it, plus
+# a manifest.json mapping bundle names to those files.
+#
+# Templates call asset_tags('dashboard.js'). With a build present that is one
+# tag for /assets/<fingerprinted file>, served precompressed with a one-year
+# immutable Cache-Control: a changed file gets a new name, so browsers never
+# need to revalidate. Without a build (or with ASSETS_DEBUG) it is one tag per
+# source file under /static, so editing a file needs no rebuild.
+#
+# Pages are static shells filled in by the JS API calls, so render_page()
+# keeps each rendered page in memory for the current build and answers repeat
+# loads from it, or with a 304.
+
+BUNDLES = {
+    'site.css': ['css/styles.css'],
+    'app.css': ['css/styles.css', 'css/dashboard.css'],
+    'main.js': ['js/main.js'],
+    'auth.js': ['js/main.js', 'js/auth.js'],
+    'dashboard.js': ['js/main.js', 'js/charts.js', 'js/dashboard.js'],
+    'cards.js': ['js/main.js', 'js/cards.js'],
+    'expenses.js': ['js/main.js', 'js/expenses.js'],
+    'reports.js': ['js/main.js', 'js/charts.js'],
+}
+
+MANIFEST = 'manifest.json'
+
+# ==================== Minifiers ====================
+
+def minify_js(text):
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    # Whole-line comments, indentation and blank lines only: safe without a JS parser
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text)
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    # Not around ':' — 'a :hover' and 'a:hover' are different selectors
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+MINIFIERS = {
+    '.js': (minify_js, ';\n'),
+    '.css': (minify_css, '\n'),
+}
+
+# ==================== Build ====================
+
+def write_atomic(path, data):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as out:
+        out.write(data)
+    os.replace(temp_path, path)
+
+def build(static_folder, out_dir, bundles=BUNDLES, brotli_quality=11):
+    """Write every bundle, its compressed variants and the manifest; returns {name: (filename, sizes)}."""
+    os.makedirs(out_dir, exist_ok=True)
+    built = {}
+    for name, sources in bundles.items():
+        stem, extension = os.path.splitext(name)
+        minify, separator = MINIFIERS[extension]
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+                parts.append(minify(f.read()))
+        data = separator.join(parts).encode()
+
+        filename = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+        path = os.path.join(out_dir, filename)
+        write_atomic(path, data)
+        sizes = {'identity': len(data)}
+        variants = {'gzip': ('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))}
+        if brotli is not None:
+            variants['br'] = ('.br', lambda data: brotli.compress(data, quality=brotli_quality))
+        for encoding, (suffix, compress) in variants.items():
+            encoded = compress(data)
+            write_atomic(path + suffix, encoded)
+            sizes[encoding] = len(encoded)
+        built[name] = (filename, sizes)
+
+    write_atomic(
+        os.path.join(out_dir, MANIFEST),
+        json.dumps({name: filename for name, (filename, _) in built.items()}, indent=2, sort_keys=True).encode()
+    )
+    return built
+
+def clean(out_dir, keep):
+    # Remove outputs of older builds, except the filenames in keep
+    removed = 0
+    for entry in os.scandir(out_dir):
+        base = re.sub(r'\.(gz|br)$', '', entry.name)
+        if entry.is_file() and entry.name != MANIFEST and base not in keep:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+# ==================== Extension ====================
+
+class Assets:
+    def __init__(self, app=None):
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._pages = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_DIR', os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('ASSETS_URL_PATH', '/assets')
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        app.config.setdefault('ASSETS_DEBUG', False)
+        app.config.setdefault('PAGE_CACHE', True)
+        self.config = app.config
+        self.static_folder = app.static_folder
+
+        app.add_url_rule(f"{app.config['ASSETS_URL_PATH']}/<path:filename>", 'asset', self.serve)
+        app.jinja_env.globals.update(asset_url=self.url, asset_tags=self.tags)
+        app.extensions['assets'] = self
+
+    @property
+    def manifest(self):
+        # Re-read after `flask assets build` replaces it, so a deploy needs no restart
+        path = os.path.join(self.config['ASSETS_DIR'], MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._manifest_mtime:
+            with self._lock:
+                manifest = {}
+                if mtime is not None:
+                    with open(path, encoding='utf-8') as f:
+                        manifest = json.load(f)
+                self._manifest, self._manifest_mtime = manifest, mtime
+                self._pages.clear()
+        return self._manifest
+
+    def built(self):
+        return bool(self.manifest) and not self.config['ASSETS_DEBUG']
+
+    def url(self, name):
+        """URL of a built bundle, or of its source file when there is no build."""
+        if self.built() and name in self.manifest:
+            return url_for('asset', filename=self.manifest[name])
+        sources = BUNDLES.get(name, [name])
+        if len(sources) != 1:
+            raise ValueError(f'{name} bundles {len(sources)} files; use asset_tags()')
+        return url_for('static', filename=sources[0], v=self._source_version(sources[0]))
+
+    def tags(self, name):
+        """<script>/<link> tags for a bundle: the built file, or each of its sources."""
+        if self.built() and name in self.manifest:
+            urls = [url_for('asset', filename=self.manifest[name])]
+        else:
+            urls = [url_for('static', filename=source, v=self._source_version(source)) for source in BUNDLES[name]]
+        if name.endswith('.js'):
+            template = '<script src="{}"></script>'
+        else:
+            template = '<link rel="stylesheet" href="{}">'
+        return Markup('\n    '.join(template.format(escape(url)) for url in urls))
+
+    def _source_version(self, source):
+        # Busts the browser cache for unbuilt sources whenever the file changes
+        try:
+            return int(os.stat(os.path.join(self.static_folder, source)).st_mtime)
+        except FileNotFoundError:
+            return None
+
+    def serve(self, filename):
+        # Fingerprinted files never change: cache for a year, and send a precompressed variant
+        path = safe_join(self.config['ASSETS_DIR'], filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        encoding, suffix = None, ''
+        for candidate, candidate_suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[candidate] and os.path.isfile(path + candidate_suffix):
+                encoding, suffix = candidate, candidate_suffix
+                break
+
+        response = send_from_directory(
+            self.config['ASSETS_DIR'], filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0], max_age=self.config['ASSETS_MAX_AGE']
+        )
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    def render_page(self, template_name):
+        """A template with no per-request context, rendered once per build and sent with an ETag."""
+        built = self.built()
+        key = (template_name, self._manifest_mtime, built)
+        entry = self._pages.get(key)
+        if entry is None:
+            body = render_template(template_name).encode()
+            entry = (body, hashlib.sha1(body).hexdigest())
+            if self.config['PAGE_CACHE'] and not current_app.debug:
+                with self._lock:
+                    self._pages[key] = entry
+
+        body, etag = entry
+        response = make_response(body)
+        response.mimetype = 'text/html'
+        response.set_etag(etag)
+        # Revalidated every time, so the login redirect in front of it still applies
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
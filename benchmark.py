@@ -0,0 +1,322 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Reproducible load benchmark: seed a local database with synthetic users,
+# cards and expenses, drive a weighted mix of API calls at a fixed
+# concurrency, and report per-operation latency percentiles and throughput as
+# JSON that later runs are compared against. Everything runs offline: the
+# default driver calls the app in-process through Flask's test client, and
+# --url points it at a locally running server instead.
+
+BENCH_PASSWORD = 'benchmark'
+
+# Category -> (share of expenses, median amount)
+CATEGORIES = {
+    'Food': (0.32, 18),
+    'Transport': (0.18, 12),
+    'Shopping': (0.14, 45),
+    'Bills': (0.10, 90),
+    'Entertainment': (0.10, 25),
+    'Health': (0.06, 40),
+    'Education': (0.04, 60),
+    'Rent': (0.03, 900),
+    'Other': (0.03, 30),
+}
+
+DESCRIPTIONS = {
+    'Food': ['Groceries', 'Lunch', 'Coffee', 'Dinner out', 'Bakery'],
+    'Transport': ['Bus pass', 'Fuel', 'Taxi', 'Train ticket', 'Parking'],
+    'Shopping': ['Clothes', 'Electronics', 'Books', 'Household items'],
+    'Bills': ['Electricity', 'Internet', 'Phone', 'Water'],
+    'Entertainment': ['Cinema', 'Streaming', 'Concert', 'Games'],
+    'Health': ['Pharmacy', 'Doctor', 'Gym'],
+    'Education': ['Course', 'Textbooks', 'Stationery'],
+    'Rent': ['Monthly rent'],
+    'Other': ['Gift', 'Donation', 'Misc'],
+}
+
+BENCH_EMAIL_DOMAIN = 'bench.local'
+
+def bench_email(n):
+    return f'bench{n}@{BENCH_EMAIL_DOMAIN}'
+
+# ==================== Data Generator ====================
+
+def expense_date(rng, today, days):
+    # Exponential recency: most spending is recent, with a long tail back to `days`
+    offset = min(int(rng.expovariate(3.0 / days)), days - 1)
+    return today - timedelta(days=offset)
+
+def expense_amount(rng, median):
+    return Decimal(str(round(median * rng.lognormvariate(0, 0.6), 2))).quantize(Decimal('0.01'))
+
+def seed(cur, storage, encrypt_card, password_hash, users, expenses, cards, days=365, seed_value=42, batch_size=1000):
+    """Insert users × cards × expenses and their rollup rows; returns row counts.
+
+    One bcrypt hash is shared by every synthetic user so seeding is fast; every
+    user logs in with BENCH_PASSWORD.
+    """
+    rng = random.Random(seed_value)
+    today = date.today()
+    categories = list(CATEGORIES)
+    weights = [CATEGORIES[c][0] for c in categories]
+    counts = {'users': 0, 'cards': 0, 'expenses': 0}
+
+    cur.execute("SELECT COALESCE(MAX(id), 0) as last_id FROM users")
+    first = cur.fetchone()['last_id'] + 1
+
+    for n in range(first, first + users):
+        cur.execute(
+            "INSERT INTO users (username, email, password_hash, monthly_salary) VALUES (%s, %s, %s, %s)",
+            (f'bench_user_{n}', bench_email(n), password_hash, rng.choice([1500, 2500, 4000, 6000]))
+        )
+        user_id = cur.lastrowid
+        counts['users'] += 1
+
+        card_ids = []
+        for _ in range(cards):
+            number = ''.join(str(rng.randrange(10)) for _ in range(16))
+            encrypted = encrypt_card(number)
+            cur.execute(
+                "INSERT INTO cards (user_id, card_number_encrypted, card_last_four, card_number_masked, card_key_id, "
+                "card_type, card_holder, expiry_date, balance) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                (user_id, encrypted['card_number_encrypted'], encrypted['card_last_four'],
+                 encrypted['card_number_masked'], encrypted['card_key_id'], rng.choice(['Visa', 'Mastercard']),
+                 f'Bench User {n}', f'{rng.randint(1, 12):02d}/{rng.randint(27, 31)}',
+                 Decimal(rng.randint(100, 20000)))
+            )
+            card_ids.append(cur.lastrowid)
+            counts['cards'] += 1
+
+        rollups = {}
+        batch = []
+        for _ in range(expenses):
+            category = rng.choices(categories, weights)[0]
+            amount = expense_amount(rng, CATEGORIES[category][1])
+            spent_on = expense_date(rng, today, days)
+            card_id = rng.choice(card_ids) if card_ids and rng.random() < 0.8 else None
+            batch.append((user_id, card_id, rng.choice(DESCRIPTIONS[category]), amount, category, spent_on))
+            bucket = rollups.setdefault((spent_on.strftime('%Y-%m'), category), [0, 0])
+            bucket[0] += amount
+            bucket[1] += 1
+            if len(batch) >= batch_size:
+                insert_expenses(cur, batch)
+                batch = []
+        if batch:
+            insert_expenses(cur, batch)
+        counts['expenses'] += expenses
+
+        storage.apply_rollup_deltas(
+            cur, [(user_id, month, category, total, count) for (month, category), (total, count) in rollups.items()]
+        )
+    return counts
+
+def insert_expenses(cur, rows):
+    cur.executemany(
+        "INSERT INTO expenses (user_id, card_id, description, amount, category, expense_date) VALUES (%s, %s, %s, %s, %s, %s)",
+        rows
+    )
+
+# ==================== Clients ====================
+
+class InProcessClient:
+    """Calls the WSGI app directly; no sockets involved."""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body)
+        response.close()
+        return response.status_code
+
+class HTTPClient:
+    """Calls a running server with a per-client cookie jar."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self._opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with self._opener.open(req, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+# ==================== Workloads ====================
+
+def op_dashboard(client, rng, user):
+    return client.request('GET', '/api/dashboard')
+
+def op_list_expenses(client, rng, user):
+    # Filtered, paginated listing over a recent window
+    start = date.today() - timedelta(days=rng.choice([7, 30, 90]))
+    category = rng.choice([None, *CATEGORIES])
+    path = f'/api/expenses?limit=50&start_date={start.isoformat()}'
+    if category:
+        path += f'&category={category}'
+    return client.request('GET', path)
+
+def op_add_expense(client, rng, user):
+    category = rng.choice(list(CATEGORIES))
+    return client.request('POST', '/api/expenses', {
+        'description': rng.choice(DESCRIPTIONS[category]),
+        'amount': float(expense_amount(rng, CATEGORIES[category][1])),
+        'category': category,
+        'expense_date': date.today().isoformat(),
+    })
+
+def op_login(client, rng, user):
+    return client.request('POST', '/api/login', {'email': user, 'password': BENCH_PASSWORD})
+
+WORKLOADS = {
+    'dashboard': op_dashboard,
+    'list_expenses': op_list_expenses,
+    'add_expense': op_add_expense,
+    'login': op_login,
+}
+
+DEFAULT_MIX = {'dashboard': 40, 'list_expenses': 30, 'add_expense': 20, 'login': 10}
+
+def parse_mix(spec):
+    # 'dashboard=40,login=10' -> {'dashboard': 40, 'login': 10}
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in WORKLOADS:
+            raise ValueError(f'Unknown workload {name.strip()!r}; choose from {", ".join(WORKLOADS)}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+# ==================== Driver ====================
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+def run(make_client, emails, mix, concurrency, duration=None, requests=None, warmup=0.0, seed_value=42):
+    """Drive the workload mix with `concurrency` virtual users, each logged in as
+    one of `emails`, for `duration` seconds or until `requests` calls are made."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    issued = [0]
+    state = {}
+
+    def start_clock():
+        # Runs once, before any worker is released from the barrier
+        state['measure_from'] = time.perf_counter() + warmup
+        state['deadline'] = state['measure_from'] + (duration or 0)
+
+    start_barrier = threading.Barrier(concurrency + 1, action=start_clock)
+
+    def worker(index):
+        rng = random.Random(seed_value + index)
+        user = rng.choice(emails)
+        client = make_client()
+        try:
+            op_login(client, rng, user)
+        finally:
+            start_barrier.wait()
+        while True:
+            now = time.perf_counter()
+            if duration is not None and now >= state['deadline']:
+                return
+            if requests is not None:
+                with lock:
+                    if issued[0] >= requests:
+                        return
+                    issued[0] += 1
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = WORKLOADS[name](client, rng, user)
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - started
+            if started < state['measure_from']:
+                continue
+            with lock:
+                if status is None or status >= 400:
+                    errors[name] += 1
+                else:
+                    samples[name].append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - state['measure_from']
+
+    return summarize(samples, errors, wall)
+
+def summarize(samples, errors, wall):
+    operations = {}
+    every = []
+    for name, values in samples.items():
+        values.sort()
+        every.extend(values)
+        operations[name] = latency_stats(values, errors[name], wall)
+    every.sort()
+    return {
+        'wall_seconds': round(wall, 3),
+        'total': latency_stats(every, sum(errors.values()), wall),
+        'operations': operations,
+    }
+
+def latency_stats(values, error_count, wall):
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'count': len(values),
+        'errors': error_count,
+        'throughput_rps': round(len(values) / wall, 2) if wall else None,
+        'mean_ms': ms(sum(values) / len(values)) if values else None,
+        'p50_ms': ms(percentile(values, 50)),
+        'p95_ms': ms(percentile(values, 95)),
+        'p99_ms': ms(percentile(values, 99)),
+        'max_ms': ms(values[-1]) if values else None,
+    }
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+# ==================== Comparison ====================
+
+def compare(baseline, current, metric='p95_ms', tolerance=10.0):
+    """Per-operation change in `metric` against a baseline report; an operation
+    regresses when it is more than `tolerance` percent slower."""
+    rows = []
+    for name, stats in current['results']['operations'].items():
+        before = baseline['results']['operations'].get(name, {}).get(metric)
+        after = stats.get(metric)
+        if before is None or after is None:
+            rows.append((name, before, after, None, False))
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        rows.append((name, before, after, round(change, 1), change > tolerance))
+    return rows
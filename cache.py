@@ -0,0 +1,258 @@
+from flask import g, request, session, make_response, current_app
+from functools import wraps
+from collections import OrderedDict
+import importlib
+import threading
+import hashlib
+import pickle
+import sqlite3
+import time
+import uuid
+
+# ==================== Backends ====================
+# CACHE_BACKEND picks one of these (or 'package.module:ClassName').
+#
+#   memory  the default; only safe with a single process. An invalidation
+#           reaches only the process that made the write, so other gunicorn
+#           workers and the `flask recurring worker` would keep serving stale
+#           responses, and 304s on old ETags, for up to CACHE_TTL.
+#   sqlite  one file shared by every process on the host; use it whenever more
+#           than one process serves or writes (gunicorn.conf.py and the
+#           recurring worker insist on it).
+
+class MemoryCacheBackend:
+    """Per-process LRU cache with a TTL on every entry."""
+
+    # Invalidations reach only this process
+    shared = False
+
+    def __init__(self, max_entries=1024, **options):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+class SQLiteCacheBackend:
+    """Cache in a local SQLite file, shared by every worker process on the host."""
+
+    shared = True
+
+    def __init__(self, path='instance/response_cache.db', max_entries=1024, **options):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL, touched_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_touched_at ON cache (touched_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] < time.time():
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache SET touched_at = ? WHERE key = ?", (time.time(), key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, touched_at) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value), now + ttl if ttl else None, now)
+        )
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY touched_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+BACKENDS = {
+    'memory': MemoryCacheBackend,
+    'sqlite': SQLiteCacheBackend,
+}
+
+def load_backend(name, **options):
+    # Accept a built-in name or a 'package.module:ClassName' import path
+    if name in BACKENDS:
+        return BACKENDS[name](**options)
+    module_name, _, class_name = name.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)(**options)
+
+# ==================== Response Cache ====================
+
+def new_generation():
+    return f"{time.time():.6f}-{uuid.uuid4().hex[:16]}"
+
+def generation_time(generation):
+    # When the generation was issued; tokens from before it carried a time count as new
+    seconds, _, _ = generation.partition('-')
+    try:
+        return float(seconds)
+    except ValueError:
+        return float('inf')
+
+class ResponseCache:
+    """Caches per-user GET responses and answers conditional requests with 304.
+
+    Each cached view declares the data groups it depends on ('expenses', 'cards',
+    ...). Cache keys embed the user's current generation token for those groups,
+    so invalidating a group is a single write and stale entries simply age out.
+
+    Generation tokens start with the time they were issued. A response read from
+    a replica (g.db_replica_heartbeat, set by db.py) is only stored if the
+    replica had caught up to that time, so replica lag never outlives a write.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memory')
+        app.config.setdefault('CACHE_TTL', 300)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_OPTIONS', {})
+        self.backend = load_backend(
+            app.config['CACHE_BACKEND'],
+            max_entries=app.config['CACHE_MAX_ENTRIES'],
+            **app.config['CACHE_OPTIONS']
+        )
+        app.extensions['response_cache'] = self
+
+    @property
+    def shared(self):
+        # Whether invalidations reach other processes; external backends are assumed to
+        return getattr(self.backend, 'shared', True)
+
+    def _generation(self, user_id, group):
+        key = f"gen:{user_id}:{group}"
+        generation = self.backend.get(key)
+        if generation is None:
+            generation = new_generation()
+            self.backend.set(key, generation)
+        return generation
+
+    def invalidate(self, user_id, *groups):
+        for group in groups:
+            self.backend.set(f"gen:{user_id}:{group}", new_generation())
+
+    def version(self, user_id, groups):
+        """Token that changes whenever any of the user's groups is invalidated."""
+        return ','.join(self._generation(user_id, group) for group in groups)
+
+    def _value_key(self, user_id, name, groups):
+        return f"value:{user_id}:{name}:{self.version(user_id, groups)}"
+
+    def get_value(self, user_id, name, groups):
+        """A value computed outside a request (e.g. by a batch job), or None once a group changed."""
+        return self.backend.get(self._value_key(user_id, name, groups))
+
+    def set_value(self, user_id, name, groups, value, ttl=None):
+        generations = [self._generation(user_id, group) for group in groups]
+        if self._replica_behind(max((generation_time(generation) for generation in generations), default=0.0)):
+            return
+        key = f"value:{user_id}:{name}:{','.join(generations)}"
+        self.backend.set(key, value, ttl or current_app.config['CACHE_TTL'])
+
+    def _replica_behind(self, changed_at):
+        # True if this request read from a replica that may not have the latest write yet
+        replica_heartbeat = g.get('db_replica_heartbeat')
+        return replica_heartbeat is not None and replica_heartbeat < changed_at
+
+    def _key(self, groups):
+        user_id = session['user_id']
+        generations = [self._generation(user_id, group) for group in groups]
+        query = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        g._cache_changed_at = max((generation_time(generation) for generation in generations), default=0.0)
+        return f"resp:{user_id}:{request.endpoint}:{query}:{','.join(generations)}"
+
+    def _store(self, key, response):
+        # Cache a fresh 200 response; anything else is passed through uncached
+        response = make_response(response)
+        if response.status_code != 200:
+            return None, response
+        if self._replica_behind(g.get('_cache_changed_at', 0.0)):
+            return None, response
+        body = response.get_data()
+        entry = (body, response.mimetype, hashlib.sha1(body).hexdigest())
+        self.backend.set(key, entry, current_app.config['CACHE_TTL'])
+        return entry, response
+
+    def _respond(self, entry):
+        body, mimetype, etag = entry
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(body, status=200, mimetype=mimetype)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def cached(self, *groups):
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                key = self._key(groups)
+                entry = self.backend.get(key)
+                if entry is None:
+                    entry, response = self._store(key, f(*args, **kwargs))
+                    if entry is None:
+                        return response
+                return self._respond(entry)
+            return decorated_function
+        return decorator
+
+    def cached_async(self, *groups):
+        # cached() for the async views of asgi.py; same keys, so both share entries
+        def decorator(f):
+            @wraps(f)
+            async def decorated_function(*args, **kwargs):
+                key = self._key(groups)
+                entry = self.backend.get(key)
+                if entry is None:
+                    entry, response = self._store(key, await f(*args, **kwargs))
+                    if entry is None:
+                        return response
+                return self._respond(entry)
+            return decorated_function
+        return decorator
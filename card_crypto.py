@@ -0,0 +1,128 @@
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+from instrumentation import timed
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Card number encryption with key rotation. Keys are listed newest first: the
+# first one encrypts, every one of them can decrypt. Each row records the id
+# of the key that encrypted it (card_key_id), so rotation only touches rows
+# still on an older key, and the masked form is stored alongside so listing
+# cards never needs to decrypt anything. Cards from before the masked columns
+# existed get them from backfill_masked_batch(), run by `flask db upgrade`.
+
+def key_id(key):
+    # Short, stable fingerprint of a key; never the key itself
+    return hashlib.sha256(key if isinstance(key, bytes) else key.encode()).hexdigest()[:8]
+
+def mask_last_four(last_four):
+    return '**** **** **** ' + last_four
+
+class CardCipher:
+    def __init__(self, keys):
+        if not keys:
+            raise ValueError('At least one card encryption key is required')
+        self.keys = [key if isinstance(key, bytes) else key.encode() for key in keys]
+        self.primary_key_id = key_id(self.keys[0])
+        self._fernet = MultiFernet([Fernet(key) for key in self.keys])
+
+    def encrypt(self, card_number):
+        """Return the stored columns for a new card number."""
+        with timed('fernet'):
+            token = self._fernet.encrypt(card_number.encode()).decode()
+        return {
+            'card_number_encrypted': token,
+            'card_last_four': card_number[-4:],
+            'card_number_masked': mask_last_four(card_number[-4:]),
+            'card_key_id': self.primary_key_id,
+        }
+
+    def decrypt(self, token):
+        with timed('fernet'):
+            return self._fernet.decrypt(token.encode()).decode()
+
+    def rotate(self, token):
+        # Decrypt with whichever key matches and re-encrypt under the primary key
+        card_number = self.decrypt(token)
+        return self.encrypt(card_number)
+
+# ==================== Rotation ====================
+
+ROTATION_BATCH_QUERY = """
+    SELECT id, user_id, card_number_encrypted
+    FROM cards
+    WHERE id > %s AND (card_key_id IS NULL OR card_key_id <> %s OR card_last_four IS NULL)
+    ORDER BY id
+    LIMIT %s
+"""
+
+def rotate_batch(cur, storage, cipher, after_id, batch_size):
+    """Re-encrypt (and backfill the masked columns of) one batch of cards after
+    after_id, on the caller's transaction. Returns (rows updated, ids of users
+    whose cards changed, last id seen); last id is None once no rows remain."""
+    cur.execute(
+        ROTATION_BATCH_QUERY + storage.lock_rows,
+        (after_id, cipher.primary_key_id, batch_size)
+    )
+    rows = cur.fetchall()
+    if not rows:
+        return 0, set(), None
+
+    updates = []
+    for row in rows:
+        try:
+            columns = cipher.rotate(row['card_number_encrypted'])
+        except InvalidToken:
+            # Encrypted under a key that is no longer configured; leave it for an operator
+            logger.error('Card %s cannot be decrypted with any configured key', row['id'])
+            continue
+        updates.append((
+            columns['card_number_encrypted'], columns['card_last_four'],
+            columns['card_number_masked'], columns['card_key_id'], row['id']
+        ))
+
+    if updates:
+        cur.executemany(
+            "UPDATE cards SET card_number_encrypted = %s, card_last_four = %s, "
+            "card_number_masked = %s, card_key_id = %s WHERE id = %s",
+            updates
+        )
+    return len(updates), {row['user_id'] for row in rows}, rows[-1]['id']
+
+BACKFILL_BATCH_QUERY = """
+    SELECT id, user_id, card_number_encrypted
+    FROM cards
+    WHERE id > %s AND card_number_masked IS NULL
+    ORDER BY id
+    LIMIT %s
+"""
+
+def backfill_masked_batch(cur, storage, cipher, after_id, batch_size):
+    """Fill card_last_four and card_number_masked for one batch of cards after
+    after_id, leaving the ciphertext alone. Returns the same triple as
+    rotate_batch()."""
+    cur.execute(BACKFILL_BATCH_QUERY + storage.lock_rows, (after_id, batch_size))
+    rows = cur.fetchall()
+    if not rows:
+        return 0, set(), None
+
+    updates = []
+    for row in rows:
+        try:
+            last_four = cipher.decrypt(row['card_number_encrypted'])[-4:]
+        except InvalidToken:
+            logger.error('Card %s cannot be decrypted with any configured key', row['id'])
+            continue
+        updates.append((last_four, mask_last_four(last_four), row['id']))
+
+    if updates:
+        cur.executemany(
+            "UPDATE cards SET card_last_four = %s, card_number_masked = %s WHERE id = %s",
+            updates
+        )
+    return len(updates), {row['user_id'] for row in rows}, rows[-1]['id']
+
+def key_usage(cur):
+    cur.execute("SELECT card_key_id, COUNT(*) as cards FROM cards GROUP BY card_key_id")
+    return {row['card_key_id']: row['cards'] for row in cur.fetchall()}
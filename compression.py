@@ -0,0 +1,91 @@
+from flask import request
+from collections import OrderedDict
+import gzip
+import threading
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Response compression negotiated from Accept-Encoding. Bodies are compressed
+# once per (ETag, encoding) and kept in a small LRU, so cached responses such
+# as the dashboard are not recompressed on every poll. Streamed responses
+# (NDJSON, exports, SSE) are left alone.
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain', 'text/csv',
+    'application/javascript', 'text/javascript', 'image/svg+xml',
+}
+
+class Compression:
+    def __init__(self, app=None):
+        self._compressed = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+        app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 5)
+        app.config.setdefault('COMPRESS_CACHE_ENTRIES', 256)
+        self.config = app.config
+        app.after_request(self.compress)
+        app.extensions['compression'] = self
+
+    def negotiate(self):
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    def encode(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.config['COMPRESS_BROTLI_QUALITY'])
+        return gzip.compress(data, compresslevel=self.config['COMPRESS_GZIP_LEVEL'], mtime=0)
+
+    def compress(self, response):
+        if (response.mimetype not in COMPRESSIBLE_MIMETYPES or response.is_streamed
+                or response.direct_passthrough or 'Content-Encoding' in response.headers):
+            return response
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The encoded bytes differ from the identity body the ETag was computed from
+            response.set_etag(etag, weak=True)
+        response.vary.add('Accept-Encoding')
+
+        if response.status_code != 200 or response.content_length is None \
+                or response.content_length < self.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = self.negotiate()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        key = (etag, encoding) if etag else None
+        compressed = self._cached(key) if key else None
+        if compressed is None:
+            compressed = self.encode(data, encoding)
+            if key:
+                self._store(key, compressed)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def _cached(self, key):
+        with self._lock:
+            compressed = self._compressed.get(key)
+            if compressed is not None:
+                self._compressed.move_to_end(key)
+            return compressed
+
+    def _store(self, key, compressed):
+        with self._lock:
+            self._compressed[key] = compressed
+            while len(self._compressed) > self.config['COMPRESS_CACHE_ENTRIES']:
+                self._compressed.popitem(last=False)
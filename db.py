@@ -0,0 +1,540 @@
+from flask import g, session
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import wraps
+from storage import STORAGES
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Pooled database access. Routes never open connections themselves: a request
+# checks one out of the pool on first use (Database.connection), works through
+# Database.cursor() / Database.transaction(), and the connection goes back to
+# the pool at app-context teardown with any uncommitted work rolled back.
+#
+# With DB_REPLICAS configured, views marked @db.read_only get their cursors
+# from a replica instead (Database.read_connection). A background monitor
+# writes a heartbeat row on the primary every DB_REPLICA_CHECK_INTERVAL and
+# reads it back from each replica: a replica is used only while its heartbeat
+# is less than DB_REPLICA_MAX_LAG seconds old. After a session commits a write
+# its reads stay on the primary until a replica has replicated a heartbeat
+# newer than that write (read-your-writes), for at most
+# DB_READ_YOUR_WRITES_WINDOW seconds.
+
+class PoolTimeout(Exception):
+    pass
+
+# ==================== Drivers ====================
+
+class MySQLDriver:
+    name = 'mysql'
+
+    def __init__(self, config):
+        import MySQLdb
+        import MySQLdb.cursors
+        self._mysqldb = MySQLdb
+        self._cursors = MySQLdb.cursors
+        self.kwargs = {
+            'host': config['MYSQL_HOST'],
+            'user': config['MYSQL_USER'],
+            'passwd': config['MYSQL_PASSWORD'],
+            'db': config['MYSQL_DB'],
+            'port': int(config.get('MYSQL_PORT', 3306)),
+            'charset': 'utf8mb4',
+            'connect_timeout': int(config.get('MYSQL_CONNECT_TIMEOUT', 5)),
+        }
+
+    def connect(self):
+        return self._mysqldb.connect(**self.kwargs)
+
+    def ping(self, conn):
+        conn.ping()
+
+    def cursor(self, conn, unbuffered=False):
+        return conn.cursor(self._cursors.SSDictCursor if unbuffered else self._cursors.DictCursor)
+
+class SQLiteCursor:
+    """DB-API cursor over sqlite3 that accepts MySQLdb-style %s placeholders and returns dict rows."""
+
+    PLACEHOLDER = re.compile(r'%%|%s')
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _translate(self, query):
+        return self.PLACEHOLDER.sub(lambda m: '%' if m.group() == '%%' else '?', query)
+
+    def execute(self, query, params=()):
+        self._cursor.execute(self._translate(query), tuple(params or ()))
+        return self._cursor.rowcount
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(self._translate(query), [tuple(p) for p in seq_of_params])
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+def dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+# Money is stored with NUMERIC affinity; let Decimal parameters bind as text and
+# read DECIMAL columns back as Decimal, matching what MySQLdb returns
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+
+class SQLiteDriver:
+    name = 'sqlite'
+
+    def __init__(self, config):
+        self.path = config['SQLITE_PATH']
+        self.statement_cache_size = int(config.get('SQLITE_STATEMENT_CACHE', 256))
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=5,
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.statement_cache_size
+        )
+        conn.row_factory = dict_row
+        return conn
+
+    def ping(self, conn):
+        conn.execute("SELECT 1")
+
+    def cursor(self, conn, unbuffered=False):
+        return SQLiteCursor(conn.cursor())
+
+DRIVERS = {
+    'mysql': MySQLDriver,
+    'sqlite': SQLiteDriver,
+}
+
+# ==================== Pool ====================
+
+class PooledConnection:
+    __slots__ = ('conn', 'created_at', 'last_used', 'checked_out_at')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+        self.checked_out_at = None
+
+class ConnectionPool:
+    """Bounded, thread-safe pool. Idle connections are reused most-recent first,
+    pinged when they have sat idle longer than ping_interval, and replaced once
+    older than recycle seconds."""
+
+    def __init__(self, driver, max_size=10, timeout=5.0, recycle=3600, ping_interval=30, on_connect=None):
+        self.driver = driver
+        self.on_connect = on_connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._idle = []
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'discarded': 0,
+            'failed_pings': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'checkout_seconds_total': 0.0,
+            'checkout_seconds_max': 0.0,
+            'held_seconds_total': 0.0,
+        }
+
+    def acquire(self):
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f'No database connection available within {self.timeout}s')
+                self._waiting += 1
+                self._cond.wait(remaining)
+                self._waiting -= 1
+            self._in_use += 1
+        waited = time.perf_counter() - started
+
+        try:
+            pooled = self._checked(pooled)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.perf_counter() - started
+        pooled.checked_out_at = time.monotonic()
+        with self._cond:
+            stats = self._stats
+            stats['checkouts'] += 1
+            stats['wait_seconds_total'] += waited
+            stats['wait_seconds_max'] = max(stats['wait_seconds_max'], waited)
+            stats['checkout_seconds_total'] += elapsed
+            stats['checkout_seconds_max'] = max(stats['checkout_seconds_max'], elapsed)
+        return pooled
+
+    def _checked(self, pooled):
+        # Hand out a live connection: new, validated, or a replacement for a stale one
+        now = time.monotonic()
+        if pooled is not None and now - pooled.created_at > self.recycle:
+            self._close(pooled)
+            pooled = None
+        if pooled is not None and now - pooled.last_used > self.ping_interval:
+            try:
+                self.driver.ping(pooled.conn)
+            except Exception:
+                self._stats['failed_pings'] += 1
+                self._close(pooled)
+                pooled = None
+        if pooled is None:
+            conn = self.driver.connect()
+            if self.on_connect is not None:
+                self.on_connect(conn)
+            pooled = PooledConnection(conn)
+            self._stats['connects'] += 1
+        return pooled
+
+    def _close(self, pooled):
+        self._stats['discarded'] += 1
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def release(self, pooled):
+        # Reset the session; a connection that cannot roll back is broken and dropped
+        try:
+            pooled.conn.rollback()
+            healthy = True
+        except Exception:
+            self._close(pooled)
+            healthy = False
+
+        now = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._stats['held_seconds_total'] += now - pooled.checked_out_at
+            if healthy:
+                pooled.last_used = now
+                self._idle.append(pooled)
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'engine': self.driver.name,
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                **self._stats,
+            }
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                self._close(self._idle.pop())
+                self._size -= 1
+
+# ==================== Replicas ====================
+
+def replica_config(config, endpoint):
+    # DB_REPLICAS entries are 'host' or 'host:port' for MySQL and file paths for SQLite
+    if config['DB_ENGINE'] == 'sqlite':
+        return {**config, 'SQLITE_PATH': endpoint}
+    host, _, port = endpoint.partition(':')
+    return {**config, 'MYSQL_HOST': host, 'MYSQL_PORT': int(port or config.get('MYSQL_PORT', 3306))}
+
+class Replica:
+    """A read replica's pool plus what the last health check saw."""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        # Newest primary heartbeat (time.time()) the replica has applied
+        self.heartbeat = None
+        self.lag = None
+        self.checked_at = None
+        self.error = None
+
+    def healthy(self, max_lag, stale_after):
+        # A replica nobody has checked recently is not trusted either
+        return (
+            self.lag is not None and self.lag <= max_lag
+            and self.checked_at is not None and time.monotonic() - self.checked_at <= stale_after
+        )
+
+    def stats(self, max_lag, stale_after):
+        return {
+            'name': self.name,
+            'healthy': self.healthy(max_lag, stale_after),
+            'lag_seconds': round(self.lag, 3) if self.lag is not None else None,
+            'error': self.error,
+            'pool': self.pool.stats(),
+        }
+
+# ==================== Flask Extension ====================
+
+class Database:
+    def __init__(self, app=None):
+        self.pool = None
+        self.driver = None
+        self.storage = None
+        self.replicas = []
+        self._monitor = None
+        self._monitor_lock = threading.Lock()
+        # Optional callable wrapping every cursor handed out (query instrumentation)
+        self.cursor_wrapper = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('DB_ENGINE', 'mysql')
+        app.config.setdefault('SQLITE_PATH', 'instance/finance_tracker.db')
+        app.config.setdefault('DB_AUTO_MIGRATE', False)
+        app.config.setdefault('DB_POOL_SIZE', 10)
+        app.config.setdefault('DB_POOL_TIMEOUT', 5.0)
+        app.config.setdefault('DB_POOL_RECYCLE', 3600)
+        app.config.setdefault('DB_POOL_PING_INTERVAL', 30)
+        app.config.setdefault('DB_REPLICAS', [])
+        app.config.setdefault('DB_REPLICA_POOL_SIZE', app.config['DB_POOL_SIZE'])
+        app.config.setdefault('DB_REPLICA_MAX_LAG', 5.0)
+        app.config.setdefault('DB_REPLICA_CHECK_INTERVAL', 1.0)
+        app.config.setdefault('DB_READ_YOUR_WRITES_WINDOW', 30.0)
+        self.config = app.config
+        self.driver = DRIVERS[app.config['DB_ENGINE']](app.config)
+        self.storage = STORAGES[app.config['DB_ENGINE']]()
+        self.pool = ConnectionPool(
+            self.driver,
+            max_size=app.config['DB_POOL_SIZE'],
+            timeout=app.config['DB_POOL_TIMEOUT'],
+            recycle=app.config['DB_POOL_RECYCLE'],
+            ping_interval=app.config['DB_POOL_PING_INTERVAL'],
+            on_connect=self.storage.configure,
+        )
+        self.replicas = [
+            Replica(endpoint, ConnectionPool(
+                DRIVERS[app.config['DB_ENGINE']](replica_config(app.config, endpoint)),
+                max_size=app.config['DB_REPLICA_POOL_SIZE'],
+                timeout=app.config['DB_POOL_TIMEOUT'],
+                recycle=app.config['DB_POOL_RECYCLE'],
+                ping_interval=app.config['DB_POOL_PING_INTERVAL'],
+                on_connect=self._configure_replica,
+            ))
+            for endpoint in app.config['DB_REPLICAS']
+        ]
+        app.extensions['database'] = self
+        app.teardown_appcontext(self.teardown)
+        if self.replicas:
+            app.before_request(self._load_last_write)
+            app.after_request(self._record_write)
+
+        if app.config['DB_AUTO_MIGRATE']:
+            with app.app_context():
+                self.migrate()
+
+    @property
+    def connection(self):
+        # One pooled connection per app context, checked out on first use
+        if '_db_connection' not in g:
+            g._db_connection = self.pool.acquire()
+        return g._db_connection.conn
+
+    @property
+    def read_connection(self):
+        # In a @db.read_only view: a healthy replica's connection if one may serve
+        # this session, otherwise the primary. Chosen once per app context
+        if '_db_read_connection' not in g:
+            g._db_read_connection = None
+            replica = self.choose_replica(g.get('_db_last_write'))
+            if replica is not None:
+                try:
+                    g._db_read_connection = (replica, replica.pool.acquire())
+                    g.db_replica_heartbeat = replica.heartbeat
+                except Exception as e:
+                    replica.error = str(e)
+        if g._db_read_connection is None:
+            return self.connection
+        return g._db_read_connection[1].conn
+
+    def teardown(self, exception):
+        pooled = g.pop('_db_connection', None)
+        if pooled is not None:
+            self.pool.release(pooled)
+        routed = g.pop('_db_read_connection', None)
+        if routed is not None:
+            replica, pooled = routed
+            replica.pool.release(pooled)
+
+    def read_only(self, f):
+        """Route decorator: the view never writes, so db.cursor() may read from a replica."""
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            g._db_read_only = True
+            return f(*args, **kwargs)
+        return decorated_function
+
+    @contextmanager
+    def cursor(self, unbuffered=False):
+        conn = self.read_connection if self.replicas and g.get('_db_read_only') else self.connection
+        with self._cursor(conn, unbuffered) as cur:
+            yield cur
+
+    @contextmanager
+    def _cursor(self, conn, unbuffered=False):
+        cur = self.driver.cursor(conn, unbuffered)
+        if self.cursor_wrapper is not None:
+            cur = self.cursor_wrapper(cur)
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    def migrate(self):
+        return self.storage.migrate(self.connection)
+
+    @contextmanager
+    def transaction(self):
+        # Commit when the block finishes, roll back if it raises; always on the primary
+        conn = self.connection
+        with self._cursor(conn) as cur:
+            try:
+                self.storage.begin(conn, cur)
+                yield cur
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        g._db_wrote = True
+
+    # ---- Replicas ----
+
+    def _configure_replica(self, conn):
+        self.storage.configure(conn)
+        self.storage.configure_read_only(conn)
+
+    def _load_last_write(self):
+        # The session's last write, while it still constrains which replicas may serve it
+        last_write = session.get('_db_last_write')
+        if last_write and time.time() - last_write < self.config['DB_READ_YOUR_WRITES_WINDOW']:
+            g._db_last_write = last_write
+
+    def _record_write(self, response):
+        if g.get('_db_wrote') and 'user_id' in session:
+            session['_db_last_write'] = time.time()
+        return response
+
+    def choose_replica(self, last_write=None):
+        """A random healthy replica that has replicated past last_write, or None for the primary."""
+        if not self.replicas:
+            return None
+        self.start_monitor()
+        max_lag, stale_after = self.config['DB_REPLICA_MAX_LAG'], self.config['DB_REPLICA_CHECK_INTERVAL'] * 3
+        candidates = [
+            replica for replica in self.replicas
+            if replica.healthy(max_lag, stale_after) and (last_write is None or replica.heartbeat >= last_write)
+        ]
+        return random.choice(candidates) if candidates else None
+
+    def check_replicas(self):
+        """Measure every replica's lag, then write the next heartbeat on the primary."""
+        now = time.time()
+        for replica in self.replicas:
+            try:
+                pooled = replica.pool.acquire()
+                try:
+                    cur = replica.pool.driver.cursor(pooled.conn)
+                    cur.execute("SELECT beat_at FROM replication_heartbeat WHERE id = 1")
+                    row = cur.fetchone()
+                    cur.close()
+                finally:
+                    replica.pool.release(pooled)
+                replica.heartbeat = float(row['beat_at']) if row else None
+                replica.lag = max(0.0, now - replica.heartbeat) if row else None
+                replica.error = None if row else 'No heartbeat replicated yet'
+            except Exception as e:
+                replica.lag, replica.error = None, str(e)
+            replica.checked_at = time.monotonic()
+
+        pooled = self.pool.acquire()
+        try:
+            cur = self.driver.cursor(pooled.conn)
+            cur.execute(
+                self.storage.upsert_sql('replication_heartbeat', ['id', 'beat_at'], keys=['id'], replace=['beat_at']),
+                (1, time.time())
+            )
+            cur.close()
+            pooled.conn.commit()
+        finally:
+            self.pool.release(pooled)
+
+    def run_monitor(self, stop=None):
+        interval = self.config['DB_REPLICA_CHECK_INTERVAL']
+        while stop is None or not stop.is_set():
+            started = time.monotonic()
+            try:
+                self.check_replicas()
+            except Exception:
+                logger.exception('Replica health check failed')
+            (stop or threading.Event()).wait(max(0, interval - (time.monotonic() - started)))
+
+    def start_monitor(self):
+        # Every process checks its own replicas; started on the first routed read
+        if self._monitor is None:
+            with self._monitor_lock:
+                if self._monitor is None:
+                    self._monitor = threading.Thread(target=self.run_monitor, name='replica-monitor', daemon=True)
+                    self._monitor.start()
+
+    def replica_stats(self):
+        max_lag, stale_after = self.config['DB_REPLICA_MAX_LAG'], self.config['DB_REPLICA_CHECK_INTERVAL'] * 3
+        return [replica.stats(max_lag, stale_after) for replica in self.replicas]
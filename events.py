@@ -0,0 +1,295 @@
+from collections import deque
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Live per-user events for Server-Sent Events streams. Write routes publish
+# small deltas (a new expense, a changed monthly or category total, a new
+# notification) after their transaction commits; each open /api/events stream
+# holds a Subscription that receives only its user's events.
+#
+# An idle stream is a blocked queue.get, so under a cooperative worker (gunicorn
+# -k gevent) thousands of open streams cost one greenlet each, not one thread.
+# Under ASGI (asgi.py) EventBus.stream_async waits on an asyncio.Event instead,
+# so an idle stream costs one task.
+#
+# EVENTS_BROKER=memory only suits a single process: events reach streams held
+# by the process that published them, and event ids are a per-process counter,
+# so a client reconnecting to another worker replays the wrong events from its
+# Last-Event-ID. With several workers use 'sqlite' (gunicorn.conf.py insists),
+# whose ids come from one shared table.
+
+class Subscription:
+    def __init__(self, broker, user_id, max_pending):
+        self.broker = broker
+        self.user_id = user_id
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+        # Called from the publishing thread after every delivery (async streams)
+        self.on_deliver = None
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # A client this far behind reloads instead of replaying every delta
+            self.overflowed = True
+        if self.on_deliver is not None:
+            self.on_deliver()
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def poll(self):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def reset(self):
+        # Drop everything pending; the client is about to reload from scratch
+        self.overflowed = False
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+# ==================== Brokers ====================
+
+class InProcessBroker:
+    """Fans events out to subscribers in this process only; ids are per process."""
+
+    shared = False
+
+    def __init__(self, replay=1000, max_pending=100, **options):
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._recent = deque(maxlen=replay)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, last_event_id=None):
+        subscription = Subscription(self, user_id, self.max_pending)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            # Replay what a reconnecting client missed, if it is still buffered
+            if last_event_id is not None:
+                for event in self._recent:
+                    if event[0] > last_event_id and event[1] == user_id:
+                        subscription.deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id, name, data):
+        self._dispatch((next(self._ids), user_id, name, data))
+
+    def _dispatch(self, event):
+        with self._lock:
+            self._recent.append(event)
+            subscribers = list(self._subscribers.get(event[1], ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+class SQLiteBroker(InProcessBroker):
+    """Local broker stand-in: events go through a shared SQLite file, so writes
+    made by any process (web workers, `flask alerts worker`) reach streams held
+    by any other. One tail thread per process fans rows out to local streams."""
+
+    shared = True
+
+    def __init__(self, path='instance/event_log.db', poll_interval=0.5, retention=3600, prune_interval=60, **options):
+        super().__init__(**options)
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._next_prune = 0
+        self._local = threading.local()
+        self._tail = None
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, "
+            "name TEXT NOT NULL, data TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS events_created_at ON events (created_at)")
+        self._last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, user_id, name, data):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT INTO events (user_id, name, data, created_at) VALUES (?, ?, ?, ?)",
+            (user_id, name, json.dumps(data, default=str), now)
+        )
+        # Expired rows are dropped every prune_interval, not on every write
+        if now >= self._next_prune:
+            self._next_prune = now + self.prune_interval
+            conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.retention,))
+
+    def subscribe(self, user_id, last_event_id=None):
+        if self._tail is None:
+            self._start_tail()
+        subscription = super().subscribe(user_id)
+        if last_event_id is not None:
+            rows = self._connection().execute(
+                "SELECT id, user_id, name, data FROM events WHERE user_id = ? AND id > ? AND id <= ? ORDER BY id",
+                (user_id, last_event_id, self._last_id)
+            ).fetchall()
+            for event_id, event_user, name, data in rows:
+                subscription.deliver((event_id, event_user, name, json.loads(data)))
+        return subscription
+
+    def _start_tail(self):
+        with self._lock:
+            if self._tail is None:
+                self._tail = threading.Thread(target=self._run_tail, name='event-tail', daemon=True)
+                self._tail.start()
+
+    def _run_tail(self):
+        while True:
+            try:
+                rows = self._connection().execute(
+                    "SELECT id, user_id, name, data FROM events WHERE id > ? ORDER BY id LIMIT 1000",
+                    (self._last_id,)
+                ).fetchall()
+            except sqlite3.Error:
+                logger.exception('Event tail query failed')
+                rows = []
+            for event_id, user_id, name, data in rows:
+                self._last_id = event_id
+                self._dispatch((event_id, user_id, name, json.loads(data)))
+            if not rows:
+                time.sleep(self.poll_interval)
+
+BROKERS = {
+    'memory': InProcessBroker,
+    'sqlite': SQLiteBroker,
+}
+
+def load_broker(name):
+    # A registered name, or 'package.module:ClassName' for an external broker
+    if name in BROKERS:
+        return BROKERS[name]
+    module_name, _, class_name = name.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+# ==================== Extension ====================
+
+def format_event(event):
+    event_id, _, name, data = event
+    return f"id: {event_id}\nevent: {name}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+class EventBus:
+    def __init__(self, app=None):
+        self.broker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_BROKER', 'memory')
+        app.config.setdefault('EVENTS_BROKER_OPTIONS', {})
+        app.config.setdefault('EVENTS_KEEPALIVE', 15)
+        self.keepalive = app.config['EVENTS_KEEPALIVE']
+        self.broker = load_broker(app.config['EVENTS_BROKER'])(**app.config['EVENTS_BROKER_OPTIONS'])
+        app.extensions['event_bus'] = self
+
+    @property
+    def shared(self):
+        # Whether events published here reach streams held by other processes
+        return getattr(self.broker, 'shared', True)
+
+    def publish(self, user_id, name, data):
+        try:
+            self.broker.publish(user_id, name, data)
+        except Exception:
+            # Live updates are best effort; the write itself already committed
+            logger.exception('Failed to publish %s event for user %s', name, user_id)
+
+    def stream(self, user_id, last_event_id=None):
+        """Yield SSE frames for user_id until the client disconnects."""
+        subscription = self.broker.subscribe(user_id, last_event_id)
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield 'retry: 3000\n\n'
+            while True:
+                event = subscription.get(timeout=self.keepalive)
+                if subscription.overflowed:
+                    subscription.reset()
+                    yield format_event((event[0] if event else 0, user_id, 'resync', {}))
+                elif event is not None:
+                    yield format_event(event)
+                else:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+        finally:
+            subscription.close()
+
+    async def stream_async(self, user_id, last_event_id=None):
+        """stream() for the ASGI entry point: the same frames, awaited instead of blocking."""
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The loop has shut down; nobody is listening any more
+                pass
+
+        subscription = self.broker.subscribe(user_id, last_event_id)
+        subscription.on_deliver = wake
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                ready.clear()
+                event = subscription.poll()
+                if event is None and not subscription.overflowed:
+                    try:
+                        await asyncio.wait_for(ready.wait(), self.keepalive)
+                    except asyncio.TimeoutError:
+                        pass
+                    event = subscription.poll()
+                if subscription.overflowed:
+                    subscription.reset()
+                    yield format_event((event[0] if event else 0, user_id, 'resync', {}))
+                elif event is not None:
+                    yield format_event(event)
+                else:
+                    yield ': keepalive\n\n'
+        finally:
+            subscription.on_deliver = None
+            subscription.close()
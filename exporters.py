@@ -0,0 +1,120 @@
+from datetime import datetime, date
+from decimal import Decimal
+import csv
+import io
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+# Streaming writers for expense export. Each takes an iterator of row dicts
+# (straight off a server-side cursor) and yields encoded chunks, so memory use
+# is bounded by one block of rows no matter how long the history is.
+
+EXPORT_COLUMNS = ['id', 'expense_date', 'description', 'category', 'amount', 'card_type', 'card_holder', 'created_at']
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def iter_blocks(rows, block_size):
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) >= block_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+# ==================== CSV ====================
+
+def stream_csv(rows, block_size=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for block in iter_blocks(rows, block_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([export_value(row.get(column)) for column in EXPORT_COLUMNS] for row in block)
+        yield buffer.getvalue()
+
+# ==================== Columnar ====================
+
+def stream_columns(rows, block_size=5000):
+    # Newline-delimited JSON row groups: one {"column": [values...]} object per
+    # block, so keys are written once per block instead of once per row.
+    yield json.dumps({'columns': EXPORT_COLUMNS}) + '\n'
+    for block in iter_blocks(rows, block_size):
+        group = {column: [export_value(row.get(column)) for row in block] for column in EXPORT_COLUMNS}
+        yield json.dumps(group, separators=(',', ':')) + '\n'
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file object that hands written bytes back to the generator
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def parquet_schema():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('expense_date', pa.date32()),
+        ('description', pa.string()),
+        ('category', pa.string()),
+        ('amount', pa.decimal128(14, 2)),
+        ('card_type', pa.string()),
+        ('card_holder', pa.string()),
+        ('created_at', pa.timestamp('s')),
+    ])
+
+def stream_parquet(rows, block_size=50000):
+    # One Parquet row group per block, flushed to the client as it is written
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for block in iter_blocks(rows, block_size):
+            columns = {column: [row.get(column) for row in block] for column in EXPORT_COLUMNS}
+            columns['expense_date'] = [
+                value.date() if isinstance(value, datetime) else value for value in columns['expense_date']
+            ]
+            writer.write_table(pa.table(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'columns': (stream_columns, 'application/x-ndjson', 'columns.ndjson'),
+    'parquet': (stream_parquet, 'application/vnd.apache.parquet', 'parquet'),
+}
+
+def parquet_available():
+    return pq is not None
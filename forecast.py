@@ -0,0 +1,293 @@
+from datetime import date, timedelta
+import calendar
+import math
+
+try:
+    import numpy as np
+except ImportError:  # Forecasting is optional
+    np = None
+
+# Spending forecasts for /api/analytics/forecast. A user's recent expenses are
+# loaded with one query into column arrays, and everything else is NumPy over
+# those arrays:
+#
+#   projection  end-of-month total from the month-to-date run rate blended with
+#               the user's usual daily spend, with a 90% range, against salary
+#   trends      per-category least-squares slope over the last full months
+#   outliers    recent expenses far above what the user usually spends in that
+#               category, by a robust z-score (median/MAD) over a rolling window
+#
+# ForecastEngine.iter_all() scores every user in one pass over a single ordered
+# query, for `flask analytics forecast` to precompute results nightly.
+
+FORECAST_COLUMNS = "e.user_id, e.id, e.expense_date, e.category, e.amount, e.description"
+
+USER_SERIES_QUERY = f"""
+    SELECT {FORECAST_COLUMNS}
+    FROM expenses e
+    WHERE e.user_id = %s AND e.expense_date >= %s AND e.expense_date <= %s
+    ORDER BY e.expense_date, e.id
+"""
+
+ALL_SERIES_QUERY = f"""
+    SELECT {FORECAST_COLUMNS}, u.monthly_salary
+    FROM expenses e
+    JOIN users u ON u.id = e.user_id
+    WHERE e.expense_date >= %s AND e.expense_date <= %s
+    ORDER BY e.user_id, e.expense_date, e.id
+"""
+
+# z-scores from the median absolute deviation (Iglewicz and Hoaglin)
+MAD_SCALE = 1.4826
+# Two-sided 90% interval of a normal distribution
+INTERVAL_Z = 1.645
+# Below this slope, as a percentage of the category's monthly mean, a trend is flat
+FLAT_TREND_PCT = 5.0
+
+def forecast_available():
+    return np is not None
+
+def month_number(day):
+    return day.year * 12 + day.month - 1
+
+def month_label(number):
+    year, month = divmod(number, 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+def epoch_day(day):
+    return (day - date(1970, 1, 1)).days
+
+# ==================== Series ====================
+
+class ExpenseSeries:
+    """One user's expenses as parallel column arrays, ordered by date."""
+
+    def __init__(self, ids, days, categories, amounts, descriptions):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.days = np.asarray(days, dtype=np.int64)
+        self.amounts = np.asarray(amounts, dtype=np.float64)
+        self.descriptions = descriptions
+        self.category_names, self.category_index = np.unique(np.asarray(categories, dtype=object).astype(str), return_inverse=True)
+        # Month number (year * 12 + month - 1) of every expense
+        self.months = self.days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64) + 1970 * 12
+
+    @classmethod
+    def from_columns(cls, columns):
+        # expense_date is a date on MySQL and a 'YYYY-MM-DD' string on SQLite
+        days = [epoch_day(date.fromisoformat(str(value)[:10])) for value in columns['expense_date']]
+        amounts = [float(value) for value in columns['amount']]
+        return cls(columns['id'], days, columns['category'], amounts, columns['description'])
+
+    def __len__(self):
+        return len(self.ids)
+
+# ==================== Models ====================
+
+def project_month(series, today, monthly_salary, baseline_days):
+    """Projected total for today's month, and how it compares with the salary."""
+    days_in_month = calendar.monthrange(today.year, today.month)[1]
+    month_start = epoch_day(today.replace(day=1))
+    end = epoch_day(today)
+
+    in_month = (series.days >= month_start) & (series.days <= end)
+    spent = float(series.amounts[in_month].sum())
+    run_rate = spent / today.day
+
+    # Usual daily spend over the days before this month (fewer for a new user)
+    first_day = month_start - baseline_days
+    if len(series):
+        first_day = min(max(first_day, int(series.days.min())), month_start)
+    before = (series.days >= first_day) & (series.days < month_start)
+    daily = np.bincount(series.days[before] - first_day, weights=series.amounts[before], minlength=month_start - first_day)
+    if len(daily):
+        baseline_rate = float(daily.mean())
+        daily_sd = float(daily.std(ddof=1)) if len(daily) > 1 else 0.0
+    else:
+        baseline_rate, daily_sd = run_rate, 0.0
+
+    # Trust the run rate more as the month goes on
+    weight = today.day / days_in_month
+    rate = weight * run_rate + (1 - weight) * baseline_rate
+    remaining_days = days_in_month - today.day
+    projected = spent + rate * remaining_days
+    margin = INTERVAL_Z * daily_sd * math.sqrt(remaining_days)
+    low, high = max(spent, projected - margin), projected + margin
+
+    salary = float(monthly_salary or 0)
+    if not salary:
+        status = None
+    elif projected > salary:
+        status = 'over'
+    elif high > salary:
+        status = 'at_risk'
+    else:
+        status = 'ok'
+
+    return {
+        'month': today.strftime('%Y-%m'),
+        'days_elapsed': today.day,
+        'days_in_month': days_in_month,
+        'spent_to_date': round(spent, 2),
+        'daily_rate': round(rate, 2),
+        'projected_total': round(projected, 2),
+        'projected_low': round(low, 2),
+        'projected_high': round(high, 2),
+        'monthly_salary': salary,
+        'projected_remaining': round(salary - projected, 2) if salary else None,
+        'status': status
+    }
+
+def category_trends(series, today, months):
+    """Least-squares monthly trend of every category over the last full months."""
+    current = month_number(today)
+    first = current - months
+
+    window = (series.months >= first) & (series.months < current)
+    totals = np.zeros((len(series.category_names), months))
+    np.add.at(totals, (series.category_index[window], series.months[window] - first), series.amounts[window])
+
+    this_month = series.months == current
+    month_to_date = np.bincount(
+        series.category_index[this_month], weights=series.amounts[this_month], minlength=len(series.category_names)
+    )
+
+    # Slope of every category's least-squares line at once
+    x = np.arange(months) - (months - 1) / 2
+    means = totals.mean(axis=1)
+    slopes = (totals - means[:, None]) @ x / (x @ x) if months > 1 else np.zeros(len(means))
+    next_month = np.maximum(means + slopes * (months - (months - 1) / 2), 0)
+
+    trends = []
+    for i in np.argsort(-means, kind='stable'):
+        if not means[i] and not month_to_date[i]:
+            continue
+        change_pct = float(slopes[i] / means[i] * 100) if means[i] else None
+        if change_pct is None:
+            direction = 'new'
+        elif change_pct > FLAT_TREND_PCT:
+            direction = 'up'
+        elif change_pct < -FLAT_TREND_PCT:
+            direction = 'down'
+        else:
+            direction = 'flat'
+        trends.append({
+            'category': str(series.category_names[i]),
+            'monthly': [{'month': month_label(first + m), 'total': round(float(totals[i, m]), 2)} for m in range(months)],
+            'average': round(float(means[i]), 2),
+            'slope': round(float(slopes[i]), 2),
+            'change_pct': round(change_pct, 1) if change_pct is not None else None,
+            'direction': direction,
+            'month_to_date': round(float(month_to_date[i]), 2),
+            'next_month_estimate': round(float(next_month[i]), 2)
+        })
+    return trends
+
+def find_outliers(series, today, recent_days, window_days, threshold, min_history, limit):
+    """Recent expenses whose robust z-score against the preceding window of their category exceeds threshold."""
+    end = epoch_day(today)
+    outliers = []
+    for c, category in enumerate(series.category_names):
+        positions = np.flatnonzero(series.category_index == c)
+        days, amounts = series.days[positions], series.amounts[positions]
+
+        # Expenses on the same day share a window, so each day's median/MAD is computed once
+        for day in np.unique(days[(days > end - recent_days) & (days <= end)]):
+            lo, start, stop = np.searchsorted(days, [day - window_days, day, day + 1])
+            history = amounts[lo:start]
+            if len(history) < min_history:
+                continue
+            median = np.median(history)
+            scale = MAD_SCALE * np.median(np.abs(history - median)) or history.std()
+            if not scale:
+                continue
+
+            scores = (amounts[start:stop] - median) / scale
+            for j in np.flatnonzero(scores >= threshold):
+                i = positions[start + j]
+                outliers.append({
+                    'id': int(series.ids[i]),
+                    'expense_date': (date(1970, 1, 1) + timedelta(days=int(day))).isoformat(),
+                    'description': series.descriptions[i],
+                    'category': str(category),
+                    'amount': round(float(series.amounts[i]), 2),
+                    'typical_amount': round(float(median), 2),
+                    'score': round(float(scores[j]), 1)
+                })
+
+    outliers.sort(key=lambda outlier: outlier['score'], reverse=True)
+    return outliers[:limit]
+
+# ==================== Engine ====================
+
+class ForecastEngine:
+    def __init__(self, app=None, db=None):
+        self.db = db
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('FORECAST_TREND_MONTHS', 6)
+        app.config.setdefault('FORECAST_BASELINE_DAYS', 90)
+        app.config.setdefault('FORECAST_OUTLIER_DAYS', 30)
+        app.config.setdefault('FORECAST_OUTLIER_WINDOW_DAYS', 180)
+        app.config.setdefault('FORECAST_OUTLIER_THRESHOLD', 3.5)
+        app.config.setdefault('FORECAST_OUTLIER_MIN_HISTORY', 8)
+        app.config.setdefault('FORECAST_MAX_OUTLIERS', 20)
+        self.config = app.config
+        if db is not None:
+            self.db = db
+        app.extensions['forecast'] = self
+
+    def history_start(self, today):
+        # Oldest expense date any of the models looks at
+        trend_start = month_label(month_number(today) - self.config['FORECAST_TREND_MONTHS']) + '-01'
+        outlier_start = today - timedelta(
+            days=self.config['FORECAST_OUTLIER_DAYS'] + self.config['FORECAST_OUTLIER_WINDOW_DAYS']
+        )
+        baseline_start = today.replace(day=1) - timedelta(days=self.config['FORECAST_BASELINE_DAYS'])
+        return min(date.fromisoformat(trend_start), outlier_start, baseline_start)
+
+    def compute(self, series, today, monthly_salary):
+        return {
+            'as_of': today.isoformat(),
+            'projection': project_month(series, today, monthly_salary, self.config['FORECAST_BASELINE_DAYS']),
+            'trends': category_trends(series, today, self.config['FORECAST_TREND_MONTHS']),
+            'outliers': find_outliers(
+                series, today,
+                self.config['FORECAST_OUTLIER_DAYS'], self.config['FORECAST_OUTLIER_WINDOW_DAYS'],
+                self.config['FORECAST_OUTLIER_THRESHOLD'], self.config['FORECAST_OUTLIER_MIN_HISTORY'],
+                self.config['FORECAST_MAX_OUTLIERS']
+            )
+        }
+
+    def for_user(self, user_id, monthly_salary, today=None):
+        today = today or date.today()
+        with self.db.cursor() as cur:
+            cur.execute(USER_SERIES_QUERY, (user_id, self.history_start(today).isoformat(), today.isoformat()))
+            rows = cur.fetchall()
+        return self.compute(ExpenseSeries.from_columns(columns_of(rows)), today, monthly_salary)
+
+    def iter_all(self, today=None, batch_size=5000):
+        """Yield (user_id, forecast) for every user with expenses, from one ordered pass over the table."""
+        today = today or date.today()
+        with self.db.cursor(unbuffered=True) as cur:
+            cur.execute(ALL_SERIES_QUERY, (self.history_start(today).isoformat(), today.isoformat()))
+            user_rows = []
+            while True:
+                rows = cur.fetchmany(batch_size)
+                for row in rows:
+                    if user_rows and row['user_id'] != user_rows[0]['user_id']:
+                        yield self._compute_rows(user_rows, today)
+                        user_rows = []
+                    user_rows.append(row)
+                if not rows:
+                    break
+            if user_rows:
+                yield self._compute_rows(user_rows, today)
+
+    def _compute_rows(self, rows, today):
+        series = ExpenseSeries.from_columns(columns_of(rows))
+        return rows[0]['user_id'], self.compute(series, today, rows[0]['monthly_salary'])
+
+def columns_of(rows):
+    return {column: [row[column] for row in rows] for column in ('id', 'expense_date', 'category', 'amount', 'description')}
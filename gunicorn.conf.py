@@ -0,0 +1,54 @@
+# Production launcher for the ASGI entry point (asgi.py):
+#
+#     pip install -r requirements.txt aiomysql
+#     gunicorn -c gunicorn.conf.py asgi:application
+#
+# Every worker is one process running one event loop, so a worker serves many
+# open dashboards and /api/events streams at once; size workers to CPU cores,
+# not to the number of users. Per worker, ASYNC_DB_POOL_SIZE bounds database
+# connections for the async views, ASGI_WSGI_THREADS bounds threads for the
+# routes still served by the WSGI app, and PASSWORD_POOL_WORKERS bcrypt
+# processes are started on first login.
+#
+# Settings read from the environment: BIND, WEB_CONCURRENCY, WORKER_TIMEOUT,
+# FORWARDED_ALLOW_IPS.
+#
+# With more than one worker, a write handled by one of them must invalidate
+# the cache and reach the event streams of all of them, so CACHE_BACKEND and
+# EVENTS_BROKER default to the shared SQLite backends here and an explicit
+# 'memory' refuses to start. ALERT_QUEUE can stay 'memory': each worker then
+# checks the alerts for its own writes, and the fired thresholds live in the
+# database.
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+if workers > 1:
+    # Workers import the app after this runs, so they inherit these defaults
+    for setting in ('CACHE_BACKEND', 'EVENTS_BROKER'):
+        if os.environ.setdefault(setting, 'sqlite') == 'memory':
+            raise RuntimeError(f'{setting}=memory only reaches one process; use sqlite with {workers} workers')
+
+# Each worker imports the app itself: the connection pools, the alert worker
+# thread and the event broker must not be shared across a fork
+preload_app = False
+
+# Seconds a worker may go without heartbeating before it is restarted; open
+# SSE streams do not count against it (the event loop keeps heartbeating)
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound slow memory growth
+max_requests = 10000
+max_requests_jitter = 1000
+
+# Trust X-Forwarded-* only from the reverse proxy in front of us
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+accesslog = '-'
+errorlog = '-'
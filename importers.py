@@ -0,0 +1,160 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import io
+import json
+import re
+
+# Streaming parsers for bulk expense import. Each parser takes a binary file
+# stream and yields (row_number, fields) pairs one record at a time, so an
+# upload of any size is never held in memory as a whole. A parser that can
+# tell a record is not an expense yields an ImportRowError in place of its
+# fields, and validate_row reports it like any other bad row.
+
+class ImportRowError(ValueError):
+    pass
+
+# ==================== Parsers ====================
+
+def parse_csv(stream):
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row_number, row in enumerate(reader, start=1):
+        yield row_number, {(k or '').strip().lower(): v for k, v in row.items()}
+
+def parse_json(stream, chunk_size=65536):
+    # Accepts a JSON array of objects or newline-delimited JSON. Objects are
+    # decoded incrementally with raw_decode as chunks arrive.
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    decoder = json.JSONDecoder()
+    buffer = ''
+    row_number = 0
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,[]')
+        if not buffer:
+            if eof:
+                return
+            chunk = text.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise ImportRowError(f'Malformed JSON after record {row_number}')
+            chunk = text.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        row_number += 1
+        buffer = buffer[end:]
+        if not isinstance(value, dict):
+            raise ImportRowError(f'Record {row_number} is not a JSON object')
+        yield row_number, {str(k).lower(): v for k, v in value.items()}
+
+OFX_TAG = re.compile(r'<(/?)(\w+)>([^<\r\n]*)')
+
+def parse_ofx(stream):
+    # OFX 1.x (SGML) and 2.x (XML) statements: one row per <STMTTRN> block
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    row_number = 0
+    transaction = None
+
+    for line in text:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and transaction is not None:
+                    row_number += 1
+                    yield row_number, ofx_fields(transaction)
+                    transaction = None
+                elif not closing:
+                    transaction = {}
+            elif transaction is not None and not closing and value.strip():
+                transaction[tag] = value.strip()
+
+def ofx_fields(transaction):
+    # TRNAMT is signed from the account's side: money out is negative. Credits
+    # (refunds, deposits, card payments) are not expenses and are rejected
+    amount = transaction.get('TRNAMT', '').strip()
+    transaction_type = transaction.get('TRNTYPE', '').upper()
+    if amount.startswith('-'):
+        amount = amount[1:]
+    elif transaction_type != 'DEBIT':
+        return ImportRowError(f"Credit transaction ({transaction_type or 'no TRNTYPE'}, {amount or 'no TRNAMT'}) is not an expense")
+    return {
+        'description': transaction.get('NAME') or transaction.get('MEMO'),
+        'amount': amount,
+        'expense_date': transaction.get('DTPOSTED', '')[:8],
+        'category': transaction.get('CATEGORY'),
+    }
+
+PARSERS = {
+    'csv': parse_csv,
+    'json': parse_json,
+    'ofx': parse_ofx,
+}
+
+def detect_format(filename, mimetype):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('qfx', 'ofx'):
+        return 'ofx'
+    if extension in ('json', 'ndjson', 'jsonl') or 'json' in (mimetype or ''):
+        return 'json'
+    if extension == 'csv' or 'csv' in (mimetype or ''):
+        return 'csv'
+    return None
+
+# ==================== Validation ====================
+
+DATE_FORMATS = ('%Y-%m-%d', '%Y%m%d', '%d/%m/%Y', '%Y/%m/%d')
+
+def parse_date(value):
+    value = str(value or '').strip()[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ImportRowError(f'Invalid date: {value!r}')
+
+def validate_row(fields, card_ids, default_category=None):
+    # Normalize one parsed record into insert values or raise ImportRowError
+    if isinstance(fields, ImportRowError):
+        raise fields
+    try:
+        amount = Decimal(str(fields.get('amount', '')).replace(',', '').strip())
+    except InvalidOperation:
+        raise ImportRowError(f"Invalid amount: {fields.get('amount')!r}")
+    if not amount.is_finite() or amount <= 0:
+        raise ImportRowError('Amount must be a positive number')
+
+    category = (fields.get('category') or default_category or '').strip()
+    if not category:
+        raise ImportRowError('Category is required')
+    if len(category) > 50:
+        raise ImportRowError('Category is longer than 50 characters')
+
+    description = (fields.get('description') or '').strip()[:255] or None
+    expense_date = parse_date(fields.get('expense_date') or fields.get('date'))
+
+    card_id = fields.get('card_id')
+    if card_id in (None, ''):
+        card_id = None
+    else:
+        try:
+            card_id = int(card_id)
+        except (TypeError, ValueError):
+            raise ImportRowError(f'Invalid card_id: {card_id!r}')
+        if card_id not in card_ids:
+            raise ImportRowError(f'Unknown card_id: {card_id}')
+
+    return {
+        'card_id': card_id,
+        'description': description,
+        'amount': amount.quantize(Decimal('0.01')),
+        'category': category,
+        'expense_date': expense_date,
+    }
@@ -0,0 +1,366 @@
+from flask import g, request, has_request_context
+from contextlib import contextmanager
+import cProfile
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+slow_log = logging.getLogger('finance_tracker.slow_requests')
+
+# Per-request accounting. Every request gets a RequestStats on `g` that the
+# database cursor wrapper and timed() blocks (bcrypt, Fernet, JSON encoding)
+# add to; when the request finishes the totals are folded into process-wide
+# metrics served at /metrics in the Prometheus text format, and requests over
+# SLOW_REQUEST_MS are logged with the SQL that ran.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestStats:
+    __slots__ = ('started', 'queries', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # [sql, seconds, rows] per statement, in execution order
+        self.queries = []
+        self.phases = {}
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def sql_seconds(self):
+        return sum(query[1] for query in self.queries)
+
+def current_stats():
+    return g.get('_request_stats') if has_request_context() else None
+
+@contextmanager
+def timed(phase):
+    """Charge the block's wall time to `phase` on the current request, if any."""
+    stats = current_stats()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_phase(phase, time.perf_counter() - started)
+
+# ==================== Cursor Wrapper ====================
+
+class InstrumentedCursor:
+    """Times every statement and counts the rows fetched from it."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._current = None
+
+    def _run(self, method, query, params):
+        stats = current_stats()
+        started = time.perf_counter()
+        try:
+            return method(query, params)
+        finally:
+            self._current = None
+            if stats is not None:
+                self._current = [query, time.perf_counter() - started, 0]
+                stats.queries.append(self._current)
+
+    def execute(self, query, params=()):
+        return self._run(self._cursor.execute, query, params)
+
+    def executemany(self, query, seq_of_params):
+        return self._run(self._cursor.executemany, query, seq_of_params)
+
+    def _fetched(self, started, rows):
+        if self._current is not None:
+            self._current[1] += time.perf_counter() - started
+            self._current[2] += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(started, 1 if row is not None else 0)
+        return row
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    def __iter__(self):
+        # Streaming reads: count rows as they go by, without timing each one
+        for row in self._cursor:
+            if self._current is not None:
+                self._current[2] += 1
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class AsyncInstrumentedCursor(InstrumentedCursor):
+    """InstrumentedCursor for the awaitable cursors of aiodb."""
+
+    async def _run(self, method, query, params):
+        stats = current_stats()
+        started = time.perf_counter()
+        try:
+            return await method(query, params)
+        finally:
+            self._current = None
+            if stats is not None:
+                self._current = [query, time.perf_counter() - started, 0]
+                stats.queries.append(self._current)
+
+    async def execute(self, query, params=()):
+        return await self._run(self._cursor.execute, query, params)
+
+    async def executemany(self, query, seq_of_params):
+        return await self._run(self._cursor.executemany, query, seq_of_params)
+
+    async def fetchone(self):
+        started = time.perf_counter()
+        row = await self._cursor.fetchone()
+        self._fetched(started, 1 if row is not None else 0)
+        return row
+
+    async def fetchall(self):
+        started = time.perf_counter()
+        rows = await self._cursor.fetchall()
+        self._fetched(started, len(rows))
+        return rows
+
+    async def fetchmany(self, size):
+        started = time.perf_counter()
+        rows = await self._cursor.fetchmany(size)
+        self._fetched(started, len(rows))
+        return rows
+
+# ==================== Metrics ====================
+
+class Metrics:
+    """Process-wide counters and histograms, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.durations = {}
+        self.queries = {}
+        self.phases = {}
+        self.gauges = []
+
+    def observe(self, route, method, status, seconds, stats):
+        with self._lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            histogram = self.durations.setdefault(route, [[0] * len(DURATION_BUCKETS), 0, 0.0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += seconds
+
+            totals = self.queries.setdefault(route, [0, 0.0, 0])
+            totals[0] += len(stats.queries)
+            totals[1] += stats.sql_seconds
+            totals[2] += sum(query[2] for query in stats.queries)
+
+            for phase, phase_seconds in stats.phases.items():
+                self.phases[(route, phase)] = self.phases.get((route, phase), 0.0) + phase_seconds
+
+    def add_gauges(self, collect):
+        # collect() -> iterable of (name, help, value); read at scrape time
+        self.gauges.append(collect)
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            family('http_requests_total', 'counter', 'Requests served, by route, method and status.')
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{route="{route}",method="{method}",status="{status}"}} {count}')
+
+            family('http_request_duration_seconds', 'histogram', 'Request latency by route.')
+            for route, (buckets, count, total) in sorted(self.durations.items()):
+                for bound, bucket_count in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {bucket_count}')
+                lines.append(f'http_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {count}')
+                lines.append(f'http_request_duration_seconds_sum{{route="{route}"}} {total:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{route="{route}"}} {count}')
+
+            family('db_queries_total', 'counter', 'SQL statements executed, by route.')
+            for route, (count, _, _) in sorted(self.queries.items()):
+                lines.append(f'db_queries_total{{route="{route}"}} {count}')
+            family('db_query_seconds_total', 'counter', 'Time spent executing and fetching SQL, by route.')
+            for route, (_, seconds, _) in sorted(self.queries.items()):
+                lines.append(f'db_query_seconds_total{{route="{route}"}} {seconds:.6f}')
+            family('db_rows_fetched_total', 'counter', 'Rows fetched from the database, by route.')
+            for route, (_, _, rows) in sorted(self.queries.items()):
+                lines.append(f'db_rows_fetched_total{{route="{route}"}} {rows}')
+
+            family('request_phase_seconds_total', 'counter', 'Time spent in bcrypt, fernet and json phases, by route.')
+            for (route, phase), seconds in sorted(self.phases.items()):
+                lines.append(f'request_phase_seconds_total{{route="{route}",phase="{phase}"}} {seconds:.6f}')
+
+        for collect in self.gauges:
+            for name, help_text, value in collect():
+                family(name, 'gauge', help_text)
+                lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+# ==================== Profiler ====================
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds into folded-stack
+    counts ('a;b;c 12' lines), the input format of flamegraph.pl and speedscope."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = ';'.join(
+                f'{os.path.basename(entry.filename)}:{entry.name}' for entry in traceback.extract_stack(frame)
+            )
+            self.counts[stack] = self.counts.get(stack, 0) + 1
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.counts.items()))
+
+# ==================== Extension ====================
+
+class Instrumentation:
+    def __init__(self, app=None, db=None):
+        self.metrics = Metrics()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('SLOW_REQUEST_MS', 500)
+        app.config.setdefault('SLOW_REQUEST_MAX_QUERIES', 10)
+        app.config.setdefault('PROFILE_SAMPLE_RATE', 0.0)
+        app.config.setdefault('PROFILE_THRESHOLD_MS', 250)
+        app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+        self.config = app.config
+
+        if db is not None:
+            db.cursor_wrapper = InstrumentedCursor
+            self.metrics.add_gauges(lambda: [
+                (f'db_pool_{key}', f'Connection pool {key.replace("_", " ")}.', value)
+                for key, value in db.pool.stats().items() if isinstance(value, (int, float))
+            ])
+            self.metrics.add_gauges(lambda: [
+                gauge
+                for number, replica in enumerate(db.replica_stats(), 1)
+                for gauge in (
+                    (f'db_replica{number}_healthy', f'Whether replica {number} serves reads.', int(replica['healthy'])),
+                    (f'db_replica{number}_lag_seconds', f'Heartbeat age on replica {number}.', replica['lag_seconds'] if replica['lag_seconds'] is not None else 'NaN'),
+                )
+            ])
+
+        # JSON encoding happens inside jsonify(); time it through the app's provider
+        dumps = app.json.dumps
+        def timed_dumps(obj, **kwargs):
+            with timed('json'):
+                return dumps(obj, **kwargs)
+        app.json.dumps = timed_dumps
+
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.extensions['instrumentation'] = self
+
+    def instrument_async_db(self, adb):
+        # The ASGI entry point's aiodb.AsyncDatabase, counted like the sync pool
+        adb.cursor_wrapper = AsyncInstrumentedCursor
+        self.metrics.add_gauges(lambda: [
+            (f'async_db_pool_{key}', f'Async connection pool {key.replace("_", " ")}.', value)
+            for key, value in adb.pool.stats().items() if isinstance(value, (int, float))
+        ])
+
+    def _before(self):
+        g._request_stats = RequestStats()
+        if self.config['PROFILE_SAMPLE_RATE'] and random.random() < self.config['PROFILE_SAMPLE_RATE']:
+            g._profiler = cProfile.Profile()
+            g._sampler = StackSampler(threading.get_ident())
+            g._sampler.start()
+            g._profiler.enable()
+
+    def _after(self, response):
+        stats = g.pop('_request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            sampler = g.pop('_sampler')
+            sampler.stop()
+            if elapsed * 1000 >= self.config['PROFILE_THRESHOLD_MS']:
+                self._dump_profile(route, elapsed, profiler, sampler)
+
+        self.metrics.observe(route, request.method, response.status_code, elapsed, stats)
+        response.headers['Server-Timing'] = server_timing(elapsed, stats)
+
+        if elapsed * 1000 >= self.config['SLOW_REQUEST_MS']:
+            self._log_slow(route, elapsed, stats)
+        return response
+
+    def _log_slow(self, route, elapsed, stats):
+        limit = self.config['SLOW_REQUEST_MAX_QUERIES']
+        slowest = sorted(stats.queries, key=lambda query: query[1], reverse=True)[:limit]
+        phases = ', '.join(f'{name}={seconds * 1000:.1f}ms' for name, seconds in sorted(stats.phases.items()))
+        lines = [
+            f'{request.method} {request.path} ({route}) took {elapsed * 1000:.1f}ms: '
+            f'{len(stats.queries)} queries in {stats.sql_seconds * 1000:.1f}ms' + (f', {phases}' if phases else '')
+        ]
+        for sql, seconds, rows in slowest:
+            lines.append(f'  {seconds * 1000:8.2f}ms {rows:6d} rows  {" ".join(sql.split())}')
+        slow_log.warning('\n'.join(lines))
+
+    def _dump_profile(self, route, elapsed, profiler, sampler):
+        # <dir>/<epoch ms>-<route>-<ms>.prof (cProfile) and .folded (flamegraph stacks)
+        os.makedirs(self.config['PROFILE_DIR'], exist_ok=True)
+        slug = route.strip('/').replace('/', '_').replace('<', '').replace('>', '').replace(':', '-') or 'root'
+        base = os.path.join(self.config['PROFILE_DIR'], f'{int(time.time() * 1000)}-{slug}-{int(elapsed * 1000)}ms')
+        try:
+            profiler.dump_stats(base + '.prof')
+            with open(base + '.folded', 'w') as f:
+                f.write(sampler.folded())
+        except OSError:
+            logger.exception('Could not write request profile to %s', base)
+
+def server_timing(elapsed, stats):
+    # Server-Timing header so browser devtools show the same breakdown
+    parts = [f'db;desc="{len(stats.queries)} queries";dur={stats.sql_seconds * 1000:.2f}']
+    parts += [f'{name};dur={seconds * 1000:.2f}' for name, seconds in sorted(stats.phases.items())]
+    parts.append(f'total;dur={elapsed * 1000:.2f}')
+    return ', '.join(parts)
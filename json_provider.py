@@ -0,0 +1,89 @@
+from flask import request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from datetime import datetime, date
+from decimal import Decimal
+import json
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder
+    orjson = None
+
+# JSON encoding for API responses. Routes hand DB rows straight to jsonify():
+# Decimal money, DATE and DATETIME values are encoded here rather than by
+# per-row float() loops in every view. Dates are ISO 8601.
+#
+# Money (every Decimal) is encoded according to JSON_MONEY_ENCODING, which a
+# request can override with ?money=:
+#   number  12.5      (default; what the bundled frontend expects)
+#   string  "12.50"   (exact, for clients that parse money as decimals)
+#   minor   1250      (exact integer minor units, e.g. cents)
+
+MONEY_ENCODINGS = ('number', 'string', 'minor')
+
+# Helper to map json.dumps() arguments onto orjson options; None if orjson cannot honour them.
+# jsonify() always passes compact separators (or indent=2 in debug), so both must map.
+def orjson_option(kwargs):
+    option = orjson.OPT_NON_STR_KEYS
+    for key, value in kwargs.items():
+        if key == 'separators' and tuple(value) == (',', ':'):
+            continue
+        if key == 'indent' and value == 2:
+            option |= orjson.OPT_INDENT_2
+        elif key == 'sort_keys':
+            option |= orjson.OPT_SORT_KEYS if value else 0
+        else:
+            return None
+    return option
+
+class FinanceJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+    compact = True
+
+    def __init__(self, app):
+        super().__init__(app)
+        app.config.setdefault('JSON_MONEY_ENCODING', 'number')
+        app.config.setdefault('JSON_MINOR_UNITS', 2)
+        self._config = app.config
+
+    def money_encoding(self):
+        if has_request_context():
+            requested = request.args.get('money')
+            if requested in MONEY_ENCODINGS:
+                return requested
+        return self._config['JSON_MONEY_ENCODING']
+
+    def _encoder(self):
+        encoding = self.money_encoding()
+        scale = Decimal(10) ** self._config['JSON_MINOR_UNITS']
+        quantum = 1 / scale
+
+        def default(value):
+            if isinstance(value, Decimal):
+                if encoding == 'string':
+                    return str(value.quantize(quantum))
+                if encoding == 'minor':
+                    return int((value * scale).to_integral_value())
+                return float(value)
+            if isinstance(value, (datetime, date)):
+                return value.isoformat()
+            return DefaultJSONProvider.default(value)
+        return default
+
+    def dumps(self, obj, **kwargs):
+        default = kwargs.pop('default', None) or self._encoder()
+        option = orjson_option(kwargs) if orjson is not None else None
+        if option is not None:
+            return orjson.dumps(obj, default=default, option=option).decode()
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('separators', (',', ':'))
+        return json.dumps(obj, default=default, **kwargs)
+
+# Helper for big list responses: one array per column instead of one object per row
+def to_columns(rows, columns=None):
+    if columns is None:
+        columns = list(rows[0]) if rows else []
+    return {column: [row.get(column) for row in rows] for column in columns}
+
+def wants_columns():
+    return has_request_context() and request.args.get('format') == 'columns'
@@ -0,0 +1,18 @@
+-- User-defined monthly spending limits per category.
+CREATE TABLE IF NOT EXISTS category_budgets (
+    user_id INT NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    monthly_limit DECIMAL(14, 2) NOT NULL,
+    PRIMARY KEY (user_id, category)
+) ENGINE=InnoDB;
+
+-- One row per alert already sent, so each threshold fires once per user, month and scope.
+-- scope is 'salary' or 'category:<name>'.
+CREATE TABLE IF NOT EXISTS alert_state (
+    user_id INT NOT NULL,
+    month CHAR(7) NOT NULL,
+    scope VARCHAR(64) NOT NULL,
+    threshold SMALLINT NOT NULL,
+    fired_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, month, scope, threshold)
+) ENGINE=InnoDB;
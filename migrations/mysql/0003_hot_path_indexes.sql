@@ -0,0 +1,6 @@
+-- Composite indexes matching the hot queries' WHERE + ORDER BY, so listing,
+-- keyset paging and date-range filters are index range scans. Check with `flask db explain`.
+-- These also satisfy the user_id foreign keys, which lets InnoDB drop its implicit single-column indexes.
+CREATE INDEX expenses_user_date ON expenses (user_id, expense_date, id);
+CREATE INDEX expenses_user_category_date ON expenses (user_id, category, expense_date);
+CREATE INDEX notifications_user_created ON notifications (user_id, created_at);
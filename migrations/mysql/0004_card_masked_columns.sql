@@ -0,0 +1,7 @@
+-- Masked card number stored at write time so listing cards needs no decryption,
+-- plus the fingerprint of the key that encrypted the row for online key rotation.
+-- `flask db upgrade` (and DB_AUTO_MIGRATE) backfills existing rows after migrating.
+ALTER TABLE cards
+    ADD COLUMN card_last_four CHAR(4) NULL AFTER card_number_encrypted,
+    ADD COLUMN card_number_masked VARCHAR(32) NULL AFTER card_last_four,
+    ADD COLUMN card_key_id CHAR(8) NULL AFTER card_number_masked;
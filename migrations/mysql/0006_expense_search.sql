@@ -0,0 +1,8 @@
+-- Full-text index for /api/expenses/search (MATCH ... AGAINST in boolean mode,
+-- each term prefix-matched with a trailing *). InnoDB skips terms shorter than
+-- innodb_ft_min_token_size (3 by default).
+ALTER TABLE expenses ADD FULLTEXT INDEX expenses_description_ft (description);
+
+-- Amount-range and per-card search filters
+CREATE INDEX expenses_user_amount ON expenses (user_id, amount);
+CREATE INDEX expenses_user_card_date ON expenses (user_id, card_id, expense_date);
@@ -0,0 +1,27 @@
+-- Recurring expense rules, materialized into expenses by `flask recurring worker`.
+-- next_due is the first occurrence not yet written; NULL once the rule has ended.
+CREATE TABLE IF NOT EXISTS recurring_expenses (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    card_id INT NULL,
+    description VARCHAR(255),
+    amount DECIMAL(14, 2) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    frequency VARCHAR(10) NOT NULL,
+    interval_count SMALLINT NOT NULL DEFAULT 1,
+    cron VARCHAR(100),
+    start_date DATE NOT NULL,
+    end_date DATE NULL,
+    next_due DATE NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX recurring_expenses_user (user_id),
+    INDEX recurring_expenses_next_due (next_due, id),
+    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+    FOREIGN KEY (card_id) REFERENCES cards (id) ON DELETE SET NULL
+) ENGINE=InnoDB;
+
+-- One row per rule and date: the scheduler's idempotency key
+ALTER TABLE expenses
+    ADD COLUMN recurring_id INT NULL,
+    ADD UNIQUE INDEX expenses_recurring_occurrence (recurring_id, expense_date),
+    ADD FOREIGN KEY (recurring_id) REFERENCES recurring_expenses (id) ON DELETE SET NULL;
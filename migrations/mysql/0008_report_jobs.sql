@@ -0,0 +1,21 @@
+-- Report jobs queued by POST /api/reports and run by the report workers.
+-- spec_hash covers the spec and the version of the user's data; it also names the artifact file.
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    user_id INT NOT NULL,
+    kind VARCHAR(30) NOT NULL,
+    format VARCHAR(10) NOT NULL,
+    spec TEXT NOT NULL,
+    spec_hash CHAR(40) NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    attempts SMALLINT NOT NULL DEFAULT 0,
+    error VARCHAR(500),
+    artifact_size BIGINT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL,
+    INDEX report_jobs_user (user_id, created_at),
+    INDEX report_jobs_user_spec (user_id, spec_hash),
+    INDEX report_jobs_status (status, created_at),
+    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+) ENGINE=InnoDB;
@@ -0,0 +1,44 @@
+-- Core tables for single-node SQLite deployments.
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username VARCHAR(80) NOT NULL UNIQUE,
+    email VARCHAR(120) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    monthly_salary DECIMAL(14, 2) DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    card_number_encrypted VARCHAR(255) NOT NULL,
+    card_type VARCHAR(30),
+    card_holder VARCHAR(120),
+    expiry_date VARCHAR(10),
+    balance DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS cards_user_id ON cards (user_id);
+
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    card_id INTEGER REFERENCES cards (id) ON DELETE SET NULL,
+    description VARCHAR(255),
+    amount DECIMAL(14, 2) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    expense_date DATE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS expenses_user_id ON expenses (user_id);
+CREATE INDEX IF NOT EXISTS expenses_card_id ON expenses (card_id);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    message VARCHAR(500) NOT NULL,
+    type VARCHAR(20) NOT NULL DEFAULT 'info',
+    is_read BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS notifications_user_id ON notifications (user_id);
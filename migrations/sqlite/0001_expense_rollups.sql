@@ -0,0 +1,10 @@
+-- Per-user monthly/category spending rollup maintained by the expense write routes.
+-- Populate or repair it from the raw expenses table with `flask rollups rebuild`.
+CREATE TABLE IF NOT EXISTS expense_rollups (
+    user_id INTEGER NOT NULL,
+    month CHAR(7) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    total DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    expense_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, month, category)
+) WITHOUT ROWID;
@@ -0,0 +1,9 @@
+-- Composite indexes matching the hot queries' WHERE + ORDER BY, so listing,
+-- keyset paging and date-range filters are index range scans. Check with `flask db explain`.
+CREATE INDEX IF NOT EXISTS expenses_user_date ON expenses (user_id, expense_date, id);
+CREATE INDEX IF NOT EXISTS expenses_user_category_date ON expenses (user_id, category, expense_date);
+CREATE INDEX IF NOT EXISTS notifications_user_created ON notifications (user_id, created_at);
+
+-- Superseded by the composites above
+DROP INDEX IF EXISTS expenses_user_id;
+DROP INDEX IF EXISTS notifications_user_id;
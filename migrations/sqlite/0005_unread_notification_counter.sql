@@ -0,0 +1,10 @@
+-- Per-user unread notification count, kept in step with notifications.is_read
+-- by every write that inserts or reads notifications.
+ALTER TABLE users ADD COLUMN unread_notifications INTEGER NOT NULL DEFAULT 0;
+
+UPDATE users SET unread_notifications = (
+    SELECT COUNT(*) FROM notifications n WHERE n.user_id = users.id AND n.is_read = 0
+);
+
+-- Incremental fetch (?since=<id>) and bulk mark-read walk a user's notifications by id
+CREATE INDEX IF NOT EXISTS notifications_user_id_seq ON notifications (user_id, id);
@@ -0,0 +1,37 @@
+-- Full-text index for /api/expenses/search. A contentless FTS5 table holds
+-- only the index; triggers keep it in step with expenses. Each row carries an
+-- owner token ('u<user_id>') next to the description, so a search intersects
+-- the user's posting list inside the index instead of filtering afterwards.
+-- prefix='2 3' indexes short prefixes so 'gr*' and 'gro*' are lookups too.
+CREATE VIRTUAL TABLE IF NOT EXISTS expense_search USING fts5(
+    owner,
+    description,
+    content = '',
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+
+INSERT INTO expense_search (rowid, owner, description)
+SELECT id, 'u' || user_id, COALESCE(description, '') FROM expenses;
+
+CREATE TRIGGER IF NOT EXISTS expenses_search_insert AFTER INSERT ON expenses BEGIN
+    INSERT INTO expense_search (rowid, owner, description)
+    VALUES (new.id, 'u' || new.user_id, COALESCE(new.description, ''));
+END;
+
+-- Contentless tables delete by replaying the indexed values
+CREATE TRIGGER IF NOT EXISTS expenses_search_delete AFTER DELETE ON expenses BEGIN
+    INSERT INTO expense_search (expense_search, rowid, owner, description)
+    VALUES ('delete', old.id, 'u' || old.user_id, COALESCE(old.description, ''));
+END;
+
+CREATE TRIGGER IF NOT EXISTS expenses_search_update AFTER UPDATE OF user_id, description ON expenses BEGIN
+    INSERT INTO expense_search (expense_search, rowid, owner, description)
+    VALUES ('delete', old.id, 'u' || old.user_id, COALESCE(old.description, ''));
+    INSERT INTO expense_search (rowid, owner, description)
+    VALUES (new.id, 'u' || new.user_id, COALESCE(new.description, ''));
+END;
+
+-- Amount-range and per-card search filters
+CREATE INDEX IF NOT EXISTS expenses_user_amount ON expenses (user_id, amount);
+CREATE INDEX IF NOT EXISTS expenses_user_card_date ON expenses (user_id, card_id, expense_date);
@@ -0,0 +1,23 @@
+-- Recurring expense rules, materialized into expenses by `flask recurring worker`.
+-- next_due is the first occurrence not yet written; NULL once the rule has ended.
+CREATE TABLE IF NOT EXISTS recurring_expenses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    card_id INTEGER REFERENCES cards (id) ON DELETE SET NULL,
+    description VARCHAR(255),
+    amount DECIMAL(14, 2) NOT NULL,
+    category VARCHAR(50) NOT NULL,
+    frequency VARCHAR(10) NOT NULL,
+    interval_count SMALLINT NOT NULL DEFAULT 1,
+    cron VARCHAR(100),
+    start_date DATE NOT NULL,
+    end_date DATE,
+    next_due DATE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS recurring_expenses_user ON recurring_expenses (user_id);
+CREATE INDEX IF NOT EXISTS recurring_expenses_next_due ON recurring_expenses (next_due, id);
+
+-- One row per rule and date: the scheduler's idempotency key
+ALTER TABLE expenses ADD COLUMN recurring_id INTEGER REFERENCES recurring_expenses (id) ON DELETE SET NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS expenses_recurring_occurrence ON expenses (recurring_id, expense_date);
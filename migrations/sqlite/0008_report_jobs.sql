@@ -0,0 +1,20 @@
+-- Report jobs queued by POST /api/reports and run by the report workers.
+-- spec_hash covers the spec and the version of the user's data; it also names the artifact file.
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    kind VARCHAR(30) NOT NULL,
+    format VARCHAR(10) NOT NULL,
+    spec TEXT NOT NULL,
+    spec_hash CHAR(40) NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    attempts SMALLINT NOT NULL DEFAULT 0,
+    error VARCHAR(500),
+    artifact_size BIGINT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS report_jobs_user ON report_jobs (user_id, created_at);
+CREATE INDEX IF NOT EXISTS report_jobs_user_spec ON report_jobs (user_id, spec_hash);
+CREATE INDEX IF NOT EXISTS report_jobs_status ON report_jobs (status, created_at);
@@ -0,0 +1,6 @@
+-- Heartbeat written on the primary by the replica monitor (db.py); its age on a
+-- replica is that replica's lag. beat_at is time.time() of the writing process.
+CREATE TABLE IF NOT EXISTS replication_heartbeat (
+    id INTEGER PRIMARY KEY,
+    beat_at DOUBLE NOT NULL
+);
@@ -0,0 +1,175 @@
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from instrumentation import timed
+import asyncio
+import multiprocessing
+import threading
+import bcrypt
+
+# Password hashing off the request thread. bcrypt is deliberately slow and
+# CPU-bound, so hashes run on a small process pool sized to the cores set
+# aside for it. Admission is bounded: once `workers + queue` jobs are in
+# flight, new ones are refused immediately instead of queuing behind a spike,
+# and a job that outlives PASSWORD_POOL_TIMEOUT is reported as unavailable.
+# If a worker dies the pool is replaced and the job retried once.
+#
+# Workers are never forked from the (threaded) server itself: on POSIX they
+# come from a forkserver, elsewhere they are spawned. Either way the __main__
+# script is imported again outside the server process (once per forkserver,
+# or once per spawned worker), so a script that imports the app and starts
+# it, or hashes passwords at import time, must keep that code under
+# `if __name__ == '__main__':`. `flask run`, gunicorn and the CLI already do.
+
+class PasswordPoolBusy(Exception):
+    """Raised when password work cannot be admitted or does not finish in time."""
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+# Run inside pool workers; module-level so they can be pickled
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check_password(password_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:
+        # Malformed or non-bcrypt hash
+        return False
+
+def hash_rounds(password_hash):
+    # '$2b$12$<salt+digest>' -> 12
+    try:
+        return int(password_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+class PasswordHasher:
+    def __init__(self, app=None):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BCRYPT_LOG_ROUNDS', 12)
+        app.config.setdefault('PASSWORD_POOL_WORKERS', 2)
+        app.config.setdefault('PASSWORD_POOL_QUEUE', 8)
+        app.config.setdefault('PASSWORD_POOL_TIMEOUT', 5.0)
+        app.config.setdefault(
+            'PASSWORD_POOL_START_METHOD',
+            'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        )
+        self.rounds = int(app.config['BCRYPT_LOG_ROUNDS'])
+        self.workers = int(app.config['PASSWORD_POOL_WORKERS'])
+        self.timeout = float(app.config['PASSWORD_POOL_TIMEOUT'])
+        self.start_method = app.config['PASSWORD_POOL_START_METHOD']
+        # Jobs allowed in flight: one running per worker plus a short queue
+        self._slots = threading.BoundedSemaphore(max(self.workers, 1) + int(app.config['PASSWORD_POOL_QUEUE']))
+        app.extensions['password_hasher'] = self
+
+    def _pool(self):
+        # Started on first use so CLI commands and imports never fork workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(self.start_method)
+                    )
+        return self._executor
+
+    def _discard(self, executor):
+        # A worker died: drop the broken pool so the next job starts a fresh one
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _submit(self, fn, *args):
+        # Admit and start one job; returns (executor, concurrent.futures.Future)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolBusy('Too many password requests, try again shortly', 429, 1)
+        if self.workers == 0:
+            # Inline mode for development and tests
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._slots.release()
+            return None, future
+
+        try:
+            for attempt in range(2):
+                executor = self._pool()
+                try:
+                    future = executor.submit(fn, *args)
+                    break
+                except BrokenProcessPool:
+                    self._discard(executor)
+            else:
+                raise self._overloaded()
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot frees when the work actually finishes, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        return executor, future
+
+    def _overloaded(self):
+        return PasswordPoolBusy('Password service is overloaded, try again later', 503, int(self.timeout) or 1)
+
+    def _run(self, fn, *args):
+        # Hashing and checking are pure, so a job lost with a dead worker is simply run again
+        for attempt in range(2):
+            executor, future = self._submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                raise self._overloaded()
+            except BrokenProcessPool:
+                self._discard(executor)
+        raise self._overloaded()
+
+    async def _run_async(self, fn, *args):
+        # Same admission, timeout and retry as _run, but the event loop keeps serving while bcrypt runs
+        for attempt in range(2):
+            executor, future = self._submit(fn, *args)
+            future = asyncio.wrap_future(future)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            except asyncio.TimeoutError:
+                raise self._overloaded()
+            except BrokenProcessPool:
+                self._discard(executor)
+        raise self._overloaded()
+
+    def generate_password_hash(self, password):
+        with timed('bcrypt'):
+            return self._run(_hash_password, password, self.rounds)
+
+    def check_password_hash(self, password_hash, password):
+        with timed('bcrypt'):
+            return self._run(_check_password, password_hash, password)
+
+    async def generate_password_hash_async(self, password):
+        with timed('bcrypt'):
+            return await self._run_async(_hash_password, password, self.rounds)
+
+    async def check_password_hash_async(self, password_hash, password):
+        with timed('bcrypt'):
+            return await self._run_async(_check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,333 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import calendar
+import logging
+import threading
+import time
+
+from importers import ImportRowError, parse_date, validate_row
+
+logger = logging.getLogger(__name__)
+
+# Recurring expense rules (rent, subscriptions, ...) and the scheduler that
+# turns due occurrences into ordinary expenses rows. `flask recurring worker`
+# runs the scheduler as its own process; every tick it walks the rules whose
+# next_due has arrived in batches, and each batch is one transaction:
+#
+#   one multi-row INSERT of every due occurrence in the batch
+#   one rollup upsert per (user, month, category) the batch touched
+#   one UPDATE moving each rule's next_due past today
+#
+# expenses has a unique key on (recurring_id, expense_date), and occurrences
+# already present are skipped before the insert, so a restart, a second
+# worker or a rule edited back to an earlier start never duplicates a row or
+# double-counts the rollups. Rules never reach back before the day they are
+# created or edited, so catch-up (capped at RECURRING_MAX_CATCHUP per rule
+# and batch) only covers ticks the worker missed.
+#
+# The worker invalidates caches and publishes events for the web processes, so
+# it refuses to start unless CACHE_BACKEND and EVENTS_BROKER are shared ones.
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'cron')
+
+RULE_COLUMNS = (
+    "id, user_id, card_id, description, amount, category, frequency, interval_count, cron, "
+    "start_date, end_date, next_due, created_at"
+)
+
+DUE_RULES_QUERY = f"SELECT {RULE_COLUMNS} FROM recurring_expenses WHERE next_due <= %s ORDER BY next_due, id LIMIT %s"
+
+# A cron rule that matches no day in this many days is treated as finished
+CRON_SEARCH_DAYS = 5 * 366
+
+class RuleError(ValueError):
+    pass
+
+class BatchConflict(RuntimeError):
+    """Another worker inserted some of a batch's occurrences first; the batch is rolled back."""
+
+# ==================== Cron ====================
+
+MONTH_NAMES = {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name}
+# Cron counts weekdays from Sunday = 0 (7 is Sunday too)
+WEEKDAY_NAMES = {name: number for number, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+
+def parse_cron_field(field, low, high, names=None):
+    # '*', '5', '1-5', '*/2', '1-15/7', 'mon-fri', and comma-separated lists of those
+    values = set()
+    for part in field.lower().split(','):
+        part, _, step = part.partition('/')
+        if part == '*':
+            start, end = low, high
+        else:
+            first, _, last = part.partition('-')
+            start = cron_value(first, names)
+            end = cron_value(last, names) if last else (high if step else start)
+        step = int(step) if step.isdigit() and int(step) > 0 else (None if step else 1)
+        if step is None or not low <= start <= end <= high:
+            raise RuleError(f'Invalid cron field: {field!r}')
+        values.update(range(start, end + 1, step))
+    return values
+
+def cron_value(text, names):
+    if names and text in names:
+        return names[text]
+    if not text.isdigit():
+        raise RuleError(f'Invalid cron value: {text!r}')
+    return int(text)
+
+class CronSchedule:
+    """The day fields of a cron expression.
+
+    Accepts 'day-of-month month day-of-week', or the usual five fields with the
+    minute and hour ignored: expenses are dated, not timed. As in cron, a day
+    matches either restricted day field when both are restricted.
+    """
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) == 5:
+            parse_cron_field(fields[0], 0, 59)
+            parse_cron_field(fields[1], 0, 23)
+            fields = fields[2:]
+        if len(fields) != 3:
+            raise RuleError('cron must have 3 fields (day month weekday) or 5')
+        self.days = parse_cron_field(fields[0], 1, 31)
+        self.months = parse_cron_field(fields[1], 1, 12, MONTH_NAMES)
+        self.weekdays = {day % 7 for day in parse_cron_field(fields[2], 0, 7, WEEKDAY_NAMES)}
+        self.any_day = fields[0] == '*'
+        self.any_weekday = fields[2] == '*'
+
+    def matches(self, day):
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        weekday_match = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+# ==================== Schedules ====================
+
+def as_date(value):
+    # DATE columns come back as dates from MySQL and as 'YYYY-MM-DD' strings from some SQLite setups
+    return value if isinstance(value, date) or value is None else date.fromisoformat(str(value)[:10])
+
+def add_months(day, months, anchor_day):
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    month += 1
+    # A rule starting on the 31st falls on the last day of shorter months
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+def occurrences(rule, since):
+    """Yield the rule's occurrence dates from since onwards, in order, up to its end_date."""
+    start, end = as_date(rule['start_date']), as_date(rule['end_date'])
+    since = max(as_date(since), start)
+    interval = rule['interval_count'] or 1
+
+    if rule['frequency'] == 'cron':
+        schedule = CronSchedule(rule['cron'])
+        day, misses = since, 0
+        while misses < CRON_SEARCH_DAYS and (end is None or day <= end):
+            if schedule.matches(day):
+                misses = 0
+                yield day
+            else:
+                misses += 1
+            day += timedelta(days=1)
+        return
+
+    if rule['frequency'] == 'monthly':
+        k = max(0, ((since.year - start.year) * 12 + since.month - start.month) // interval - 1)
+        step = lambda k: add_months(start, k * interval, start.day)
+    else:
+        days = interval * (7 if rule['frequency'] == 'weekly' else 1)
+        k = max(0, (since - start).days // days)
+        step = lambda k: start + timedelta(days=k * days)
+
+    while True:
+        day = step(k)
+        if end is not None and day > end:
+            return
+        if day >= since:
+            yield day
+        k += 1
+
+def first_due(rule, since):
+    return next(occurrences(rule, since), None)
+
+def validate_rule(data, card_ids):
+    """Normalize a rule from the API into column values or raise RuleError."""
+    try:
+        row = validate_row(
+            {**data, 'expense_date': data.get('start_date')}, card_ids, None
+        )
+        end_date = parse_date(data['end_date']) if data.get('end_date') else None
+    except ImportRowError as e:
+        raise RuleError(str(e))
+
+    frequency = data.get('frequency')
+    if frequency not in FREQUENCIES:
+        raise RuleError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+    interval_count = data.get('interval', 1)
+    if not isinstance(interval_count, int) or isinstance(interval_count, bool) or not 1 <= interval_count <= 365:
+        raise RuleError('interval must be a whole number from 1 to 365')
+
+    cron = None
+    if frequency == 'cron':
+        cron = (data.get('cron') or '').strip()
+        CronSchedule(cron)
+    if end_date is not None and end_date < row['expense_date']:
+        raise RuleError('end_date is before start_date')
+
+    return {
+        'card_id': row['card_id'],
+        'description': row['description'],
+        'amount': row['amount'],
+        'category': row['category'],
+        'frequency': frequency,
+        'interval_count': interval_count,
+        'cron': cron,
+        'start_date': row['expense_date'],
+        'end_date': end_date,
+    }
+
+# ==================== Materialization ====================
+
+def materialize_due(cur, storage, today, batch_size, max_catchup):
+    """Insert the due occurrences of up to batch_size rules on the caller's transaction.
+
+    Returns (rules processed, {user_id: {'inserted': n, 'months': {...}}}).
+    """
+    cur.execute(DUE_RULES_QUERY, (today, batch_size))
+    rules = cur.fetchall()
+    if not rules:
+        return 0, {}
+
+    occurrences_due = []
+    next_dues = []
+    for rule in rules:
+        upcoming, count = None, 0
+        for day in occurrences(rule, rule['next_due']):
+            # A long-idle rule catches up over several batches rather than in one
+            if day > today or count >= max_catchup:
+                upcoming = day
+                break
+            occurrences_due.append((rule, day))
+            count += 1
+        next_dues.append((upcoming, rule['id']))
+
+    # Occurrences a previous run already wrote; the unique key would skip them,
+    # but the rollups must not count them again either
+    if occurrences_due:
+        rule_ids = [rule['id'] for rule in rules]
+        cur.execute(
+            f"SELECT recurring_id, expense_date FROM expenses WHERE recurring_id IN ({', '.join(['%s'] * len(rule_ids))}) "
+            "AND expense_date >= %s",
+            (*rule_ids, min(day for _, day in occurrences_due))
+        )
+        existing = {(row['recurring_id'], as_date(row['expense_date'])) for row in cur.fetchall()}
+        occurrences_due = [(rule, day) for rule, day in occurrences_due if (rule['id'], day) not in existing]
+
+    users = {}
+    if occurrences_due:
+        cur.executemany(
+            storage.insert_ignore_sql(
+                'expenses', ['user_id', 'card_id', 'description', 'amount', 'category', 'expense_date', 'recurring_id']
+            ),
+            [
+                (rule['user_id'], rule['card_id'], rule['description'], rule['amount'], rule['category'], day, rule['id'])
+                for rule, day in occurrences_due
+            ]
+        )
+        if cur.rowcount != len(occurrences_due):
+            # Another worker wrote some of them since the check above; roll back so
+            # tick() retries the batch, whose existing-row check then sees them
+            raise BatchConflict('Recurring occurrences were inserted concurrently')
+
+        rollup_deltas = {}
+        for rule, day in occurrences_due:
+            month = day.strftime('%Y-%m')
+            bucket = rollup_deltas.setdefault((rule['user_id'], month, rule['category']), [Decimal('0'), 0])
+            bucket[0] += Decimal(str(rule['amount']))
+            bucket[1] += 1
+            user = users.setdefault(rule['user_id'], {'inserted': 0, 'months': set()})
+            user['inserted'] += 1
+            user['months'].add(month)
+        storage.apply_rollup_deltas(
+            cur, [(user_id, month, category, total, count) for (user_id, month, category), (total, count) in rollup_deltas.items()]
+        )
+
+    cur.executemany("UPDATE recurring_expenses SET next_due = %s WHERE id = %s", next_dues)
+    return len(rules), users
+
+# ==================== Scheduler ====================
+
+class RecurringScheduler:
+    """Runs materialize_due over every due rule, one transaction per batch.
+
+    `on_batch(users)` is supplied by the app and runs after each batch commits
+    (cache invalidation, alerts, live events) with the per-user summary.
+    """
+
+    def __init__(self, app=None, db=None, on_batch=None):
+        self.db = db
+        self.on_batch = on_batch
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('RECURRING_TICK_INTERVAL', 60)
+        app.config.setdefault('RECURRING_BATCH_SIZE', 500)
+        app.config.setdefault('RECURRING_MAX_CATCHUP', 366)
+        self.app = app
+        self.config = app.config
+        if db is not None:
+            self.db = db
+        app.extensions['recurring_scheduler'] = self
+
+    def tick(self, today=None):
+        """Materialize everything due up to today; returns (rules processed, occurrences inserted)."""
+        today = today or date.today()
+        processed = inserted = 0
+        conflicts = 0
+        while True:
+            try:
+                with self.db.transaction() as cur:
+                    rules, users = materialize_due(
+                        cur, self.db.storage, today,
+                        self.config['RECURRING_BATCH_SIZE'], self.config['RECURRING_MAX_CATCHUP']
+                    )
+            except BatchConflict:
+                # The other worker is progressing through the same rules; a few
+                # retries either see its rows or find the rules no longer due
+                conflicts += 1
+                if conflicts > 3:
+                    raise
+                logger.info('Recurring batch conflicted with another worker; retrying')
+                continue
+            conflicts = 0
+            if not rules:
+                return processed, inserted
+            processed += rules
+            inserted += sum(user['inserted'] for user in users.values())
+            if users and self.on_batch is not None:
+                try:
+                    self.on_batch(users)
+                except Exception:
+                    logger.exception('Recurring batch follow-up failed')
+
+    def run(self, interval=None, stop=None):
+        interval = interval or self.config['RECURRING_TICK_INTERVAL']
+        while stop is None or not stop.is_set():
+            started = time.monotonic()
+            try:
+                # A fresh app context per tick returns the connection to the pool in
+                # between, so its ping and recycle replace one the server dropped
+                with self.app.app_context():
+                    processed, inserted = self.tick()
+                if processed:
+                    logger.info('Processed %s recurring rules, inserted %s expenses', processed, inserted)
+            except Exception:
+                logger.exception('Recurring expense tick failed')
+            (stop or threading.Event()).wait(max(0, interval - (time.monotonic() - started)))
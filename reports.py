@@ -0,0 +1,497 @@
+from contextlib import contextmanager
+from datetime import datetime, date
+from decimal import Decimal
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from exporters import export_value
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+except ImportError:  # PDF reports are optional
+    SimpleDocTemplate = None
+
+logger = logging.getLogger(__name__)
+
+# Report jobs: heavy reports (a year's category breakdown, a card statement,
+# a date-range summary) run on a worker pool instead of inside a request.
+#
+#   POST /api/reports        validate a spec and queue a job (or reuse one)
+#   GET  /api/reports/<id>   poll its status; 'report_job' events also arrive
+#                            on the user's /api/events stream
+#   GET  .../download        the finished artifact
+#
+# Jobs live in the report_jobs table, so they survive restarts and are shared
+# by every process: workers claim queued jobs with a conditional UPDATE, run at
+# most REPORT_MAX_RUNNING_PER_USER per user at a time, and put stale running
+# jobs back in the queue. A job's spec_hash covers the spec and the version of
+# the user's data, so an identical spec while one is queued or running joins
+# that job, and one submitted after it finished (with no writes since) reuses
+# its artifact. Artifacts are files named by spec_hash in REPORT_ARTIFACT_DIR,
+# evicted least recently used first once the directory exceeds
+# REPORT_ARTIFACT_MAX_BYTES.
+
+JOB_COLUMNS = (
+    "id, user_id, kind, format, spec, spec_hash, status, attempts, error, artifact_size, "
+    "created_at, started_at, finished_at"
+)
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'json': ('application/json', 'json'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+
+class ReportSpecError(ValueError):
+    pass
+
+class ReportQueueFull(Exception):
+    pass
+
+def pdf_available():
+    return SimpleDocTemplate is not None
+
+# ==================== Specs ====================
+
+MONTH_PATTERN = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+def parse_spec_date(value, name):
+    try:
+        return date.fromisoformat(str(value))
+    except (TypeError, ValueError):
+        raise ReportSpecError(f'{name} must be a YYYY-MM-DD date')
+
+def normalize_spec(data):
+    """Validate a report spec from the API into its canonical form or raise ReportSpecError."""
+    kind = data.get('kind')
+    if kind not in REPORT_KINDS:
+        raise ReportSpecError(f"kind must be one of {', '.join(REPORT_KINDS)}")
+    report_format = data.get('format', 'csv')
+    if report_format not in FORMATS:
+        raise ReportSpecError(f"format must be one of {', '.join(FORMATS)}")
+
+    spec = {'kind': kind, 'format': report_format}
+    if kind == 'category_year':
+        year = data.get('year')
+        if not isinstance(year, int) or isinstance(year, bool) or not 1900 <= year <= 9999:
+            raise ReportSpecError('year must be a four-digit year')
+        spec['year'] = year
+    elif kind == 'card_statement':
+        card_id = data.get('card_id')
+        if not isinstance(card_id, int) or isinstance(card_id, bool):
+            raise ReportSpecError('card_id must be an integer')
+        if not MONTH_PATTERN.match(str(data.get('month', ''))):
+            raise ReportSpecError('month must be YYYY-MM')
+        spec.update(card_id=card_id, month=data['month'])
+    elif kind == 'summary':
+        start_date = parse_spec_date(data.get('start_date'), 'start_date')
+        end_date = parse_spec_date(data.get('end_date'), 'end_date')
+        if end_date < start_date:
+            raise ReportSpecError('end_date is before start_date')
+        if (end_date - start_date).days > 366 * 5:
+            raise ReportSpecError('A summary covers at most five years')
+        spec.update(start_date=start_date.isoformat(), end_date=end_date.isoformat())
+    return spec
+
+def spec_hash(spec, version):
+    canonical = json.dumps(spec, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(f'{canonical}|{version}'.encode()).hexdigest()
+
+# ==================== Builders ====================
+
+# Each builder reads one report and returns (title, [(heading, columns, rows), ...])
+
+def build_category_year(cur, storage, user_id, spec):
+    year = spec['year']
+    cur.execute(
+        "SELECT month, category, total FROM expense_rollups "
+        "WHERE user_id = %s AND month >= %s AND month <= %s AND expense_count > 0",
+        (user_id, f'{year}-01', f'{year}-12')
+    )
+    totals = {}
+    for row in cur.fetchall():
+        totals.setdefault(row['category'], [Decimal('0')] * 12)[int(row['month'][5:]) - 1] += Decimal(str(row['total']))
+
+    months = [date(year, m, 1).strftime('%b') for m in range(1, 13)]
+    rows = [[category, *values, sum(values)] for category, values in sorted(totals.items())]
+    column_totals = [sum(values) for values in zip(*totals.values())] if totals else [Decimal('0')] * 12
+    rows.append(['Total', *column_totals, sum(column_totals)])
+    return f'Spending by category, {year}', [('Monthly totals', ['Category', *months, 'Year'], rows)]
+
+def build_card_statement(cur, storage, user_id, spec):
+    cur.execute(
+        "SELECT card_number_masked, card_type, card_holder, balance FROM cards WHERE id = %s AND user_id = %s",
+        (spec['card_id'], user_id)
+    )
+    card = cur.fetchone()
+    if not card:
+        raise ReportSpecError('Card not found')
+
+    cur.execute(
+        "SELECT expense_date, description, category, amount FROM expenses "
+        "WHERE user_id = %s AND card_id = %s AND expense_date >= %s AND expense_date < %s "
+        "ORDER BY expense_date, id",
+        (user_id, spec['card_id'], f"{spec['month']}-01", next_month_start(spec['month']))
+    )
+    expenses = cur.fetchall()
+    total = sum((Decimal(str(e['amount'])) for e in expenses), Decimal('0'))
+    return f"Card statement {spec['month']}", [
+        ('Card', ['Field', 'Value'], [
+            ['Card', card['card_number_masked']],
+            ['Type', card['card_type']],
+            ['Holder', card['card_holder']],
+            ['Current balance', card['balance']],
+            ['Transactions', len(expenses)],
+            ['Total spent', total],
+        ]),
+        ('Transactions', ['Date', 'Description', 'Category', 'Amount'],
+         [[e['expense_date'], e['description'], e['category'], e['amount']] for e in expenses]),
+    ]
+
+def build_summary(cur, storage, user_id, spec):
+    params = (user_id, spec['start_date'], spec['end_date'])
+    where = "WHERE user_id = %s AND expense_date >= %s AND expense_date <= %s"
+
+    cur.execute(
+        f"SELECT category, SUM(amount) as total, COUNT(*) as expense_count FROM expenses {where} "
+        "GROUP BY category ORDER BY total DESC",
+        params
+    )
+    by_category = [
+        [row['category'], row['expense_count'], row['total'], Decimal(str(row['total'])) / row['expense_count']]
+        for row in cur.fetchall()
+    ]
+    month = storage.month_expr('expense_date')
+    cur.execute(
+        f"SELECT {month} as month, SUM(amount) as total, COUNT(*) as expense_count FROM expenses {where} "
+        f"GROUP BY {month} ORDER BY month",
+        params
+    )
+    by_month = [[row['month'], row['expense_count'], row['total']] for row in cur.fetchall()]
+    cur.execute(
+        f"SELECT expense_date, description, category, amount FROM expenses {where} ORDER BY amount DESC LIMIT 20",
+        params
+    )
+    largest = [[row['expense_date'], row['description'], row['category'], row['amount']] for row in cur.fetchall()]
+
+    return f"Spending summary {spec['start_date']} to {spec['end_date']}", [
+        ('By category', ['Category', 'Transactions', 'Total', 'Average'], by_category),
+        ('By month', ['Month', 'Transactions', 'Total'], by_month),
+        ('Largest expenses', ['Date', 'Description', 'Category', 'Amount'], largest),
+    ]
+
+REPORT_KINDS = {
+    'category_year': build_category_year,
+    'card_statement': build_card_statement,
+    'summary': build_summary,
+}
+
+def next_month_start(month):
+    year, number = int(month[:4]), int(month[5:])
+    return f'{year + number // 12:04d}-{number % 12 + 1:02d}-01'
+
+# ==================== Renderers ====================
+
+def cell(value):
+    if isinstance(value, (Decimal, float)):
+        return f'{Decimal(str(value)).quantize(Decimal("0.01"))}'
+    value = export_value(value)
+    return '' if value is None else value
+
+def render_csv(title, sections, out):
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow([title])
+    for heading, columns, rows in sections:
+        writer.writerow([])
+        writer.writerow([heading])
+        writer.writerow(columns)
+        writer.writerows([cell(value) for value in row] for row in rows)
+    text.flush()
+    text.detach()
+
+def render_json(title, sections, out):
+    document = {
+        'title': title,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'sections': [
+            {'heading': heading, 'columns': columns, 'rows': [[cell(value) for value in row] for row in rows]}
+            for heading, columns, rows in sections
+        ]
+    }
+    out.write(json.dumps(document, separators=(',', ':')).encode())
+
+def render_pdf(title, sections, out):
+    styles = getSampleStyleSheet()
+    story = [Paragraph(title, styles['Title'])]
+    for heading, columns, rows in sections:
+        story.append(Paragraph(heading, styles['Heading2']))
+        table = Table([columns] + [[str(cell(value)) for value in row] for row in rows], repeatRows=1)
+        table.setStyle(TableStyle([
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6366f1')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#e5e7eb')),
+        ]))
+        story.extend([table, Spacer(1, 12)])
+    SimpleDocTemplate(out, pagesize=A4, title=title).build(story)
+
+RENDERERS = {
+    'csv': render_csv,
+    'json': render_json,
+    'pdf': render_pdf,
+}
+
+# ==================== Artifacts ====================
+
+class ArtifactStore:
+    """Report files in one directory, evicted least recently used first past max_bytes."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key)
+
+    def open(self, key):
+        # Path of the artifact, marked as just used, or None if it was evicted
+        path = self._file(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def exists(self, key):
+        return os.path.exists(self._file(key))
+
+    @contextmanager
+    def writer(self, key):
+        # Written under a temporary name and renamed, so readers never see half a file
+        temp_path = self._file(f'{key}.{uuid.uuid4().hex}.tmp')
+        try:
+            with open(temp_path, 'wb') as out:
+                yield out
+            os.replace(temp_path, self._file(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+# ==================== Queue ====================
+
+class ReportQueue:
+    """Job table access plus the worker pool that runs queued reports.
+
+    `publish(user_id, job)` is supplied by the app and is called whenever a
+    job changes state; workers run each job inside an app context.
+    """
+
+    def __init__(self, app=None, db=None, publish=None):
+        self.db = db
+        self.publish = publish
+        self._workers = []
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db=None):
+        app.config.setdefault('REPORT_WORKERS', 2)
+        app.config.setdefault('REPORT_EMBEDDED_WORKERS', True)
+        app.config.setdefault('REPORT_MAX_RUNNING_PER_USER', 1)
+        app.config.setdefault('REPORT_MAX_QUEUED_PER_USER', 10)
+        app.config.setdefault('REPORT_POLL_INTERVAL', 1.0)
+        app.config.setdefault('REPORT_JOB_TIMEOUT', 600)
+        app.config.setdefault('REPORT_MAX_ATTEMPTS', 3)
+        app.config.setdefault('REPORT_ARTIFACT_DIR', os.path.join(app.instance_path, 'report_artifacts'))
+        app.config.setdefault('REPORT_ARTIFACT_MAX_BYTES', 256 * 1024 * 1024)
+        self.app = app
+        self.config = app.config
+        if db is not None:
+            self.db = db
+        self.artifacts = ArtifactStore(app.config['REPORT_ARTIFACT_DIR'], app.config['REPORT_ARTIFACT_MAX_BYTES'])
+        app.extensions['report_queue'] = self
+
+    # ---- API side ----
+
+    def submit(self, user_id, spec, version):
+        """Queue spec for user_id; returns (job, 'queued' | 'deduplicated' | 'cached')."""
+        key = spec_hash(spec, version)
+        with self.db.transaction() as cur:
+            # One submitter per user at a time, so dedup and the queue limit see each other
+            cur.execute("SELECT id FROM users WHERE id = %s" + self.db.storage.lock_rows, (user_id,))
+
+            cur.execute(
+                f"SELECT {JOB_COLUMNS} FROM report_jobs WHERE user_id = %s AND spec_hash = %s "
+                "AND status IN ('queued', 'running', 'done') ORDER BY created_at DESC",
+                (user_id, key)
+            )
+            for job in cur.fetchall():
+                if job['status'] != 'done':
+                    return job, 'deduplicated'
+                if self.artifacts.exists(key):
+                    return job, 'cached'
+
+            cur.execute(
+                "SELECT COUNT(*) as pending FROM report_jobs WHERE user_id = %s AND status IN ('queued', 'running')",
+                (user_id,)
+            )
+            if cur.fetchone()['pending'] >= self.config['REPORT_MAX_QUEUED_PER_USER']:
+                raise ReportQueueFull()
+
+            job_id = uuid.uuid4().hex
+            cur.execute(
+                "INSERT INTO report_jobs (id, user_id, kind, format, spec, spec_hash, status, attempts, created_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s, 'queued', 0, %s)",
+                (job_id, user_id, spec['kind'], spec['format'], json.dumps(spec, sort_keys=True), key, datetime.now())
+            )
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM report_jobs WHERE id = %s", (job_id,))
+            job = cur.fetchone()
+
+        if self.config['REPORT_EMBEDDED_WORKERS']:
+            self.start_workers(self.config['REPORT_WORKERS'])
+        self._wake.set()
+        return job, 'queued'
+
+    def get(self, user_id, job_id):
+        with self.db.cursor() as cur:
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM report_jobs WHERE id = %s AND user_id = %s", (job_id, user_id))
+            return cur.fetchone()
+
+    def recent(self, user_id, limit=50):
+        with self.db.cursor() as cur:
+            cur.execute(
+                f"SELECT {JOB_COLUMNS} FROM report_jobs WHERE user_id = %s ORDER BY created_at DESC LIMIT %s",
+                (user_id, limit)
+            )
+            return cur.fetchall()
+
+    # ---- Worker side ----
+
+    def claim(self):
+        """Mark the oldest runnable queued job running and return it, or None."""
+        with self.db.cursor() as cur:
+            cur.execute("SELECT id, user_id FROM report_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 20")
+            candidates = cur.fetchall()
+
+        for candidate in candidates:
+            with self.db.transaction() as cur:
+                # Serialize claims per user so the running limit holds across workers
+                cur.execute("SELECT id FROM users WHERE id = %s" + self.db.storage.lock_rows, (candidate['user_id'],))
+                cur.execute(
+                    "SELECT COUNT(*) as running FROM report_jobs WHERE user_id = %s AND status = 'running'",
+                    (candidate['user_id'],)
+                )
+                if cur.fetchone()['running'] >= self.config['REPORT_MAX_RUNNING_PER_USER']:
+                    continue
+                cur.execute(
+                    "UPDATE report_jobs SET status = 'running', attempts = attempts + 1, started_at = %s "
+                    "WHERE id = %s AND status = 'queued'",
+                    (datetime.now(), candidate['id'])
+                )
+                if cur.rowcount != 1:
+                    continue
+                cur.execute(f"SELECT {JOB_COLUMNS} FROM report_jobs WHERE id = %s", (candidate['id'],))
+                return cur.fetchone()
+        return None
+
+    def requeue_stale(self):
+        # A job running past the timeout lost its worker; retry it, up to REPORT_MAX_ATTEMPTS
+        cutoff = datetime.fromtimestamp(time.time() - self.config['REPORT_JOB_TIMEOUT'])
+        with self.db.transaction() as cur:
+            cur.execute(
+                "UPDATE report_jobs SET status = 'failed', error = 'Timed out', finished_at = %s "
+                "WHERE status = 'running' AND started_at < %s AND attempts >= %s",
+                (datetime.now(), cutoff, self.config['REPORT_MAX_ATTEMPTS'])
+            )
+            cur.execute(
+                "UPDATE report_jobs SET status = 'queued' WHERE status = 'running' AND started_at < %s",
+                (cutoff,)
+            )
+            return cur.rowcount
+
+    def execute(self, job):
+        spec = json.loads(job['spec'])
+        try:
+            with self.db.cursor() as cur:
+                title, sections = REPORT_KINDS[spec['kind']](cur, self.db.storage, job['user_id'], spec)
+            with self.artifacts.writer(job['spec_hash']) as out:
+                RENDERERS[spec['format']](title, sections, out)
+                size = out.tell()
+            status, error = 'done', None
+        except Exception as e:
+            if not isinstance(e, ReportSpecError):
+                logger.exception('Report job %s failed', job['id'])
+            status, error, size = 'failed', str(e)[:500], None
+
+        with self.db.transaction() as cur:
+            cur.execute(
+                "UPDATE report_jobs SET status = %s, error = %s, artifact_size = %s, finished_at = %s "
+                "WHERE id = %s AND status = 'running'",
+                (status, error, size, datetime.now(), job['id'])
+            )
+            cur.execute(f"SELECT {JOB_COLUMNS} FROM report_jobs WHERE id = %s", (job['id'],))
+            job = cur.fetchone()
+        if self.publish is not None:
+            self.publish(job['user_id'], job)
+        return job
+
+    def run(self, stop=None):
+        """Worker loop: claim and execute jobs until stop is set."""
+        last_sweep = 0
+        while stop is None or not stop.is_set():
+            try:
+                with self.app.app_context():
+                    if time.monotonic() - last_sweep > self.config['REPORT_POLL_INTERVAL'] * 30:
+                        self.requeue_stale()
+                        last_sweep = time.monotonic()
+                    job = self.claim()
+                    if job is not None:
+                        if self.publish is not None:
+                            self.publish(job['user_id'], job)
+                        self.execute(job)
+                        continue
+            except Exception:
+                logger.exception('Report worker iteration failed')
+            self._wake.wait(self.config['REPORT_POLL_INTERVAL'])
+            self._wake.clear()
+
+    def start_workers(self, count, stop=None, daemon=True):
+        with self._start_lock:
+            while len(self._workers) < count:
+                worker = threading.Thread(
+                    target=self.run, args=(stop,), name=f'report-worker-{len(self._workers) + 1}', daemon=daemon
+                )
+                worker.start()
+                self._workers.append(worker)
+        return self._workers
@@ -3,40 +3,99 @@
 let summaryData = {};
 let monthlyData = [];
 let categoryData = [];
+let recentExpenses = [];
 
 // ==================== Initialize Dashboard ====================
 
 document.addEventListener('DOMContentLoaded', async () => {
     await loadDashboardData();
-    await loadRecentTransactions();
-    await loadNotificationCount();
     
     // Add staggered animation to stat cards
     animateStatCards();
+    
+    subscribeToLiveUpdates();
 });
 
 // ==================== Load Dashboard Data ====================
 
 async function loadDashboardData() {
     try {
-        // Load summary
-        summaryData = await apiRequest('/api/analytics/summary');
+        // Summary, charts, recent transactions and notifications in one request
+        const dashboard = await apiRequest('/api/dashboard');
+        
+        summaryData = dashboard.summary;
         updateSummaryCards();
         
-        // Load monthly data
-        monthlyData = await apiRequest('/api/analytics/monthly');
+        monthlyData = dashboard.monthly;
         renderMonthlyChart();
         
-        // Load category data
-        categoryData = await apiRequest('/api/analytics/category');
+        categoryData = dashboard.category;
         renderCategoryChart();
         
+        recentExpenses = dashboard.recent_expenses;
+        renderRecentTransactions(recentExpenses);
+        updateNotificationBadges(dashboard.unread_count);
+        
     } catch (error) {
         console. error('Error loading dashboard data:', error);
         showAlert('Failed to load dashboard data', 'danger');
     }
 }
 
+// ==================== Live Updates ====================
+
+// Apply the small deltas pushed over /api/events instead of reloading everything
+function subscribeToLiveUpdates() {
+    if (!window.EventSource) return;
+    
+    const source = new EventSource('/api/events');
+    const on = (name, handler) => source.addEventListener(name, event => handler(JSON.parse(event.data)));
+    
+    on('expense', expense => {
+        recentExpenses = [expense].concat(recentExpenses).slice(0, 5);
+        renderRecentTransactions(recentExpenses);
+    });
+    
+    on('month_total', ({ month, total }) => {
+        const entry = monthlyData.find(m => m.month === month);
+        if (entry) {
+            entry.total = total;
+        } else {
+            monthlyData.push({ month, total });
+            monthlyData.sort((a, b) => a.month.localeCompare(b.month));
+        }
+        renderMonthlyChart();
+        
+        if (month === summaryData.current_month) {
+            summaryData.total_expenses = total;
+            summaryData.remaining_balance = summaryData.monthly_salary - total;
+            updateSummaryCards();
+        }
+    });
+    
+    on('category_total', ({ month, category, total }) => {
+        if (month !== summaryData.current_month) return;
+        categoryData = categoryData.filter(c => c.category !== category);
+        if (total > 0) {
+            categoryData.push({ category, total });
+        }
+        categoryData.sort((a, b) => b.total - a.total);
+        renderCategoryChart();
+    });
+    
+    on('balance', ({ total_balance }) => {
+        summaryData.total_balance = total_balance;
+        updateSummaryCards();
+    });
+    
+    on('unread_count', ({ unread_count }) => updateNotificationBadges(unread_count));
+    
+    // Changes too broad for a delta: fetch the batched dashboard again
+    ['expense_updated', 'expense_deleted', 'expenses_imported', 'recurring_expenses', 'resync'].forEach(name => {
+        source.addEventListener(name, () => loadDashboardData());
+    });
+}
+
 // ==================== Animate Stat Cards ====================
 
 function animateStatCards() {
@@ -107,7 +166,7 @@ function animateValue(element, start, end, duration) {
 
 async function loadRecentTransactions() {
     try {
-        const expenses = await apiRequest('/api/expenses? limit=5');
+        const expenses = await apiRequest('/api/expenses?limit=5');
         renderRecentTransactions(expenses);
     } catch (error) {
         console.error('Error loading recent transactions:', error);
@@ -152,23 +211,25 @@ function renderRecentTransactions(expenses) {
 
 async function loadNotificationCount() {
     try {
-        const notifications = await apiRequest('/api/notifications');
-        const unreadCount = notifications. filter(n => ! n.is_read).length;
-        
-        const badges = document.querySelectorAll('.notification-badge');
-        badges.forEach(badge => {
-            if (unreadCount > 0) {
-                badge.textContent = unreadCount > 99 ? '99+' : unreadCount;
-                badge. style.display = 'flex';
-            } else {
-                badge.style.display = 'none';
-            }
-        });
+        const { unread_count } = await apiRequest('/api/notifications/unread_count');
+        updateNotificationBadges(unread_count);
     } catch (error) {
         console.error('Error loading notifications:', error);
     }
 }
 
+function updateNotificationBadges(unreadCount) {
+    const badges = document.querySelectorAll('.notification-badge');
+    badges.forEach(badge => {
+        if (unreadCount > 0) {
+            badge.textContent = unreadCount > 99 ? '99+' : unreadCount;
+            badge. style.display = 'flex';
+        } else {
+            badge.style.display = 'none';
+        }
+    });
+}
+
 // ==================== Charts ====================
 
 let monthlyChart = null;
@@ -13,12 +13,17 @@ let currentExpenses = [];
 
 async function loadExpenses(filters = {}) {
     try {
-        let url = '/api/expenses? ';
+        // Text and amount filters need the search endpoint; plain listings stay on /api/expenses
+        const searching = filters.q || filters.amount_min || filters.amount_max;
+        let url = searching ? '/api/expenses/search?sort=date&' : '/api/expenses?';
+        if (filters.q) url += `q=${encodeURIComponent(filters.q)}&`;
+        if (filters.amount_min) url += `amount_min=${filters.amount_min}&`;
+        if (filters.amount_max) url += `amount_max=${filters.amount_max}&`;
         if (filters.start_date) url += `start_date=${filters.start_date}&`;
         if (filters.end_date) url += `end_date=${filters. end_date}&`;
         if (filters.category) url += `category=${filters. category}&`;
         
-        currentExpenses = await apiRequest(url);
+        currentExpenses = await apiRequestAllPages(url);
         renderExpenses(currentExpenses);
         updateExpenseSummary(currentExpenses);
     } catch (error) {
@@ -301,6 +306,9 @@ function setupFilters() {
 
 function applyFilters() {
     const filters = {
+        q: document.getElementById('filter-search')?.value.trim(),
+        amount_min: document.getElementById('filter-amount-min')?.value,
+        amount_max: document.getElementById('filter-amount-max')?.value,
         start_date: document.getElementById('filter-start-date')?.value,
         end_date: document.getElementById('filter-end-date')?. value,
         category: document.getElementById('filter-category')?. value
@@ -311,6 +319,9 @@ function applyFilters() {
 }
 
 function resetFilters() {
+    document.getElementById('filter-search').value = '';
+    document.getElementById('filter-amount-min').value = '';
+    document.getElementById('filter-amount-max').value = '';
     document.getElementById('filter-start-date').value = '';
     document.getElementById('filter-end-date').value = '';
     document.getElementById('filter-category').value = '';
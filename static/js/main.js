@@ -149,6 +149,32 @@ async function apiRequest(url, options = {}) {
     }
 }
 
+// Fetch every page of a keyset-paginated list endpoint by following X-Next-Cursor
+async function apiRequestAllPages(url) {
+    const items = [];
+    let nextUrl = url;
+    
+    while (nextUrl) {
+        const response = await fetch(API_BASE_URL + nextUrl, {
+            headers: { 'Content-Type': 'application/json' }
+        });
+        const data = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(data.error || 'An error occurred');
+        }
+        
+        items.push(...data);
+        
+        const cursor = response.headers.get('X-Next-Cursor');
+        nextUrl = cursor
+            ? url + (url.includes('?') ? '&' : '?') + `cursor=${encodeURIComponent(cursor)}`
+            : null;
+    }
+    
+    return items;
+}
+
 // ==================== Modal Functions ====================
 
 // Open modal with animation
@@ -371,7 +397,7 @@ function animateOnScroll() {
                 observer.unobserve(entry.target);
             }
         });
-    }, { threshold: 0. 1 });
+    }, { threshold: 0.1 });
     
     elements.forEach(el => observer.observe(el));
 }
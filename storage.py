@@ -0,0 +1,273 @@
+from datetime import datetime
+import glob
+import os
+import re
+
+# Storage engines. Routes write portable SQL with %s placeholders; anything
+# that differs between MySQL and SQLite (upserts, INSERT IGNORE, row locks,
+# month bucketing, connection setup and schema migrations) goes through the
+# engine's Storage object, reachable as db.storage.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+class Storage:
+    name = None
+
+    # Appended to SELECTs that read rows the same transaction will rewrite
+    lock_rows = ''
+
+    def configure(self, conn):
+        pass
+
+    def configure_read_only(self, conn):
+        # Replica connections refuse writes, so a mis-marked view fails instead of diverging
+        pass
+
+    def begin(self, conn, cur):
+        # Start a write transaction; MySQL opens one implicitly
+        pass
+
+    def month_expr(self, column):
+        raise NotImplementedError
+
+    def upsert_sql(self, table, columns, keys, increment=(), replace=()):
+        raise NotImplementedError
+
+    def insert_ignore_sql(self, table, columns):
+        raise NotImplementedError
+
+    def text_search(self, user_id, terms, ranked=True):
+        # SQL matching expense descriptions (alias e) that contain every term as a word prefix:
+        # (join, condition, condition params, score, score params); a higher score is more relevant.
+        # With ranked=False no score is needed, so the match may be planned however is cheapest
+        raise NotImplementedError
+
+    def full_scans(self, cur, query, params):
+        # Tables the plan for query reads with a full table (or full index) scan
+        raise NotImplementedError
+
+    # ==================== Domain Writes ====================
+
+    def apply_rollup_delta(self, cur, user_id, month, category, amount, count):
+        # Adjust a user's monthly category rollup on the caller's transaction
+        self.apply_rollup_deltas(cur, [(user_id, month, category, amount, count)])
+
+    def apply_rollup_deltas(self, cur, rows):
+        cur.executemany(
+            self.upsert_sql(
+                'expense_rollups',
+                ['user_id', 'month', 'category', 'total', 'expense_count'],
+                keys=['user_id', 'month', 'category'],
+                increment=['total', 'expense_count']
+            ),
+            rows
+        )
+
+    def upsert_budget(self, cur, user_id, category, monthly_limit):
+        cur.execute(
+            self.upsert_sql(
+                'category_budgets',
+                ['user_id', 'category', 'monthly_limit'],
+                keys=['user_id', 'category'],
+                replace=['monthly_limit']
+            ),
+            (user_id, category, monthly_limit)
+        )
+
+    def record_alert(self, cur, user_id, month, scope, threshold):
+        # True only for the first caller to record this threshold
+        cur.execute(
+            self.insert_ignore_sql('alert_state', ['user_id', 'month', 'scope', 'threshold']),
+            (user_id, month, scope, threshold)
+        )
+        return cur.rowcount == 1
+
+    def add_notification(self, cur, user_id, message, type):
+        cur.execute(
+            "INSERT INTO notifications (user_id, message, type) VALUES (%s, %s, %s)",
+            (user_id, message, type)
+        )
+        notification_id = cur.lastrowid
+        cur.execute(
+            "UPDATE users SET unread_notifications = unread_notifications + 1 WHERE id = %s",
+            (user_id,)
+        )
+        return notification_id
+
+    def mark_notifications_read(self, cur, user_id, ids=None, up_to=None):
+        # Mark the given ids (or everything up to an id, or everything) read and
+        # move the user's unread counter by however many rows actually flipped
+        query = "UPDATE notifications SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE"
+        params = [user_id]
+        if ids is not None:
+            if not ids:
+                return 0
+            query += f" AND id IN ({', '.join(['%s'] * len(ids))})"
+            params.extend(ids)
+        if up_to is not None:
+            query += " AND id <= %s"
+            params.append(up_to)
+        cur.execute(query, params)
+        marked = cur.rowcount
+        if marked:
+            cur.execute(
+                "UPDATE users SET unread_notifications = unread_notifications - %s WHERE id = %s",
+                (marked, user_id)
+            )
+        return marked
+
+    # ==================== Migrations ====================
+
+    def migration_files(self):
+        pattern = os.path.join(MIGRATIONS_DIR, self.name, '[0-9][0-9][0-9][0-9]_*.sql')
+        for path in sorted(glob.glob(pattern)):
+            filename = os.path.basename(path)
+            yield int(filename[:4]), filename[5:-4], path
+
+    def applied_migrations(self, conn):
+        cur = conn.cursor()
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at VARCHAR(32) NOT NULL)"
+        )
+        cur.execute("SELECT version FROM schema_migrations")
+        versions = {row[0] if isinstance(row, (tuple, list)) else row['version'] for row in cur.fetchall()}
+        cur.close()
+        conn.commit()
+        return versions
+
+    def migrate(self, conn):
+        # Apply every migration not yet recorded in schema_migrations, in order
+        applied = self.applied_migrations(conn)
+        ran = []
+        for version, name, path in self.migration_files():
+            if version in applied:
+                continue
+            with open(path) as f:
+                self.run_script(conn, f.read())
+            cur = conn.cursor()
+            cur.execute(
+                self.placeholders("INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)"),
+                (version, name, datetime.now().isoformat(timespec='seconds'))
+            )
+            cur.close()
+            conn.commit()
+            ran.append((version, name))
+        return ran
+
+    def run_script(self, conn, script):
+        raise NotImplementedError
+
+    def placeholders(self, query):
+        return query
+
+class MySQLStorage(Storage):
+    name = 'mysql'
+    lock_rows = ' FOR UPDATE'
+
+    def configure_read_only(self, conn):
+        cur = conn.cursor()
+        cur.execute("SET SESSION TRANSACTION READ ONLY")
+        cur.close()
+
+    def month_expr(self, column):
+        return f"DATE_FORMAT({column}, '%%Y-%%m')"
+
+    def upsert_sql(self, table, columns, keys, increment=(), replace=()):
+        updates = [f"{c} = {c} + VALUES({c})" for c in increment] + [f"{c} = VALUES({c})" for c in replace]
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON DUPLICATE KEY UPDATE {', '.join(updates)}"
+        )
+
+    def insert_ignore_sql(self, table, columns):
+        return f"INSERT IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    def text_search(self, user_id, terms, ranked=True):
+        # FULLTEXT index on expenses.description; '+term*' requires each term as a prefix
+        against = ' '.join(f'+{term}*' for term in terms)
+        match = "MATCH (e.description) AGAINST (%s IN BOOLEAN MODE)"
+        return '', match, [against], match, [against]
+
+    def full_scans(self, cur, query, params):
+        cur.execute("EXPLAIN " + query, params)
+        return [row['table'] for row in cur.fetchall() if row.get('type') in ('ALL', 'index')]
+
+    def run_script(self, conn, script):
+        cur = conn.cursor()
+        for statement in split_statements(script):
+            cur.execute(statement)
+        cur.close()
+        conn.commit()
+
+class SQLiteStorage(Storage):
+    name = 'sqlite'
+
+    def configure(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+
+    def configure_read_only(self, conn):
+        conn.execute("PRAGMA query_only=ON")
+
+    def begin(self, conn, cur):
+        # Take the write lock up front so read-then-write transactions cannot deadlock
+        if not conn.in_transaction:
+            cur.execute("BEGIN IMMEDIATE")
+
+    def month_expr(self, column):
+        return f"strftime('%%Y-%%m', {column})"
+
+    def upsert_sql(self, table, columns, keys, increment=(), replace=()):
+        updates = [f"{c} = {c} + excluded.{c}" for c in increment] + [f"{c} = excluded.{c}" for c in replace]
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {', '.join(updates)}"
+        )
+
+    def insert_ignore_sql(self, table, columns):
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+    def text_search(self, user_id, terms, ranked=True):
+        # FTS5 expense_search index; the owner token scopes the match to one user's rows
+        match = f'owner:"u{int(user_id)}" AND ' + ' AND '.join(f'description:"{term}"*' for term in terms)
+        if not ranked:
+            # A join would be driven by the date index, running the MATCH once per row;
+            # the subquery runs it once and the matching ids are sorted instead
+            return '', "e.id IN (SELECT rowid FROM expense_search WHERE expense_search MATCH %s)", [match], None, []
+        # bm25() is lower-is-better; weight 0 keeps the owner column out of the ranking
+        return (
+            " JOIN expense_search ON expense_search.rowid = e.id",
+            "expense_search MATCH %s", [match],
+            "-bm25(expense_search, 0.0, 1.0)", []
+        )
+
+    def full_scans(self, cur, query, params):
+        # 'SCAN <table>' is a full scan; 'SEARCH <table> USING INDEX ...' is not, and
+        # neither is 'SCAN <fts table> VIRTUAL TABLE INDEX ...', which answers MATCH from its index
+        cur.execute("EXPLAIN QUERY PLAN " + query, params)
+        scans = []
+        for row in cur.fetchall():
+            match = re.match(r'SCAN (?:TABLE )?(\w+)', row['detail'])
+            if match and match.group(1) != 'CONSTANT' and 'VIRTUAL TABLE' not in row['detail']:
+                scans.append(match.group(1))
+        return scans
+
+    def run_script(self, conn, script):
+        conn.executescript(script)
+
+    def placeholders(self, query):
+        return query.replace('%s', '?')
+
+def split_statements(script):
+    # Split a migration on statement-ending semicolons, dropping comment lines
+    lines = [line for line in script.splitlines() if not line.lstrip().startswith('--')]
+    return [statement.strip() for statement in re.split(r';\s*$', '\n'.join(lines), flags=re.M) if statement.strip()]
+
+STORAGES = {
+    'mysql': MySQLStorage,
+    'sqlite': SQLiteStorage,
+}
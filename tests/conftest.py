@@ -0,0 +1,63 @@
+# The app is built from environment variables at import time, so the test
+# settings go in before anything imports app: a throwaway SQLite database,
+# inline password hashing at the minimum bcrypt cost, and report jobs left
+# queued for the tests to inspect rather than picked up by embedded workers.
+
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='finance-tracker-tests-')
+
+os.environ.update(
+    DB_ENGINE='sqlite',
+    SQLITE_PATH=os.path.join(TEST_DIR, 'finance_tracker.db'),
+    DB_AUTO_MIGRATE='1',
+    PASSWORD_POOL_WORKERS='0',
+    BCRYPT_LOG_ROUNDS='4',
+    REPORT_EMBEDDED_WORKERS='false',
+    CACHE_BACKEND='memory',
+    ALERT_QUEUE='memory',
+    EVENTS_BROKER='memory',
+)
+os.environ.pop('DB_REPLICAS', None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app, db  # noqa: E402
+
+_user_numbers = itertools.count(1)
+
+@pytest.fixture
+def app():
+    return flask_app
+
+@pytest.fixture
+def database(app):
+    # Direct queries need an app context for the pooled connection
+    with app.app_context():
+        yield db
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as a freshly registered user."""
+    client = app.test_client()
+    number = next(_user_numbers)
+    client.email = f'user{number}@example.com'
+    response = client.post('/api/register', json={
+        'username': f'user{number}', 'email': client.email, 'password': 'correct horse'
+    })
+    assert response.status_code == 201, response.get_json()
+    client.user_id = response.get_json()['user_id']
+    return client
+
+@pytest.fixture
+def card_id(client):
+    response = client.post('/api/cards', json={
+        'card_number': '4111 1111 1111 1234', 'card_type': 'visa', 'card_holder': 'Test User',
+        'expiry_date': '12/30', 'balance': 100
+    })
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['card_id']
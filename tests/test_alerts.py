@@ -0,0 +1,70 @@
+from datetime import date
+import time
+
+import pytest
+
+from alerts import evaluate_alerts
+
+THRESHOLDS = (50, 80, 100)
+
+def set_salary(client, salary):
+    client.put('/api/user/profile', json={
+        'username': f'user{client.user_id}-alerts', 'email': f'alerts{client.user_id}@example.com', 'monthly_salary': salary
+    })
+
+@pytest.fixture
+def spend(database):
+    # Straight into the rollup, so the app's own alert worker is not involved
+    users = set()
+
+    def spend(user_id, month, category, amount):
+        users.add(user_id)
+        with database.transaction() as cur:
+            database.storage.apply_rollup_delta(cur, user_id, month, category, amount, 1)
+    yield spend
+
+    # These rows have no expenses behind them; keep `flask rollups verify` clean for other tests
+    with database.transaction() as cur:
+        for user_id in users:
+            cur.execute("DELETE FROM expense_rollups WHERE user_id = %s", (user_id,))
+
+def evaluate(database, user_id, month):
+    with database.transaction() as cur:
+        return evaluate_alerts(cur, database.storage, user_id, month, THRESHOLDS)
+
+def test_each_threshold_fires_once_per_month(client, database, spend):
+    set_salary(client, 1000)
+    spend(client.user_id, '2023-05', 'Food', 850)
+
+    created = evaluate(database, client.user_id, '2023-05')
+
+    assert [alert['type'] for alert in created] == ['info', 'warning']
+    assert all(alert['message'].endswith('of your monthly salary in 2023-05 (850.00/1000.00)') for alert in created)
+    assert evaluate(database, client.user_id, '2023-05') == []
+
+    spend(client.user_id, '2023-05', 'Food', 200)
+    assert [alert['type'] for alert in evaluate(database, client.user_id, '2023-05')] == ['error']
+    # A new month starts over
+    spend(client.user_id, '2023-06', 'Food', 600)
+    assert len(evaluate(database, client.user_id, '2023-06')) == 1
+
+def test_category_budget_thresholds(client, database, spend):
+    client.put('/api/budgets', json={'category': 'Fun', 'monthly_limit': 100})
+    spend(client.user_id, '2023-07', 'Fun', 120)
+
+    created = evaluate(database, client.user_id, '2023-07')
+
+    assert len(created) == 3
+    assert all('your Fun budget' in alert['message'] for alert in created)
+
+def test_expense_write_queues_the_check(client):
+    set_salary(client, 100)
+    month = date.today().strftime('%Y-%m')
+
+    response = client.post('/api/expenses', json={'amount': 60, 'category': 'Food', 'expense_date': f'{month}-01'})
+    assert response.status_code == 201
+
+    deadline = time.monotonic() + 5
+    while not (notifications := client.get('/api/notifications').get_json()) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert [n['type'] for n in notifications] == ['info']
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi
+
+# The async views run the same bodies as their WSGI twins; both entry points
+# must answer every shared route identically.
+
+@pytest.fixture(scope='module')
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture
+def uncached(monkeypatch):
+    # Otherwise the second entry point is answered from the first one's cache entry
+    monkeypatch.setattr(asgi.response_cache.backend, 'get', lambda key: None)
+
+@pytest.fixture
+def call_asgi(loop):
+    def call_asgi(client, method, path, body=b'', headers=()):
+        path, _, query = path.partition('?')
+        cookie = client.get_cookie('session')
+        headers = list(headers) + [(b'host', b'localhost'), (b'content-type', b'application/json')]
+        if cookie is not None:
+            headers.append((b'cookie', f'session={cookie.value}'.encode()))
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+            'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'headers': headers, 'server': ('localhost', 80), 'client': ('127.0.0.1', 1234),
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        loop.run_until_complete(asgi.application(scope, receive, send))
+        start = sent[0]
+        return start['status'], b''.join(message.get('body', b'') for message in sent[1:])
+    return call_asgi
+
+@pytest.fixture
+def spending(client, card_id):
+    for amount, category, day in [(12.5, 'Food', '2024-06-03'), (40, 'Travel', '2024-06-10'), (7.25, 'Food', '2024-07-01')]:
+        response = client.post('/api/expenses', json={
+            'amount': amount, 'category': category, 'description': f'{category} {day}',
+            'expense_date': day, 'card_id': card_id,
+        })
+        assert response.status_code == 201
+    assert client.put('/api/budgets', json={'category': 'Food', 'monthly_limit': 100}).status_code == 200
+
+@pytest.mark.parametrize('path', [
+    '/api/user/profile',
+    '/api/cards',
+    '/api/expenses?per_page=2',
+    '/api/expenses/search?q=Food',
+    '/api/analytics/summary',
+    '/api/analytics/monthly',
+    '/api/analytics/category?month=2024-06',
+    '/api/budgets',
+    '/api/dashboard',
+    '/api/notifications',
+    '/api/notifications/unread_count',
+])
+def test_async_views_match_their_wsgi_twins(client, spending, uncached, call_asgi, path):
+    wsgi = client.get(path)
+
+    status, body = call_asgi(client, 'GET', path)
+
+    assert wsgi.status_code == 200
+    assert status == 200
+    assert json.loads(body) == wsgi.get_json()
+
+def test_async_views_require_a_session(app, call_asgi):
+    status, body = call_asgi(app.test_client(), 'GET', '/api/cards')
+
+    assert status == 401
+    assert json.loads(body) == {'error': 'Unauthorized'}
+
+def test_async_login_matches_wsgi_login(app, client, uncached, call_asgi):
+    credentials = json.dumps({'email': client.email, 'password': 'correct horse'}).encode()
+    wrong = json.dumps({'email': client.email, 'password': 'not-it'}).encode()
+    anonymous = app.test_client()
+
+    wsgi = anonymous.post('/api/login', data=credentials, content_type='application/json')
+    status, body = call_asgi(anonymous, 'POST', '/api/login', credentials)
+    assert (status, json.loads(body)) == (wsgi.status_code, wsgi.get_json())
+
+    wsgi = anonymous.post('/api/login', data=wrong, content_type='application/json')
+    status, body = call_asgi(anonymous, 'POST', '/api/login', wrong)
+    assert (status, json.loads(body)) == (wsgi.status_code, wsgi.get_json())
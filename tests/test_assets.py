@@ -0,0 +1,89 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import assets
+from assets import BUNDLES, build, clean, minify_css, minify_js
+
+@pytest.fixture
+def built(app, tmp_path, monkeypatch):
+    out_dir = str(tmp_path / 'dist')
+    monkeypatch.setitem(app.config, 'ASSETS_DIR', out_dir)
+    result = app.test_cli_runner().invoke(args=['assets', 'build'])
+    assert result.exit_code == 0, result.output
+    with open(os.path.join(out_dir, 'manifest.json')) as f:
+        return out_dir, json.load(f)
+
+def test_build_fingerprints_every_bundle(app, built):
+    out_dir, manifest = built
+
+    assert set(manifest) == set(BUNDLES)
+    for name, filename in manifest.items():
+        stem, extension = os.path.splitext(name)
+        assert filename.startswith(stem + '.') and filename.endswith(extension)
+        with open(os.path.join(out_dir, filename), 'rb') as f, open(os.path.join(out_dir, filename + '.gz'), 'rb') as gz:
+            assert gzip.decompress(gz.read()) == f.read()
+
+    # Same sources, same names: rebuilding does not bust browser caches
+    assert {name: filename for name, (filename, _) in build(app.static_folder, out_dir).items()} == manifest
+
+def test_clean_keeps_only_the_current_build(built):
+    out_dir, manifest = built
+    stale = os.path.join(out_dir, 'main.000000000000.js')
+    for path in (stale, stale + '.gz'):
+        with open(path, 'w') as f:
+            f.write('old')
+
+    assert clean(out_dir, set(manifest.values())) == 2
+    assert not os.path.exists(stale)
+    assert os.path.exists(os.path.join(out_dir, manifest['main.js']))
+
+def test_built_files_are_served_precompressed_and_immutable(app, built):
+    _, manifest = built
+    client = app.test_client()
+    url = f"/assets/{manifest['dashboard.js']}"
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    identity = client.get(url)
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == identity.get_data()
+    assert 'Content-Encoding' not in identity.headers
+    assert compressed.mimetype == identity.mimetype == 'text/javascript'
+    for response in (compressed, identity):
+        assert response.cache_control.immutable and response.cache_control.public
+        assert response.cache_control.max_age == app.config['ASSETS_MAX_AGE']
+        assert 'Accept-Encoding' in response.vary
+
+def test_unknown_and_escaping_paths_are_not_served(app, built):
+    client = app.test_client()
+
+    assert client.get('/assets/missing.js').status_code == 404
+    assert client.get('/assets/../../app.py').status_code == 404
+
+def test_pages_link_the_build_or_the_sources(app, built, monkeypatch):
+    _, manifest = built
+    client = app.test_client()
+
+    page = client.get('/login').get_data(as_text=True)
+    assert f"/assets/{manifest['auth.js']}" in page
+    assert '/static/js/main.js' not in page
+
+    monkeypatch.setitem(app.config, 'ASSETS_DEBUG', True)
+    page = client.get('/login').get_data(as_text=True)
+    assert '/static/js/main.js?v=' in page and '/static/js/auth.js?v=' in page
+
+def test_pages_revalidate_with_their_etag(app):
+    client = app.test_client()
+    etag = client.get('/login').headers['ETag']
+
+    assert client.get('/login', headers={'If-None-Match': etag}).status_code == 304
+
+def test_fallback_minifiers_keep_the_code(monkeypatch):
+    monkeypatch.setattr(assets, 'rjsmin', None)
+    monkeypatch.setattr(assets, 'rcssmin', None)
+
+    assert minify_js('// comment\n  const a = 1;\n\n  a;\n') == 'const a = 1;\na;'
+    assert minify_css('/* c */ a:hover , b > i { color : red ; }') == 'a:hover,b>i{color : red}'
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from benchmark import BENCH_EMAIL_DOMAIN, compare, parse_mix, percentile
+
+def report(p95):
+    return {'results': {'operations': {name: {'p95_ms': value} for name, value in p95.items()}}}
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+def test_parse_mix_rejects_unknown_workloads():
+    assert parse_mix('dashboard=3,login') == {'dashboard': 3.0, 'login': 1.0}
+    with pytest.raises(ValueError):
+        parse_mix('dashboard=3,nope=1')
+
+def test_compare_flags_slowdowns_beyond_tolerance():
+    rows = compare(report({'dashboard': 10.0, 'login': 10.0}), report({'dashboard': 10.5, 'login': 12.0, 'new': 1.0}))
+
+    assert rows == [('dashboard', 10.0, 10.5, 5.0, False), ('login', 10.0, 12.0, 20.0, True), ('new', None, 1.0, None, False)]
+
+def test_seed_run_and_compare_offline(app, database, tmp_path):
+    runner = app.test_cli_runner()
+
+    seeded = runner.invoke(args=['bench', 'seed', '--users', '2', '--expenses', '30', '--cards', '1'])
+    assert seeded.exit_code == 0, seeded.output
+    assert 'Seeded 2 users, 2 cards and 60 expenses' in seeded.output
+    # The generator maintains the rollups exactly like the write routes
+    verified = runner.invoke(args=['rollups', 'verify'])
+    assert verified.exit_code == 0, verified.output
+
+    output = tmp_path / 'run.json'
+    ran = runner.invoke(args=['bench', 'run', '--requests', '20', '--concurrency', '2', '--output', str(output)])
+    assert ran.exit_code == 0, ran.output
+    results = json.loads(output.read_text())['results']
+    assert results['total']['count'] + results['total']['errors'] == 20
+    assert results['total']['errors'] == 0
+    assert {'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'} <= set(results['total'])
+
+    baseline = tmp_path / 'baseline.json'
+    faster = json.loads(output.read_text())
+    for stats in faster['results']['operations'].values():
+        stats['p95_ms'] = stats['p95_ms'] and stats['p95_ms'] / 10
+    baseline.write_text(json.dumps(faster))
+    compared = runner.invoke(args=['bench', 'compare', str(baseline), str(output)])
+    assert compared.exit_code == 1
+    assert 'REGRESSION' in compared.output
+
+    with database.cursor() as cur:
+        cur.execute("SELECT COUNT(*) AS n FROM users WHERE email LIKE %s", (f'%@{BENCH_EMAIL_DOMAIN}',))
+        assert cur.fetchone()['n'] >= 2
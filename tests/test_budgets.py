@@ -0,0 +1,20 @@
+from decimal import Decimal
+
+import pytest
+
+def test_budget_is_stored_exactly(client, database):
+    response = client.put('/api/budgets', json={'category': 'Food', 'monthly_limit': '150.10'})
+
+    assert response.status_code == 200
+    with database.cursor() as cur:
+        cur.execute("SELECT monthly_limit FROM category_budgets WHERE user_id = %s", (client.user_id,))
+        assert Decimal(str(cur.fetchone()['monthly_limit'])) == Decimal('150.10')
+
+    assert client.get('/api/budgets').get_json()[0]['monthly_limit'] == 150.1
+
+@pytest.mark.parametrize('monthly_limit', ['abc', None, 0, -5, 'NaN', 'Infinity', [10], True])
+def test_bad_monthly_limit_is_a_400(client, monthly_limit):
+    response = client.put('/api/budgets', json={'category': 'Food', 'monthly_limit': monthly_limit})
+
+    assert response.status_code == 400
+    assert client.get('/api/budgets').get_json() == []
@@ -0,0 +1,53 @@
+def test_unchanged_resource_revalidates_to_304(client, card_id):
+    first = client.get('/api/cards')
+    etag = first.headers['ETag']
+
+    second = client.get('/api/cards', headers={'If-None-Match': etag})
+
+    assert second.status_code == 304
+    assert second.get_data() == b''
+
+def test_write_invalidates_cached_response(client, card_id):
+    etag = client.get('/api/cards').headers['ETag']
+
+    client.post('/api/cards', json={
+        'card_number': '5500 0000 0000 0004', 'card_type': 'mastercard', 'card_holder': 'Test User',
+        'expiry_date': '01/31', 'balance': 0
+    })
+    response = client.get('/api/cards', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 2
+
+def test_expense_write_invalidates_analytics(client):
+    etag = client.get('/api/analytics/category?month=2024-06').headers['ETag']
+
+    client.post('/api/expenses', json={'amount': 5, 'category': 'Food', 'expense_date': '2024-06-03'})
+    response = client.get('/api/analytics/category?month=2024-06', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert [row['category'] for row in response.get_json()] == ['Food']
+
+def test_repeat_read_is_served_from_the_cache(client, card_id, database):
+    first = client.get('/api/cards')
+    # A change behind the app's back (no invalidation) stays invisible until the next write
+    with database.transaction() as cur:
+        cur.execute("UPDATE cards SET card_holder = 'Someone Else' WHERE id = %s", (card_id,))
+
+    second = client.get('/api/cards')
+
+    assert second.get_json() == first.get_json()
+    assert second.headers['ETag'] == first.headers['ETag']
+
+def test_invalidation_is_per_user(app, client, card_id):
+    etag = client.get('/api/cards').headers['ETag']
+    other = app.test_client()
+    other.post('/api/register', json={'username': 'cache-other', 'email': 'cache-other@example.com', 'password': 'pw'})
+    other.post('/api/cards', json={
+        'card_number': '4000 0000 0000 0002', 'card_type': 'visa', 'card_holder': 'Other',
+        'expiry_date': '01/31', 'balance': 0
+    })
+
+    assert client.get('/api/cards', headers={'If-None-Match': etag}).status_code == 304
+    assert len(other.get('/api/cards').get_json()) == 1
@@ -0,0 +1,75 @@
+from cryptography.fernet import Fernet
+import pytest
+
+import app as app_module
+from card_crypto import CardCipher, key_id
+
+def clear_masks(database, card_id):
+    # What a card added before migration 0004 looks like
+    with database.transaction() as cur:
+        cur.execute("UPDATE cards SET card_last_four = NULL, card_number_masked = NULL WHERE id = %s", (card_id,))
+
+def masks(database, card_id):
+    with database.cursor() as cur:
+        cur.execute("SELECT card_last_four, card_number_masked FROM cards WHERE id = %s", (card_id,))
+        return tuple(cur.fetchone().values())
+
+def test_backfill_command_fills_missing_masks(app, client, card_id, database):
+    clear_masks(database, card_id)
+
+    result = app.test_cli_runner().invoke(args=['cards', 'backfill'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Backfilled masked numbers for 1 cards.' in result.output
+    assert masks(database, card_id) == ('1234', '**** **** **** 1234')
+
+def test_db_upgrade_backfills_masks(app, client, card_id, database):
+    clear_masks(database, card_id)
+
+    result = app.test_cli_runner().invoke(args=['db', 'upgrade'])
+
+    assert result.exit_code == 0, result.output
+    assert masks(database, card_id) == ('1234', '**** **** **** 1234')
+    assert client.get('/api/cards').get_json()[0]['card_number'].endswith('1234')
+
+@pytest.fixture
+def rotated_keys(monkeypatch):
+    # Prepend a new key, as an operator would; afterwards rotate everything back
+    old_keys = app_module.cipher_suite.keys
+    new_key = Fernet.generate_key()
+    monkeypatch.setattr(app_module, 'cipher_suite', CardCipher([new_key, *old_keys]))
+    yield new_key
+    monkeypatch.setattr(app_module, 'cipher_suite', CardCipher([*old_keys, new_key]))
+    app_module.app.test_cli_runner().invoke(args=['cards', 'rotate', '--pause', '0'])
+
+def stored(database, card_id):
+    with database.cursor() as cur:
+        cur.execute("SELECT card_number_encrypted, card_key_id FROM cards WHERE id = %s", (card_id,))
+        return cur.fetchone()
+
+def test_listing_cards_never_decrypts(client, card_id):
+    response = client.get('/api/cards')
+
+    assert response.get_json()[0]['card_number'] == '**** **** **** 1234'
+    assert 'fernet' not in response.headers['Server-Timing']
+
+def test_rotation_reencrypts_under_the_new_key(app, client, card_id, database, rotated_keys):
+    before = stored(database, card_id)
+    runner = app.test_cli_runner()
+    assert 'old key, rotate pending' in runner.invoke(args=['cards', 'status']).output
+
+    result = runner.invoke(args=['cards', 'rotate', '--pause', '0'])
+
+    assert result.exit_code == 0, result.output
+    after = stored(database, card_id)
+    assert after['card_key_id'] == key_id(rotated_keys) != before['card_key_id']
+    assert Fernet(rotated_keys).decrypt(after['card_number_encrypted'].encode()) == b'4111111111111234'
+    assert 'rotate pending' not in runner.invoke(args=['cards', 'status']).output
+    # Nothing left on the old key, so a second pass is a no-op
+    assert runner.invoke(args=['cards', 'rotate', '--pause', '0']).output.startswith('Done: 0 cards')
+    assert stored(database, card_id) == after
+
+def test_cards_on_the_old_key_still_decrypt_mid_rotation(card_id, database, rotated_keys):
+    token = stored(database, card_id)['card_number_encrypted']
+
+    assert app_module.cipher_suite.decrypt(token) == '4111111111111234'
@@ -0,0 +1,41 @@
+import gzip
+
+import pytest
+
+@pytest.fixture
+def min_size(app, monkeypatch):
+    # /api/cards for one card is well under the default 1 KiB threshold
+    monkeypatch.setitem(app.config, 'COMPRESS_MIN_SIZE', 64)
+
+def test_gzip_is_negotiated_from_accept_encoding(client, card_id, min_size):
+    identity = client.get('/api/cards')
+    response = client.get('/api/cards', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()) == identity.get_data()
+    assert 'Content-Encoding' not in identity.headers
+
+def test_etag_is_weakened_and_still_revalidates(client, card_id, min_size):
+    response = client.get('/api/cards', headers={'Accept-Encoding': 'gzip'})
+    etag = response.headers['ETag']
+
+    assert etag.startswith('W/')
+    revalidated = client.get('/api/cards', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert 'Content-Encoding' not in revalidated.headers
+
+def test_compressed_body_is_reused_for_the_same_etag(app, client, card_id, min_size):
+    compression = app.extensions['compression']
+    first = client.get('/api/cards', headers={'Accept-Encoding': 'gzip'})
+    etag = first.headers['ETag'].removeprefix('W/').strip('"')
+
+    assert (etag, 'gzip') in compression._compressed
+    second = client.get('/api/cards', headers={'Accept-Encoding': 'gzip'})
+    assert second.get_data() == first.get_data()
+
+def test_small_responses_are_sent_uncompressed(client):
+    response = client.get('/api/cards', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.get_json() == []
+    assert 'Content-Encoding' not in response.headers
@@ -0,0 +1,23 @@
+from datetime import date
+
+def test_dashboard_matches_the_individual_endpoints(client):
+    client.put('/api/user/profile', json={'username': f'user-dash-{client.user_id}', 'email': f'dash{client.user_id}@example.com', 'monthly_salary': 1000})
+    month = date.today().strftime('%Y-%m')
+    for n in range(7):
+        client.post('/api/expenses', json={'amount': 10 + n, 'category': 'Food' if n % 2 else 'Rent', 'expense_date': f'{month}-0{n + 1}'})
+
+    dashboard = client.get('/api/dashboard').get_json()
+
+    assert dashboard['summary'] == client.get('/api/analytics/summary').get_json()
+    assert dashboard['category'] == client.get('/api/analytics/category').get_json()
+    assert [(row['month'], row['total']) for row in dashboard['monthly']] == [
+        (row['month'], row['total']) for row in client.get('/api/analytics/monthly').get_json()
+    ]
+    assert dashboard['recent_expenses'] == client.get('/api/expenses?limit=5').get_json()
+    assert dashboard['notifications'] == client.get('/api/notifications').get_json()
+    assert dashboard['unread_count'] == client.get('/api/notifications/unread_count').get_json()['unread_count']
+
+def test_dashboard_is_four_queries(client):
+    response = client.get('/api/dashboard')
+
+    assert response.headers['Server-Timing'].startswith('db;desc="4 queries"')
@@ -0,0 +1,29 @@
+import pytest
+
+def test_hot_queries_use_indexes(app, database):
+    result = app.test_cli_runner().invoke(args=['db', 'explain'])
+
+    assert result.exit_code == 0, result.output
+    assert 'FAIL' not in result.output
+
+def test_end_date_includes_the_whole_day(client):
+    for day in ('2024-02-28', '2024-02-29', '2024-03-01'):
+        client.post('/api/expenses', json={'amount': 1, 'category': 'Food', 'expense_date': day})
+
+    rows = client.get('/api/expenses?start_date=2024-02-29&end_date=2024-02-29').get_json()
+    # A timestamp on the end day is inside the range too
+    wide = client.get('/api/expenses?start_date=2024-02-28&end_date=2024-02-29T23:59:59').get_json()
+
+    assert [row['expense_date'][:10] for row in rows] == ['2024-02-29']
+    assert sorted(row['expense_date'][:10] for row in wide) == ['2024-02-28', '2024-02-29']
+
+@pytest.mark.parametrize('url', [
+    '/api/expenses?start_date=yesterday',
+    '/api/expenses/search?q=x&end_date=2024-02-30',
+    '/api/expenses/export?end_date=31/01/2024',
+])
+def test_malformed_dates_are_a_400(client, url):
+    response = client.get(url)
+
+    assert response.status_code == 400
+    assert 'must be a date' in response.get_json()['error']
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from db import ConnectionPool, PoolTimeout, SQLiteDriver
+
+@pytest.fixture
+def pool(tmp_path):
+    return ConnectionPool(SQLiteDriver({'SQLITE_PATH': str(tmp_path / 'pool.db')}), max_size=2, timeout=0.1)
+
+def test_pool_is_bounded_and_times_out(pool):
+    first, second = pool.acquire(), pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+
+    pool.release(first)
+    assert pool.acquire() is first
+    pool.release(second)
+
+def test_waiter_gets_a_released_connection(pool):
+    pool.timeout = 2
+    held = [pool.acquire(), pool.acquire()]
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+
+    pool.release(held[0])
+    waiter.join(2)
+
+    assert got == [held[0]]
+    assert pool.stats()['connects'] == 2
+
+def test_release_rolls_back_uncommitted_work(pool):
+    pooled = pool.acquire()
+    pooled.conn.execute("CREATE TABLE t (x INTEGER)")
+    pooled.conn.commit()
+    pooled.conn.execute("INSERT INTO t VALUES (1)")
+
+    pool.release(pooled)
+
+    assert pool.acquire().conn.execute("SELECT COUNT(*) AS n FROM t").fetchone()['n'] == 0
+
+def test_stale_and_broken_connections_are_replaced(pool):
+    pooled = pool.acquire()
+    pool.release(pooled)
+    # Idle past ping_interval on a closed connection: the ping fails and a new one is opened
+    pooled.conn.close()
+    pooled.last_used -= pool.ping_interval + 1
+
+    fresh = pool.acquire()
+    assert fresh is not pooled
+    assert pool.stats()['failed_pings'] == 1
+    pool.release(fresh)
+
+    # Past recycle it is replaced without a ping
+    fresh.created_at -= pool.recycle + 1
+    assert pool.acquire() is not fresh
+    assert pool.stats()['discarded'] == 2
+
+def test_transaction_commits_or_rolls_back(app, database):
+    with database.transaction() as cur:
+        cur.execute("INSERT INTO users (username, email, password_hash) VALUES ('tx-kept', 'tx-kept@example.com', 'x')")
+    with pytest.raises(RuntimeError):
+        with database.transaction() as cur:
+            cur.execute("INSERT INTO users (username, email, password_hash) VALUES ('tx-lost', 'tx-lost@example.com', 'x')")
+            raise RuntimeError('boom')
+
+    with database.cursor() as cur:
+        cur.execute("SELECT username FROM users WHERE username LIKE 'tx-%%'")
+        assert [row['username'] for row in cur.fetchall()] == ['tx-kept']
@@ -0,0 +1,48 @@
+import time
+
+from events import InProcessBroker, SQLiteBroker, format_event
+
+def drain(subscription):
+    events = []
+    while (event := subscription.poll()) is not None:
+        events.append(event)
+    return events
+
+def test_sqlite_replay_works_across_processes(tmp_path):
+    # Two brokers on one file stand in for two gunicorn workers
+    path = str(tmp_path / 'events.db')
+    first, second = SQLiteBroker(path), SQLiteBroker(path)
+    for n in range(3):
+        first.publish(7, 'expense', {'n': n})
+    first.publish(8, 'expense', {'n': 'other user'})
+    second._last_id = 4
+
+    replayed = drain(second.subscribe(7, last_event_id=1))
+
+    assert [(event[0], event[3]) for event in replayed] == [(2, {'n': 1}), (3, {'n': 2})]
+
+def test_sqlite_prunes_on_an_interval_using_the_index(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / 'events.db'), retention=0, prune_interval=3600)
+    conn = broker._connection()
+    plan = conn.execute("EXPLAIN QUERY PLAN DELETE FROM events WHERE created_at < 0").fetchall()
+    assert 'events_created_at' in str(plan)
+
+    broker.publish(1, 'a', {})
+    time.sleep(0.01)
+    broker.publish(1, 'b', {})
+    # Within prune_interval nothing is deleted, however old
+    assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 2
+
+    broker._next_prune = 0
+    broker.publish(1, 'c', {})
+    assert [row[0] for row in conn.execute("SELECT name FROM events")] == ['c']
+
+def test_memory_broker_delivers_only_to_the_user():
+    broker = InProcessBroker()
+    mine, theirs = broker.subscribe(1), broker.subscribe(2)
+
+    broker.publish(1, 'notification', {'id': 5})
+
+    assert [event[2] for event in drain(mine)] == ['notification']
+    assert drain(theirs) == []
+    assert format_event((3, 1, 'x', {'a': 1})) == 'id: 3\nevent: x\ndata: {"a":1}\n\n'
@@ -0,0 +1,41 @@
+from decimal import Decimal
+import csv
+import io
+import json
+
+import pytest
+
+from exporters import EXPORT_COLUMNS, parquet_available, stream_columns
+
+@pytest.fixture
+def expenses(client):
+    for n, (day, amount) in enumerate([('2024-11-01', '10.10'), ('2024-11-15', '20.20'), ('2024-12-01', '30.30')]):
+        client.post('/api/expenses', json={'description': f'e{n}', 'amount': amount, 'category': 'Food', 'expense_date': day})
+
+def test_csv_export_streams_the_filtered_rows(client, expenses):
+    response = client.get('/api/expenses/export?format=csv&start_date=2024-11-01&end_date=2024-11-30')
+
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'].startswith('attachment; filename="expenses-')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(row['expense_date'], Decimal(row['amount'])) for row in rows] == [
+        ('2024-11-15', Decimal('20.20')), ('2024-11-01', Decimal('10.10'))
+    ]
+
+def test_columnar_export_writes_one_group_per_block():
+    rows = ({'id': n, 'amount': n} for n in range(5))
+
+    lines = [json.loads(line) for line in stream_columns(rows, block_size=2)]
+
+    assert lines[0] == {'columns': EXPORT_COLUMNS}
+    assert [group['id'] for group in lines[1:]] == [[0, 1], [2, 3], [4]]
+
+def test_columnar_export_endpoint(client, expenses):
+    lines = client.get('/api/expenses/export?format=columns').get_data(as_text=True).splitlines()
+
+    # Money is exported as exact decimal strings
+    assert sorted(map(Decimal, json.loads(lines[1])['amount'])) == [Decimal('10.10'), Decimal('20.20'), Decimal('30.30')]
+
+def test_unknown_or_unavailable_formats(client):
+    assert client.get('/api/expenses/export?format=xlsx').status_code == 400
+    assert client.get('/api/expenses/export?format=parquet').status_code == (200 if parquet_available() else 501)
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from forecast import ExpenseSeries, category_trends, epoch_day, find_outliers, project_month
+
+def series_of(rows):
+    # rows: (day, category, amount)
+    return ExpenseSeries(
+        range(1, len(rows) + 1), [epoch_day(day) for day, _, _ in rows],
+        [category for _, category, _ in rows], [amount for _, _, amount in rows],
+        [f'{category} {day}' for day, category, _ in rows]
+    )
+
+def daily(start, days, category='Food', amount=10.0):
+    return [(start + timedelta(days=n), category, amount) for n in range(days)]
+
+def test_steady_spending_projects_a_tight_month_total():
+    today = date(2024, 6, 10)
+    series = series_of(daily(date(2024, 3, 3), 90) + daily(date(2024, 6, 1), 10))
+
+    projection = project_month(series, today, 250, baseline_days=90)
+
+    assert projection['spent_to_date'] == 100
+    assert projection['projected_total'] == 300
+    assert projection['projected_low'] == projection['projected_high'] == 300
+    assert projection['status'] == 'over'
+    assert project_month(series, today, 400, baseline_days=90)['status'] == 'ok'
+    assert project_month(series, today, None, baseline_days=90)['status'] is None
+
+def test_new_user_projects_from_the_run_rate_alone():
+    projection = project_month(series_of(daily(date(2024, 6, 1), 15, amount=4)), date(2024, 6, 15), 1000, baseline_days=90)
+
+    assert projection['daily_rate'] == 4
+    assert projection['projected_total'] == 120
+
+def test_trends_fit_a_slope_per_category():
+    today = date(2024, 7, 5)
+    rows = [(date(2024, month, 15), 'Travel', 10.0 * month) for month in range(1, 7)]
+    rows += [(date(2024, month, 15), 'Rent', 500.0) for month in range(1, 7)]
+    rows += [(date(2024, 7, 2), 'Gifts', 25.0)]
+
+    trends = {trend['category']: trend for trend in category_trends(series_of(rows), today, months=6)}
+
+    assert trends['Travel']['slope'] == 10
+    assert trends['Travel']['direction'] == 'up'
+    assert trends['Travel']['next_month_estimate'] == 70
+    assert [m['month'] for m in trends['Travel']['monthly']] == [f'2024-0{m}' for m in range(1, 7)]
+    assert trends['Rent']['direction'] == 'flat'
+    assert trends['Gifts']['direction'] == 'new'
+    assert trends['Gifts']['month_to_date'] == 25
+
+def test_outliers_are_scored_against_the_category_history():
+    today = date(2024, 6, 30)
+    history = [(date(2024, 5, 1) + timedelta(days=n), 'Food', 10.0 + n % 3) for n in range(20)]
+    rows = history + [(date(2024, 6, 20), 'Food', 95.0), (date(2024, 6, 21), 'Food', 11.0)]
+
+    outliers = find_outliers(series_of(rows), today, recent_days=30, window_days=180, threshold=3.5, min_history=8, limit=20)
+
+    assert [(o['expense_date'], o['amount']) for o in outliers] == [('2024-06-20', 95.0)]
+    assert outliers[0]['typical_amount'] == 11
+
+def test_outliers_need_enough_history():
+    rows = [(date(2024, 6, 1), 'Food', 10.0), (date(2024, 6, 20), 'Food', 95.0)]
+
+    assert find_outliers(series_of(rows), date(2024, 6, 30), 30, 180, 3.5, 8, 20) == []
+
+def test_endpoint_forecasts_this_month_and_follows_writes(client):
+    today = date.today().isoformat()
+    client.post('/api/expenses', json={'amount': 30, 'category': 'Food', 'expense_date': today})
+
+    forecast = client.get('/api/analytics/forecast').get_json()
+    assert forecast['as_of'] == today
+    assert forecast['projection']['spent_to_date'] == 30
+    assert [trend['category'] for trend in forecast['trends']] == ['Food']
+
+    client.post('/api/expenses', json={'amount': 12, 'category': 'Food', 'expense_date': today})
+    assert client.get('/api/analytics/forecast').get_json()['projection']['spent_to_date'] == 42
+
+def test_batch_pass_matches_the_per_user_forecast(app, client):
+    client.post('/api/expenses', json={'amount': 18, 'category': 'Travel', 'expense_date': date.today().isoformat()})
+    engine = app.extensions['forecast']
+
+    with app.app_context():
+        batch = dict(engine.iter_all(batch_size=2))
+        single = engine.for_user(client.user_id, batch[client.user_id]['projection']['monthly_salary'])
+
+    assert batch[client.user_id] == single
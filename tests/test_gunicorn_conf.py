@@ -0,0 +1,33 @@
+import os
+import runpy
+
+import pytest
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+@pytest.fixture
+def environ(monkeypatch):
+    for setting in ('WEB_CONCURRENCY', 'CACHE_BACKEND', 'EVENTS_BROKER'):
+        monkeypatch.delenv(setting, raising=False)
+    return monkeypatch
+
+def test_multiple_workers_default_to_shared_backends(environ):
+    environ.setenv('WEB_CONCURRENCY', '4')
+
+    assert runpy.run_path(CONF)['workers'] == 4
+    assert (os.environ['CACHE_BACKEND'], os.environ['EVENTS_BROKER']) == ('sqlite', 'sqlite')
+
+def test_multiple_workers_refuse_memory_backends(environ):
+    environ.setenv('WEB_CONCURRENCY', '4')
+    environ.setenv('EVENTS_BROKER', 'memory')
+
+    with pytest.raises(RuntimeError, match='EVENTS_BROKER=memory'):
+        runpy.run_path(CONF)
+
+def test_single_worker_keeps_memory_backends(environ):
+    environ.setenv('WEB_CONCURRENCY', '1')
+    environ.setenv('CACHE_BACKEND', 'memory')
+
+    runpy.run_path(CONF)
+
+    assert 'EVENTS_BROKER' not in os.environ
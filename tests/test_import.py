@@ -0,0 +1,63 @@
+import io
+import json
+
+def upload(client, content, filename):
+    return client.post('/api/expenses/import', data={'file': (io.BytesIO(content), filename)})
+
+def test_csv_bad_row_is_reported_and_the_rest_imported(client, database):
+    content = (
+        b'description,amount,category,date\n'
+        b'Groceries,42.10,Food,2024-07-01\n'
+        b'Refund,-5,Food,2024-07-02\n'
+        b'Bus,2.50,Travel,2024-07-03\n'
+    )
+
+    response = upload(client, content, 'statement.csv')
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert (body['rows_read'], body['imported'], body['rejected']) == (3, 2, 1)
+    assert [error['row'] for error in body['errors']] == [2]
+
+    with database.cursor() as cur:
+        cur.execute("SELECT SUM(expense_count) AS n FROM expense_rollups WHERE user_id = %s", (client.user_id,))
+        assert cur.fetchone()['n'] == 2
+
+def test_ofx_credit_is_rejected(client):
+    content = b"""<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240705<TRNAMT>-19.99<NAME>Cinema<CATEGORY>Fun</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240706<TRNAMT>250.00<NAME>Salary<CATEGORY>Income</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+    body = upload(client, content, 'statement.ofx').get_json()
+
+    assert (body['imported'], body['rejected']) == (1, 1)
+    assert 'Credit transaction' in body['errors'][0]['error']
+
+def test_unknown_format_is_a_400(client):
+    assert upload(client, b'{}', 'statement.txt').status_code == 400
+
+def test_raw_ndjson_body_in_small_batches(app, client, card_id, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMPORT_BATCH_SIZE', 2)
+    lines = [
+        {'description': f'Item {n}', 'amount': '1.00', 'category': 'Food', 'date': '2024-09-0%d' % (n + 1), 'card_id': card_id}
+        for n in range(5)
+    ] + [{'amount': 3, 'category': 'Food', 'date': '2024-09-09', 'card_id': 999999}]
+
+    response = client.post(
+        '/api/expenses/import?format=json', data='\n'.join(json.dumps(line) for line in lines),
+        content_type='application/x-ndjson'
+    )
+
+    body = response.get_json()
+    assert (body['imported'], body['rejected']) == (5, 1)
+    assert body['errors'] == [{'row': 6, 'error': 'Unknown card_id: 999999'}]
+    assert client.get('/api/analytics/category?month=2024-09').get_json() == [{'category': 'Food', 'total': 5}]
+
+def test_malformed_json_rolls_back_the_whole_import(client):
+    response = client.post('/api/expenses/import?format=json', data='[{"amount": 1, "category": "Food", "date": "2024-10-01"}, {"amount": ',
+                           content_type='application/json')
+
+    assert response.status_code == 400
+    assert client.get('/api/expenses?start_date=2024-10-01&end_date=2024-10-31').get_json() == []
@@ -0,0 +1,55 @@
+import logging
+import re
+
+import pytest
+
+@pytest.fixture
+def token(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'INTERNAL_TOKEN', 'internal-secret')
+    return {'Authorization': 'Bearer internal-secret'}
+
+def test_internal_routes_are_hidden_without_the_token(app, monkeypatch):
+    client = app.test_client()
+    monkeypatch.setitem(app.config, 'INTERNAL_TOKEN', '')
+    assert client.get('/metrics').status_code == 404
+
+    monkeypatch.setitem(app.config, 'INTERNAL_TOKEN', 'internal-secret')
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 404
+    assert client.get('/internal/db/pool').status_code == 404
+
+def test_metrics_count_requests_by_route(client, token):
+    client.get('/api/cards')
+
+    response = client.get('/metrics', headers=token)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert re.search(r'^http_requests_total\{route="/api/cards",method="GET",status="200"\} \d+$', body, re.M)
+    assert 'db_pool_' in body
+
+def test_pool_stats_are_served_to_the_token_holder(client, token):
+    response = client.get('/internal/db/pool', headers=token)
+
+    assert response.status_code == 200
+    stats = response.get_json()
+    assert stats['engine'] == 'sqlite'
+    assert stats['in_use'] >= 0 and stats['max_size'] >= 1
+
+def test_server_timing_reports_the_queries_a_request_ran(client):
+    header = client.get('/api/cards').headers['Server-Timing']
+
+    queries = int(re.search(r'db;desc="(\d+) queries"', header).group(1))
+    assert queries >= 1
+    assert re.search(r'total;dur=[\d.]+$', header)
+
+def test_slow_requests_are_logged_with_their_sql(app, client, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, 'SLOW_REQUEST_MS', 0)
+
+    with caplog.at_level(logging.WARNING, logger='finance_tracker.slow_requests'):
+        client.get('/api/cards')
+
+    [record] = [r for r in caplog.records if r.name == 'finance_tracker.slow_requests']
+    assert 'GET /api/cards (/api/cards)' in record.getMessage()
+    assert 'SELECT' in record.getMessage()
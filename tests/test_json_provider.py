@@ -0,0 +1,37 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import json_provider
+
+def test_jsonify_responses_use_orjson(client, monkeypatch):
+    if json_provider.orjson is None:
+        pytest.skip('orjson is not installed')
+    calls = []
+    real_dumps = json_provider.orjson.dumps
+    monkeypatch.setattr(json_provider.orjson, 'dumps', lambda *args, **kwargs: calls.append(args[0]) or real_dumps(*args, **kwargs))
+
+    response = client.get('/api/user/profile')
+
+    assert response.status_code == 200
+    assert calls, 'jsonify() fell back to the stdlib encoder'
+
+def test_unsupported_arguments_fall_back_to_stdlib(app, monkeypatch):
+    monkeypatch.setattr(json_provider, 'orjson', None)
+
+    assert app.json.dumps({'a': 1}, separators=(', ', ': ')) == '{"a": 1}'
+
+@pytest.mark.parametrize('encoding, expected', [('number', '12.5'), ('string', '"12.50"'), ('minor', '1250')])
+def test_money_encodings(app, encoding, expected):
+    with app.test_request_context(f'/?money={encoding}'):
+        body = app.json.dumps({'amount': Decimal('12.5'), 'day': date(2024, 1, 2)}, separators=(',', ':'))
+
+    assert body == '{"amount":%s,"day":"2024-01-02"}' % expected
+
+def test_debug_indent_keeps_orjson(app):
+    if json_provider.orjson is None:
+        pytest.skip('orjson is not installed')
+
+    assert json_provider.orjson_option({'indent': 2}) & json_provider.orjson.OPT_INDENT_2
+    assert json_provider.orjson_option({'indent': 4}) is None
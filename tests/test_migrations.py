@@ -0,0 +1,24 @@
+from db import SQLiteDriver
+from storage import STORAGES
+
+def connect(tmp_path):
+    storage = STORAGES['sqlite']()
+    conn = SQLiteDriver({'SQLITE_PATH': str(tmp_path / 'empty.db')}).connect()
+    storage.configure(conn)
+    return storage, conn
+
+def test_migrate_empty_database_applies_every_migration(tmp_path):
+    storage, conn = connect(tmp_path)
+    expected = [(version, name) for version, name, _ in storage.migration_files()]
+
+    assert storage.migrate(conn) == expected
+    assert storage.applied_migrations(conn) == {version for version, _ in expected}
+
+    tables = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()}
+    assert {'users', 'cards', 'expenses', 'expense_rollups', 'recurring_expenses', 'report_jobs'} <= tables
+
+def test_migrate_is_idempotent(tmp_path):
+    storage, conn = connect(tmp_path)
+    storage.migrate(conn)
+
+    assert storage.migrate(conn) == []
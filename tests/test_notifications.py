@@ -0,0 +1,44 @@
+import pytest
+
+@pytest.fixture
+def notify(database):
+    def notify(user_id, count):
+        with database.transaction() as cur:
+            return [database.storage.add_notification(cur, user_id, f'note {n}', 'info') for n in range(count)]
+    return notify
+
+def unread(client):
+    return client.get('/api/notifications/unread_count').get_json()['unread_count']
+
+def test_counter_tracks_new_and_read_notifications(client, notify):
+    ids = notify(client.user_id, 4)
+    assert unread(client) == 4
+
+    assert client.put(f'/api/notifications/{ids[0]}/read').status_code == 200
+    assert unread(client) == 3
+    # Marking it again does not count twice
+    client.put(f'/api/notifications/{ids[0]}/read')
+    assert unread(client) == 3
+
+    assert client.put('/api/notifications/read', json={'up_to': ids[2]}).get_json() == {'marked': 2, 'unread_count': 1}
+    assert client.put('/api/notifications/read').get_json() == {'marked': 1, 'unread_count': 0}
+
+def test_since_returns_only_newer_notifications(client, notify):
+    first = notify(client.user_id, 2)
+    later = notify(client.user_id, 2)
+
+    newer = client.get(f'/api/notifications?since={first[-1]}').get_json()
+
+    assert sorted(row['id'] for row in newer) == later
+
+def test_other_users_notifications_are_untouched(app, client, notify):
+    other = app.test_client()
+    other_id = other.post('/api/register', json={'username': 'notify-other', 'email': 'notify-other@example.com', 'password': 'pw'}).get_json()['user_id']
+    theirs = notify(other_id, 1)
+
+    assert client.put('/api/notifications/read', json={'ids': theirs}).get_json()['marked'] == 0
+    assert unread(other) == 1
+
+def test_bad_mark_read_bodies_are_a_400(client):
+    assert client.put('/api/notifications/read', json={'ids': 'all'}).status_code == 400
+    assert client.put('/api/notifications/read', json={'up_to': '5'}).status_code == 400
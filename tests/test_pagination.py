@@ -0,0 +1,63 @@
+import json
+
+def add_expenses(client, count):
+    ids = []
+    for i in range(count):
+        # Most rows share a date so the id tie-breaker carries the page boundaries
+        response = client.post('/api/expenses', json={
+            'description': f'e{i}', 'amount': 1, 'category': 'Food',
+            'expense_date': '2024-05-01' if i % 4 else '2024-05-02'
+        })
+        ids.append(response.get_json()['expense_id'])
+    return ids
+
+def test_keyset_pages_cover_every_row_once(client):
+    ids = add_expenses(client, 7)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = client.get('/api/expenses', query_string={'limit': 3, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 3
+        seen.extend(row['id'] for row in page)
+        pages += 1
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == sorted(ids)
+    assert len(seen) == len(set(seen))
+
+def test_exact_multiple_has_no_trailing_cursor(client):
+    add_expenses(client, 4)
+
+    first = client.get('/api/expenses?limit=2')
+    second = client.get('/api/expenses', query_string={'limit': 2, 'cursor': first.headers['X-Next-Cursor']})
+
+    assert len(second.get_json()) == 2
+    assert 'X-Next-Cursor' not in second.headers
+
+def test_bad_cursor_and_dates_are_rejected(client):
+    assert client.get('/api/expenses?cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/expenses?limit=0').status_code == 400
+    assert client.get('/api/expenses?end_date=2024-13-40').status_code == 400
+
+def test_ndjson_streams_every_row_in_page_order(client):
+    ids = add_expenses(client, 5)
+
+    response = client.get('/api/expenses?format=ndjson')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert sorted(row['id'] for row in rows) == sorted(ids)
+    assert rows == client.get('/api/expenses?limit=10').get_json()
+
+def test_ndjson_honours_limit_and_accept_header(client):
+    add_expenses(client, 5)
+
+    response = client.get('/api/expenses?limit=2', headers={'Accept': 'application/x-ndjson'})
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(response.get_data(as_text=True).splitlines()) == 2
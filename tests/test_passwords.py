@@ -0,0 +1,59 @@
+import time
+
+import bcrypt as bcrypt_lib
+from flask import Flask
+import pytest
+
+from passwords import PasswordHasher, PasswordPoolBusy, hash_rounds
+
+@pytest.fixture
+def pool_hasher():
+    app = Flask(__name__)
+    app.config.update(BCRYPT_LOG_ROUNDS=4, PASSWORD_POOL_WORKERS=1, PASSWORD_POOL_QUEUE=0, PASSWORD_POOL_TIMEOUT=5)
+    hasher = PasswordHasher(app)
+    yield hasher
+    hasher.shutdown()
+
+def test_hash_and_check_on_the_process_pool(pool_hasher):
+    password_hash = pool_hasher.generate_password_hash('s3cret')
+
+    assert hash_rounds(password_hash) == 4
+    assert pool_hasher.check_password_hash(password_hash, 's3cret')
+    assert not pool_hasher.check_password_hash(password_hash, 'wrong')
+    assert not pool_hasher.check_password_hash('not-a-bcrypt-hash', 's3cret')
+
+def test_admission_is_bounded(pool_hasher):
+    # One worker and no queue: a second job in flight is refused at once
+    _, running = pool_hasher._submit(time.sleep, 0.5)
+
+    with pytest.raises(PasswordPoolBusy) as busy:
+        pool_hasher.generate_password_hash('s3cret')
+    assert busy.value.status == 429
+    running.result()
+
+def test_slow_job_is_reported_as_unavailable(pool_hasher):
+    pool_hasher.timeout = 0.1
+
+    with pytest.raises(PasswordPoolBusy) as busy:
+        pool_hasher._run(time.sleep, 1)
+    assert busy.value.status == 503
+
+def test_dead_worker_is_replaced(pool_hasher):
+    password_hash = pool_hasher.generate_password_hash('s3cret')
+    for process in list(pool_hasher._executor._processes.values()):
+        process.kill()
+        process.join()
+
+    assert pool_hasher.check_password_hash(password_hash, 's3cret')
+
+def test_login_rehashes_at_the_configured_cost(client, database):
+    old_hash = bcrypt_lib.hashpw(b'correct horse', bcrypt_lib.gensalt(5)).decode()
+    with database.transaction() as cur:
+        cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (old_hash, client.user_id))
+
+    response = client.post('/api/login', json={'email': client.email, 'password': 'correct horse'})
+
+    assert response.status_code == 200
+    with database.cursor() as cur:
+        cur.execute("SELECT password_hash FROM users WHERE id = %s", (client.user_id,))
+        assert hash_rounds(cur.fetchone()['password_hash']) == 4
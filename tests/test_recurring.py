@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+import threading
+
+import flask
+import pytest
+
+from cache import SQLiteCacheBackend
+from events import SQLiteBroker
+from recurring import CronSchedule, RuleError, first_due, occurrences
+
+def rule(**fields):
+    return {'start_date': date(2024, 1, 31), 'end_date': None, 'frequency': 'monthly', 'interval_count': 1, 'cron': None, **fields}
+
+def take(iterator, count):
+    return [day for day, _ in zip(iterator, range(count))]
+
+def test_monthly_rule_on_the_31st_clamps_to_month_end():
+    assert take(occurrences(rule(), date(2024, 1, 1)), 5) == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30), date(2024, 5, 31)
+    ]
+
+def test_monthly_rule_resumes_mid_schedule_and_stops_at_end_date():
+    monthly = rule(interval_count=2, end_date=date(2024, 9, 30))
+
+    assert list(occurrences(monthly, date(2024, 3, 15))) == [
+        date(2024, 3, 31), date(2024, 5, 31), date(2024, 7, 31), date(2024, 9, 30)
+    ]
+
+def test_cron_rule_matches_day_or_weekday():
+    # The 1st and 15th, or any Friday, in March 2024
+    cron = rule(frequency='cron', cron='1,15 * fri', start_date=date(2024, 3, 1), end_date=date(2024, 3, 31))
+
+    assert list(occurrences(cron, date(2024, 3, 1))) == [
+        date(2024, 3, 1), date(2024, 3, 8), date(2024, 3, 15), date(2024, 3, 22), date(2024, 3, 29)
+    ]
+
+def test_cron_last_weekdays_of_february():
+    schedule = CronSchedule('0 9 28-31 feb *')
+
+    assert [day.day for day in (date(2024, 2, 1) + timedelta(days=n) for n in range(40)) if schedule.matches(day)] == [28, 29]
+
+def test_invalid_cron_is_rejected():
+    with pytest.raises(RuleError):
+        CronSchedule('32 * *')
+
+def test_new_rule_does_not_back_fill(client):
+    today = date.today()
+    response = client.post('/api/recurring', json={
+        'description': 'Rent', 'amount': 900, 'category': 'Rent', 'frequency': 'monthly',
+        'start_date': (today - timedelta(days=120)).isoformat()
+    })
+
+    assert response.status_code == 201, response.get_json()
+    next_due = date.fromisoformat(response.get_json()['next_due'][:10])
+    assert next_due >= today
+    assert next_due == first_due(rule(start_date=today - timedelta(days=120)), today)
+
+def test_tick_materializes_due_occurrences_once(client, app):
+    scheduler = app.extensions['recurring_scheduler']
+    today = date.today()
+    client.post('/api/recurring', json={
+        'description': 'Gym', 'amount': 30, 'category': 'Health', 'frequency': 'daily', 'start_date': today.isoformat()
+    })
+
+    with app.app_context():
+        scheduler.tick(today + timedelta(days=2))
+        assert scheduler.tick(today + timedelta(days=2)) == (0, 0)
+
+    expenses = client.get('/api/expenses?category=Health').get_json()
+    assert sorted(row['expense_date'][:10] for row in expenses) == [
+        (today + timedelta(days=n)).isoformat() for n in range(3)
+    ]
+
+def test_worker_returns_its_connection_between_ticks(app, monkeypatch):
+    scheduler = app.extensions['recurring_scheduler']
+    stop = threading.Event()
+    contexts = []
+
+    def tick():
+        with scheduler.db.cursor() as cur:
+            cur.execute("SELECT 1")
+        contexts.append(flask.g._get_current_object())
+        if len(contexts) == 2:
+            stop.set()
+        return 0, 0
+    monkeypatch.setattr(scheduler, 'tick', tick)
+
+    with app.app_context():
+        scheduler.run(interval=0.01, stop=stop)
+        # The CLI's outer context never holds a connection across ticks
+        assert '_db_connection' not in flask.g
+
+    assert len(contexts) == 2 and contexts[0] is not contexts[1]
+
+def test_scheduler_cli_refuses_process_local_backends(app):
+    result = app.test_cli_runner().invoke(args=['recurring', 'run'])
+
+    assert result.exit_code != 0
+    assert 'CACHE_BACKEND=memory and EVENTS_BROKER=memory' in result.output
+
+def test_scheduler_cli_runs_with_shared_backends(app, monkeypatch, tmp_path):
+    monkeypatch.setattr(app.extensions['response_cache'], 'backend', SQLiteCacheBackend(str(tmp_path / 'cache.db')))
+    monkeypatch.setattr(app.extensions['event_bus'], 'broker', SQLiteBroker(str(tmp_path / 'events.db')))
+
+    result = app.test_cli_runner().invoke(args=['recurring', 'run'])
+
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('Processed ')
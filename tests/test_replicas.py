@@ -0,0 +1,124 @@
+import sqlite3
+import time
+
+import pytest
+from flask import Flask, g, jsonify, session
+
+from db import Database
+
+# A primary and one "replica" SQLite file. Nothing copies rows between them:
+# each says which one it is, and replicate() plays the replication stream by
+# writing a primary heartbeat straight into the replica's table.
+
+@pytest.fixture
+def replicated(tmp_path):
+    paths = {name: str(tmp_path / f'{name}.db') for name in ('primary', 'replica')}
+    for name, path in paths.items():
+        app = Flask(name)
+        app.config.update(DB_ENGINE='sqlite', SQLITE_PATH=path, DB_AUTO_MIGRATE=True)
+        Database(app)
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE origin (name TEXT)")
+        conn.execute("INSERT INTO origin VALUES (?)", (name,))
+        conn.commit()
+        conn.close()
+
+    app = Flask(__name__)
+    app.secret_key = 'replica-tests'
+    app.config.update(DB_ENGINE='sqlite', SQLITE_PATH=paths['primary'], DB_REPLICAS=[paths['replica']])
+    db = Database(app)
+    # The health checks are driven by the tests, not a monitor thread
+    db._monitor = object()
+
+    @app.route('/login', methods=['POST'])
+    def login():
+        session['user_id'] = 1
+        return jsonify({})
+
+    @app.route('/write', methods=['POST'])
+    def write():
+        with db.transaction() as cur:
+            cur.execute("INSERT INTO origin VALUES ('written')")
+        return jsonify({})
+
+    @app.route('/read')
+    @db.read_only
+    def read():
+        with db.cursor() as cur:
+            cur.execute("SELECT name FROM origin LIMIT 1")
+            return jsonify({'from': cur.fetchone()['name'], 'heartbeat': g.get('db_replica_heartbeat')})
+
+    @app.route('/read-primary')
+    def read_primary():
+        with db.cursor() as cur:
+            cur.execute("SELECT name FROM origin LIMIT 1")
+            return jsonify({'from': cur.fetchone()['name']})
+
+    def replicate(beat_at):
+        conn = sqlite3.connect(paths['replica'])
+        conn.execute("INSERT OR REPLACE INTO replication_heartbeat (id, beat_at) VALUES (1, ?)", (beat_at,))
+        conn.commit()
+        conn.close()
+        db.check_replicas()
+
+    client = app.test_client()
+    client.post('/login')
+    client.replicate = replicate
+    client.db = db
+    client.app = app
+    return client
+
+def read_from(client, path='/read'):
+    return client.get(path).get_json()['from']
+
+def test_reads_stay_on_the_primary_until_a_replica_is_checked(replicated):
+    assert read_from(replicated) == 'primary'
+
+    replicated.replicate(time.time())
+
+    assert read_from(replicated) == 'replica'
+    assert replicated.get('/read').get_json()['heartbeat'] is not None
+
+def test_only_read_only_views_are_routed(replicated):
+    replicated.replicate(time.time())
+
+    assert read_from(replicated, '/read-primary') == 'primary'
+
+def test_lagging_replica_is_skipped(replicated):
+    replicated.replicate(time.time() - 60)
+
+    assert replicated.db.replica_stats()[0]['healthy'] is False
+    assert read_from(replicated) == 'primary'
+
+def test_session_reads_its_own_writes(replicated):
+    replicated.replicate(time.time())
+    replicated.post('/write')
+
+    # The replica has not replicated past the write yet
+    assert read_from(replicated) == 'primary'
+
+    replicated.replicate(time.time())
+    assert read_from(replicated) == 'replica'
+
+def test_other_sessions_are_not_held_back_by_a_write(replicated):
+    replicated.replicate(time.time())
+    replicated.post('/write')
+
+    other = replicated.app.test_client()
+    assert read_from(other) == 'replica'
+
+def test_read_your_writes_lapses_after_the_window(replicated):
+    replicated.replicate(time.time())
+    replicated.post('/write')
+    replicated.app.config['DB_READ_YOUR_WRITES_WINDOW'] = 0
+
+    assert read_from(replicated) == 'replica'
+
+def test_replica_connections_are_read_only(replicated):
+    replicated.replicate(time.time())
+    pooled = replicated.db.replicas[0].pool.acquire()
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            pooled.conn.execute("INSERT INTO origin VALUES ('nope')")
+    finally:
+        replicated.db.replicas[0].pool.release(pooled)
@@ -0,0 +1,82 @@
+import pytest
+
+from reports import ArtifactStore
+
+SPEC = {'kind': 'category_year', 'year': 2024, 'format': 'csv'}
+
+@pytest.fixture
+def queue_limit(app):
+    limit = app.config['REPORT_MAX_QUEUED_PER_USER']
+    app.config['REPORT_MAX_QUEUED_PER_USER'] = 2
+    yield 2
+    app.config['REPORT_MAX_QUEUED_PER_USER'] = limit
+
+def test_identical_spec_is_deduplicated(client):
+    first = client.post('/api/reports', json=SPEC)
+    second = client.post('/api/reports', json=SPEC)
+
+    assert first.status_code == second.status_code == 202
+    assert second.get_json()['outcome'] == 'deduplicated'
+    assert second.get_json()['id'] == first.get_json()['id']
+
+def test_data_change_gets_a_new_job(client):
+    first = client.post('/api/reports', json=SPEC).get_json()
+    client.post('/api/expenses', json={'amount': 5, 'category': 'Food', 'expense_date': '2024-02-02'})
+
+    second = client.post('/api/reports', json=SPEC).get_json()
+
+    assert second['outcome'] == 'queued'
+    assert second['id'] != first['id']
+
+def test_per_user_queue_limit(client, app, queue_limit):
+    for year in range(2020, 2020 + queue_limit):
+        assert client.post('/api/reports', json={**SPEC, 'year': year}).status_code == 202
+
+    assert client.post('/api/reports', json={**SPEC, 'year': 2030}).status_code == 429
+    # A queued duplicate is still answered rather than counted against the limit
+    assert client.post('/api/reports', json={**SPEC, 'year': 2020}).get_json()['outcome'] == 'deduplicated'
+
+def test_limit_is_per_user(client, app, queue_limit):
+    for year in range(2020, 2020 + queue_limit):
+        client.post('/api/reports', json={**SPEC, 'year': year})
+
+    other = app.test_client()
+    other.post('/api/register', json={'username': 'reports-other', 'email': 'reports-other@example.com', 'password': 'pw'})
+
+    assert other.post('/api/reports', json={**SPEC, 'year': 2030}).status_code == 202
+
+@pytest.fixture
+def report_queue(app, monkeypatch, tmp_path):
+    queue = app.extensions['report_queue']
+    monkeypatch.setattr(queue, 'artifacts', ArtifactStore(str(tmp_path / 'artifacts'), 10 * 1024 * 1024))
+    return queue
+
+def run_queued_jobs(app, queue):
+    # What a report worker does, without the thread
+    with app.app_context():
+        while (job := queue.claim()) is not None:
+            queue.execute(job)
+
+def test_worker_renders_the_report_and_a_repeat_is_cached(app, client, report_queue):
+    client.post('/api/expenses', json={'amount': 12.5, 'category': 'Food', 'expense_date': '2024-04-04'})
+    job = client.post('/api/reports', json=SPEC).get_json()
+    assert client.get(job['status_url']).get_json()['status'] == 'queued'
+    assert client.get(f"/api/reports/{job['id']}/download").status_code == 409
+
+    run_queued_jobs(app, report_queue)
+
+    status = client.get(job['status_url']).get_json()
+    assert status['status'] == 'done'
+    download = client.get(status['download_url'])
+    assert download.status_code == 200
+    assert download.mimetype == 'text/csv'
+    assert 'Food' in download.get_data(as_text=True)
+
+    repeat = client.post('/api/reports', json=SPEC)
+    assert repeat.status_code == 200
+    assert (repeat.get_json()['outcome'], repeat.get_json()['id']) == ('cached', job['id'])
+
+def test_statement_for_another_users_card_is_a_404(client):
+    response = client.post('/api/reports', json={'kind': 'card_statement', 'card_id': 1, 'month': '2024-04', 'format': 'csv'})
+
+    assert response.status_code == 404
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+def rollups(database, user_id):
+    with database.cursor() as cur:
+        cur.execute(
+            "SELECT month, category, total, expense_count FROM expense_rollups WHERE user_id = %s AND expense_count > 0",
+            (user_id,)
+        )
+        return {(row['month'], row['category']): (Decimal(str(row['total'])), row['expense_count']) for row in cur.fetchall()}
+
+def add_expense(client, **fields):
+    expense = {'description': 'Lunch', 'amount': 12.5, 'category': 'Food', 'expense_date': '2024-03-10', **fields}
+    response = client.post('/api/expenses', json=expense)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['expense_id']
+
+def test_add_expense_bumps_rollup(client, database):
+    add_expense(client)
+    add_expense(client, amount=7.5, expense_date='2024-03-20')
+
+    assert rollups(database, client.user_id) == {('2024-03', 'Food'): (Decimal('20'), 2)}
+
+def test_update_expense_moves_amount_between_buckets(client, database):
+    expense_id = add_expense(client)
+    add_expense(client, amount=10)
+
+    response = client.put(f'/api/expenses/{expense_id}', json={
+        'description': 'Train', 'amount': 30, 'category': 'Travel', 'expense_date': '2024-04-02'
+    })
+
+    assert response.status_code == 200, response.get_json()
+    assert rollups(database, client.user_id) == {
+        ('2024-03', 'Food'): (Decimal('10'), 1),
+        ('2024-04', 'Travel'): (Decimal('30'), 1),
+    }
+
+def test_delete_expense_removes_it_from_rollup(client, database):
+    expense_id = add_expense(client)
+    add_expense(client, amount=10)
+
+    assert client.delete(f'/api/expenses/{expense_id}').status_code == 200
+    assert rollups(database, client.user_id) == {('2024-03', 'Food'): (Decimal('10'), 1)}
+
+    other_id = add_expense(client, category='Rent', amount=500)
+    client.delete(f'/api/expenses/{other_id}')
+    assert ('2024-03', 'Rent') not in rollups(database, client.user_id)
+
+def test_verify_detects_drift_and_rebuild_repairs_it(app, client, database):
+    add_expense(client)
+    add_expense(client, category='Rent', amount=400)
+    with database.transaction() as cur:
+        cur.execute("UPDATE expense_rollups SET total = total + 1 WHERE user_id = %s AND category = 'Food'", (client.user_id,))
+    runner = app.test_cli_runner()
+    scope = ['--user-id', str(client.user_id)]
+
+    drifted = runner.invoke(args=['rollups', 'verify', *scope])
+    assert drifted.exit_code == 1
+    assert 'category=Food' in drifted.output
+
+    assert runner.invoke(args=['rollups', 'rebuild', *scope]).output == 'Rebuilt 2 rollup rows.\n'
+    assert runner.invoke(args=['rollups', 'verify', *scope]).exit_code == 0
+    assert rollups(database, client.user_id)[('2024-03', 'Food')] == (Decimal('12.5'), 1)
+
+def test_analytics_read_the_rollup_not_the_expenses(client, database):
+    add_expense(client, expense_date='2024-08-01', amount=10)
+    add_expense(client, expense_date='2024-08-15', category='Rent', amount=300)
+    # Only the rollup changes, so the response shows which table was read
+    with database.transaction() as cur:
+        cur.execute("UPDATE expense_rollups SET total = 11 WHERE user_id = %s AND category = 'Food'", (client.user_id,))
+
+    categories = client.get('/api/analytics/category?month=2024-08').get_json()
+
+    assert {row['category']: row['total'] for row in categories} == {'Food': 11, 'Rent': 300}
@@ -0,0 +1,83 @@
+import pytest
+
+@pytest.fixture
+def expenses(client, card_id):
+    rows = [
+        ('Morning coffee', 4.5, 'Food', card_id),
+        ('Coffee beans, coffee filters', 18, 'Groceries', None),
+        ('Train to the coffee festival', 32, 'Travel', card_id),
+        ('Weekly groceries', 85.2, 'Groceries', card_id),
+    ]
+    ids = {}
+    for description, amount, category, card in rows:
+        response = client.post('/api/expenses', json={
+            'description': description, 'amount': amount, 'category': category,
+            'expense_date': '2024-04-10', 'card_id': card,
+        })
+        ids[description] = response.get_json()['expense_id']
+    return ids
+
+def search(client, **args):
+    response = client.get('/api/expenses/search', query_string=args)
+    assert response.status_code == 200, response.get_json()
+    return response
+
+def descriptions(response):
+    return {row['description'] for row in response.get_json()}
+
+def test_terms_match_word_prefixes_and_all_must_match(client, expenses):
+    assert descriptions(search(client, q='COFF')) == {
+        'Morning coffee', 'Coffee beans, coffee filters', 'Train to the coffee festival'
+    }
+    assert descriptions(search(client, q='coffee fest')) == {'Train to the coffee festival'}
+    assert descriptions(search(client, q='offee')) == set()
+
+def test_relevance_ranks_repeated_terms_first(client, expenses):
+    assert search(client, q='coffee').get_json()[0]['description'] == 'Coffee beans, coffee filters'
+
+def test_filters_narrow_the_match(client, card_id, expenses):
+    assert descriptions(search(client, q='coffee', category='Food,Travel')) == {
+        'Morning coffee', 'Train to the coffee festival'
+    }
+    assert descriptions(search(client, q='coffee', card_id=card_id)) == {
+        'Morning coffee', 'Train to the coffee festival'
+    }
+    assert descriptions(search(client, amount_min='5', amount_max='32')) == {
+        'Coffee beans, coffee filters', 'Train to the coffee festival'
+    }
+
+def test_other_users_rows_are_never_matched(app, expenses):
+    other = app.test_client()
+    other.post('/api/register', json={'username': 'search-other', 'email': 'search-other@example.com', 'password': 'pw'})
+
+    assert other.get('/api/expenses/search?q=coffee').get_json() == []
+
+def test_relevance_pages_cover_every_match_once(client, expenses):
+    seen, cursor = [], None
+    while True:
+        response = search(client, q='coffee', limit=2, **({'cursor': cursor} if cursor else {}))
+        seen.extend(row['id'] for row in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+
+    assert sorted(seen) == sorted(expenses[d] for d in expenses if 'coffee' in d.lower())
+
+def test_edits_and_deletes_reach_the_index(client, expenses):
+    expense_id = expenses['Weekly groceries']
+    client.put(f'/api/expenses/{expense_id}', json={
+        'description': 'Decaf coffee', 'amount': 9, 'category': 'Food', 'expense_date': '2024-04-10'
+    })
+    assert 'Decaf coffee' in descriptions(search(client, q='coffee'))
+    assert descriptions(search(client, q='weekly')) == set()
+
+    client.delete(f'/api/expenses/{expense_id}')
+    assert 'Decaf coffee' not in descriptions(search(client, q='coffee'))
+
+def test_bad_search_arguments_are_rejected(client):
+    assert client.get('/api/expenses/search?sort=relevance').status_code == 400
+    assert client.get('/api/expenses/search?sort=price').status_code == 400
+    assert client.get('/api/expenses/search?amount_min=lots').status_code == 400
+    assert client.get('/api/expenses/search?amount_max=nan').status_code == 400
+    assert client.get('/api/expenses/search?card_id=first').status_code == 400
+    assert client.get('/api/expenses/search?q=coffee&cursor=bogus').status_code == 400